@@ -1,9 +1,26 @@
-from typing import Optional, Dict, Tuple
-from padai.prompts.psychological_abuse import abuse_analyzer_prompts, abuse_analyzer_prompts_with_context, abuse_analyzer_compare_prompts
+from typing import Optional, Dict, Tuple, List, Sequence
+from padai.prompts.psychological_abuse import (
+    abuse_analyzer_prompts,
+    abuse_analyzer_prompts_with_context,
+    abuse_analyzer_packed_prompts,
+    abuse_analyzer_compare_prompts,
+    abuse_analyzer_rank_prompts,
+)
 from padai.config.settings import settings
 from padai.config.language import Language
+from padai.chains.base import invoke_prompt_llm_parser_chain
+from padai.chains.budget import fit_abuse_analyzer_params
+from padai.llms.base import ChatModelDescriptionEx
+from padai.utils.text import estimate_tokens, process_response, strip_text
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# (message, context) to analyse; the context may be empty
+AnalyzerInput = Tuple[str, Optional[str]]
 
 
 def get_abuse_analyzer_chain(llm, params: Dict[str, str], severity: Optional[str] = "vigilant"):
@@ -46,6 +63,159 @@ def get_abuse_analyzer_prompts(language: Language, severity: str, user_context:
     return system_prompt, human_prompt
 
 
+def get_abuse_analyzer_packed_prompts(language: Language, severity: str) -> Tuple[str, str]:
+    packed = abuse_analyzer_packed_prompts[language]
+    system_prompt = abuse_analyzer_prompts_with_context[language]["system"][severity] + "\n\n" + packed["system"]["default"]
+    return system_prompt, packed["human"]["default"]
+
+
+def get_abuse_analyzer_packed_params(language: Language, messages: Sequence[AnalyzerInput]) -> Dict[str, str]:
+    template = abuse_analyzer_packed_prompts[language]["message"]
+
+    sections = [
+        template["default"].format(
+            index=index,
+            user_input=text,
+            user_context=strip_text(context) or template["no_context"],
+        )
+        for index, (text, context) in enumerate(messages, start=1)
+    ]
+
+    return {
+        "count": str(len(messages)),
+        "messages": "\n\n".join(sections),
+    }
+
+
+def split_abuse_analyzer_packed_response(language: Language, response: str, count: int) -> List[Optional[str]]:
+    """
+    Split a packed *response* into the analyses of its *count* messages, in
+    order; an analysis the model did not delimit properly is None.
+    """
+    tags = abuse_analyzer_packed_prompts[language]["analysis"]
+    analyses: List[Optional[str]] = []
+
+    for index in range(1, count + 1):
+        match = re.search(
+            re.escape(tags["start"].format(index=index)) + r"\s*(.*?)\s*" + re.escape(tags["end"].format(index=index)),
+            response,
+            flags=re.DOTALL,
+        )
+        analyses.append(match.group(1) if match and match.group(1) else None)
+
+    return analyses
+
+
+def pack_abuse_analyzer_messages(
+    language: Language,
+    severity: str,
+    messages: Sequence[AnalyzerInput],
+    budget: int,
+    output_tokens_per_message: int = 1024,
+) -> List[List[int]]:
+    """
+    Group the indices of *messages* into packs whose estimated size (prompts,
+    messages and *output_tokens_per_message* per message) fits in *budget*
+    tokens.  Messages keep their order; one too large for the budget goes
+    alone in its pack.
+    """
+    system_prompt, human_prompt = get_abuse_analyzer_packed_prompts(language, severity)
+    fixed = estimate_tokens(system_prompt) + estimate_tokens(human_prompt)
+
+    packs: List[List[int]] = []
+    current: List[int] = []
+    used = fixed
+
+    for index, message in enumerate(messages):
+        cost = estimate_tokens(get_abuse_analyzer_packed_params(language, [message])["messages"]) + output_tokens_per_message
+
+        if current and used + cost > budget:
+            packs.append(current)
+            current, used = [], fixed
+
+        current.append(index)
+        used += cost
+
+    if current:
+        packs.append(current)
+
+    return packs
+
+
+def invoke_abuse_analyzer(
+    description: ChatModelDescriptionEx,
+    message: AnalyzerInput,
+    language: Language,
+    severity: str,
+    temperature: Optional[float],
+    top_p: Optional[float],
+) -> str:
+    text, context = message
+    context = strip_text(context)
+    system_prompt, human_prompt = get_abuse_analyzer_prompts(language, severity, user_context=context)
+    params, _ = fit_abuse_analyzer_params(
+        description, system_prompt, human_prompt, get_abuse_analyzer_params(text, user_context=context)
+    )
+
+    return process_response(
+        invoke_prompt_llm_parser_chain(
+            description,
+            system_prompt,
+            human_prompt,
+            params,
+            temperature=temperature,
+            top_p=top_p,
+        )
+    )
+
+
+def invoke_abuse_analyzer_packed(
+    description: ChatModelDescriptionEx,
+    messages: Sequence[AnalyzerInput],
+    language: Language,
+    severity: str = "vigilant",
+    budget: int = 8 * 1024,
+    output_tokens_per_message: int = 1024,
+    temperature: Optional[float] = None,
+    top_p: Optional[float] = None,
+) -> List[str]:
+    """
+    Analyse *messages* packing as many as fit in *budget* tokens into each
+    request, so that the system prompt is sent once per pack instead of once
+    per message.  Returns one analysis per message, in order.
+
+    Messages the model left out of its packed response are analysed again
+    on their own.
+    """
+    system_prompt, human_prompt = get_abuse_analyzer_packed_prompts(language, severity)
+    analyses: List[Optional[str]] = [None] * len(messages)
+
+    for pack in pack_abuse_analyzer_messages(language, severity, messages, budget, output_tokens_per_message):
+        if len(pack) == 1:
+            continue    # analysed alone below, with the regular prompts
+
+        response = process_response(
+            invoke_prompt_llm_parser_chain(
+                description,
+                system_prompt,
+                human_prompt,
+                get_abuse_analyzer_packed_params(language, [messages[i] for i in pack]),
+                temperature=temperature,
+                top_p=top_p,
+            )
+        )
+
+        for index, analysis in zip(pack, split_abuse_analyzer_packed_response(language, response, len(pack))):
+            analyses[index] = analysis
+
+    for index, analysis in enumerate(analyses):
+        if analysis is None:
+            logger.debug("Analysing message %d alone", index)
+            analyses[index] = invoke_abuse_analyzer(description, messages[index], language, severity, temperature, top_p)
+
+    return analyses
+
+
 def get_abuse_analyzer_compare_llm_params(text: str, left: str, right: str, context: Optional[str] = None) -> Dict[str, str]:
     params = {
         "text": text,
@@ -63,4 +233,61 @@ def get_abuse_analyzer_compare_llm_prompts(language: Language) -> Tuple[str, str
     return (
         abuse_analyzer_compare_prompts[language]["system"]["default"],
         abuse_analyzer_compare_prompts[language]["human"]["default"],
-    )
\ No newline at end of file
+    )
+
+
+def get_abuse_analyzer_rank_llm_params(
+    language: Language,
+    text: str,
+    analyses: Dict[str, str],
+    context: Optional[str] = None,
+) -> Dict[str, str]:
+    """Params of the listwise referee prompt; *analyses* maps each anonymous label to its analysis."""
+    template = abuse_analyzer_rank_prompts[language]["analysis"]["default"]
+    labels = sorted(analyses)
+
+    example = labels[0]
+    for i, label in enumerate(labels[1:]):
+        example += (" > " if i % 2 == 0 else " = ") + label
+
+    return {
+        "text": text,
+        "context": context or "",
+        "analyses": "\n\n".join(template.format(label=label, analysis=analyses[label]) for label in analyses),
+        "example": example,
+    }
+
+
+def get_abuse_analyzer_rank_llm_prompts(language: Language) -> Tuple[str, str]:
+    return (
+        abuse_analyzer_rank_prompts[language]["system"]["default"],
+        abuse_analyzer_rank_prompts[language]["human"]["default"],
+    )
+
+
+_RANKING_RE = re.compile(r"\s*[A-Z](?:\s*[>=]\s*[A-Z])*\s*\.?\s*")
+
+
+def parse_abuse_analyzer_ranking(response: str, labels: Sequence[str]) -> Optional[Dict[str, int]]:
+    """
+    Parse a listwise referee *response* such as ``"B > A = C"`` into the
+    rank of every label (0 is best, tied labels share a rank).  Returns None
+    unless some line ranks every label exactly once.
+    """
+    for line in response.splitlines():
+        if not _RANKING_RE.fullmatch(line):
+            continue
+
+        ranks: Dict[str, int] = {}
+        rank = 0
+        for token in re.findall(r"[A-Z]|[>=]", line):
+            if token == ">":
+                rank += 1
+            elif token != "=":
+                if token in ranks:
+                    return None
+                ranks[token] = rank
+
+        return ranks if set(ranks) == set(labels) else None
+
+    return None
@@ -1,24 +1,18 @@
 from padai.llms.base import ChatModelDescriptionEx, get_chat_model
 from padai.llms.disposable import make_disposable
+from padai.utils.single_flight import SingleFlight
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from typing import Optional
+from typing import Optional, Dict, Any
+import hashlib
+import json
 
 
-def build_prompt_llm_parser_chain(
+def get_chat_model_params(
     description: ChatModelDescriptionEx,
-    system_prompt: str,
-    human_prompt: str,
     temperature: Optional[float] = None,
     top_p: Optional[float] = None,
-):
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            ("human", human_prompt),
-        ]
-    )
-
+) -> Dict[str, Any]:
     params = description.params.copy()
 
     if temperature is not None:
@@ -28,7 +22,89 @@ def build_prompt_llm_parser_chain(
     if top_p is not None:
         params["top_p"] = top_p
 
-    llm = get_chat_model(description.engine, params)
+    return params
+
+
+def build_prompt(system_prompt: str, human_prompt: str) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            ("human", human_prompt),
+        ]
+    )
+
+
+def build_prompt_parser_chain(llm, system_prompt: str, human_prompt: str):
+    prompt = build_prompt(system_prompt, human_prompt)
     parser = StrOutputParser()
 
-    return prompt | llm | parser, make_disposable(llm)
+    return prompt | llm | parser
+
+
+def build_prompt_llm_parser_chain(
+    description: ChatModelDescriptionEx,
+    system_prompt: str,
+    human_prompt: str,
+    temperature: Optional[float] = None,
+    top_p: Optional[float] = None,
+):
+    params = get_chat_model_params(description, temperature, top_p)
+
+    llm = get_chat_model(description.engine, params)
+
+    return build_prompt_parser_chain(llm, system_prompt, human_prompt), make_disposable(llm)
+
+
+def get_chain_fingerprint(
+    description: ChatModelDescriptionEx,
+    system_prompt: str,
+    human_prompt: str,
+    params: Dict[str, str],
+    temperature: Optional[float] = None,
+    top_p: Optional[float] = None,
+) -> str:
+    """
+    Stable hash of everything that determines the output of a
+    prompt | llm | parser call: engine, effective model parameters, both
+    prompt templates and the template variables.
+    """
+    payload = [
+        description.engine,
+        get_chat_model_params(description, temperature, top_p),
+        system_prompt,
+        human_prompt,
+        params,
+    ]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+_SINGLE_FLIGHT: SingleFlight[str] = SingleFlight()
+
+
+def invoke_prompt_llm_parser_chain(
+    description: ChatModelDescriptionEx,
+    system_prompt: str,
+    human_prompt: str,
+    params: Dict[str, str],
+    temperature: Optional[float] = None,
+    top_p: Optional[float] = None,
+) -> str:
+    """
+    Build the chain, invoke it once with *params* and dispose of the model.
+
+    Concurrent calls with the same fingerprint (see `get_chain_fingerprint`)
+    share a single in-flight request.  Completed calls are served by the
+    LangChain LLM cache, when one is set (`set_llm_sqlite_cache`).
+    """
+    def _invoke() -> str:
+        chain, disposable = build_prompt_llm_parser_chain(description, system_prompt, human_prompt, temperature, top_p)
+        try:
+            return chain.invoke(params)
+
+        finally:
+            # Important: drop chain reference so GC can break the link to llm
+            del chain
+            disposable.dispose()
+
+    key = get_chain_fingerprint(description, system_prompt, human_prompt, params, temperature, top_p)
+    return _SINGLE_FLIGHT.do(key, _invoke)
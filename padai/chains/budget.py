@@ -0,0 +1,170 @@
+from padai.chains.base import build_prompt
+from padai.config.settings import settings
+from padai.llms.base import ChatModelDescriptionEx
+from padai.llms.tokenizers import TokenCounter, get_context_window, get_token_counter, truncate_to_tokens
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import logging
+import threading
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tokens the chat format adds around every message (role, delimiters).
+_MESSAGE_OVERHEAD = 4
+
+CONTEXT_GAP = "[…]"
+
+
+@dataclass
+class BudgetReport:
+    model: str
+    budget: int             # prompt tokens allowed for the call
+    tokens: int             # prompt tokens as requested
+    sent: int               # ... and as sent, after trimming
+
+    @property
+    def saved(self) -> int:
+        return self.tokens - self.sent
+
+
+@dataclass
+class _ModelBudget:
+    calls: int = 0
+    trimmed: int = 0
+    saved: int = 0
+
+
+class BudgetStats:
+    """Prompts trimmed to their model's budget in this process, and the tokens saved."""
+
+    def __init__(self) -> None:
+        self.models: Dict[str, _ModelBudget] = {}
+        self._lock = threading.Lock()
+
+    def record(self, report: BudgetReport) -> None:
+        with self._lock:
+            model = self.models.setdefault(report.model, _ModelBudget())
+            model.calls += 1
+            model.trimmed += report.saved > 0
+            model.saved += report.saved
+
+    def as_df(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [
+                {"model": name, "calls": m.calls, "trimmed": m.trimmed, "tokens_saved": m.saved}
+                for name, m in self.models.items()
+            ]
+        return pd.DataFrame(rows)
+
+    def log_summary(self) -> None:
+        for row in self.as_df().itertuples():
+            logger.info(
+                "Context budget %s: %d calls, %d trimmed, %d tokens saved",
+                row.model, row.calls, row.trimmed, row.tokens_saved,
+            )
+
+
+BUDGET_STATS = BudgetStats()
+
+
+def get_input_budget(description: ChatModelDescriptionEx, max_input_tokens: Optional[int] = None) -> int:
+    """
+    Prompt tokens a call to *description* may use: its context window less
+    the tokens reserved for the answer (its own ``max_tokens`` when set),
+    capped by *max_input_tokens* or APP_CONTEXT_BUDGET__MAX_INPUT_TOKENS.
+    """
+    config = settings.context_budget
+    reserve = (
+        description.params.get("max_tokens")
+        or description.params.get("max_new_tokens")
+        or config.output_reserve
+    )
+    budget = get_context_window(description) - reserve
+
+    cap = max_input_tokens if max_input_tokens is not None else config.max_input_tokens
+    return min(budget, cap) if cap is not None else budget
+
+
+def count_prompt_tokens(
+    system_prompt: str,
+    human_prompt: str,
+    params: Dict[str, str],
+    count_tokens: TokenCounter,
+) -> int:
+    messages = build_prompt(system_prompt, human_prompt).format_messages(**params)
+    return sum(count_tokens(message.content) + _MESSAGE_OVERHEAD for message in messages)
+
+
+def trim_context(text: str, budget: int, count_tokens: TokenCounter) -> str:
+    """
+    Fit *text* in *budget* tokens keeping its first paragraph and as many of
+    the last ones as fit, the gap marked with `CONTEXT_GAP`: the opening
+    usually says who is who, the end is what the message answers.  A first
+    paragraph too long on its own is truncated.
+    """
+    if count_tokens(text) <= budget:
+        return text
+
+    paragraphs = text.split("\n")
+    head = paragraphs[0]
+    used = count_tokens(head) + count_tokens(CONTEXT_GAP) + 2
+    if len(paragraphs) == 1 or used > budget:
+        return truncate_to_tokens(text, budget, count_tokens)
+
+    tail = []
+    for paragraph in reversed(paragraphs[1:]):
+        cost = count_tokens(paragraph) + 1
+        if used + cost > budget:
+            break
+        tail.append(paragraph)
+        used += cost
+
+    return "\n".join([head, CONTEXT_GAP, *reversed(tail)])
+
+
+def fit_abuse_analyzer_params(
+    description: ChatModelDescriptionEx,
+    system_prompt: str,
+    human_prompt: str,
+    params: Dict[str, str],
+    max_input_tokens: Optional[int] = None,
+    stats: Optional[BudgetStats] = BUDGET_STATS,
+) -> Tuple[Dict[str, str], BudgetReport]:
+    """
+    Fit the abuse analyzer *params* to the input budget of *description*
+    (see `get_input_budget`), counting tokens with the model's tokenizer.
+    The context goes first (`trim_context`), then the end of the message;
+    the prompts are never touched.  Params that fit are returned as they
+    are, so trimming never changes the cache key of a call that fits.
+    """
+    count_tokens = get_token_counter(description)
+    budget = get_input_budget(description, max_input_tokens)
+    tokens = sent = count_prompt_tokens(system_prompt, human_prompt, params, count_tokens)
+
+    if settings.context_budget.enabled and tokens > budget:
+        params = params.copy()
+
+        if params.get("user_context"):
+            context_tokens = count_tokens(params["user_context"])
+            params["user_context"] = trim_context(
+                params["user_context"], max(context_tokens - (tokens - budget), 0), count_tokens
+            ) or CONTEXT_GAP
+            sent = count_prompt_tokens(system_prompt, human_prompt, params, count_tokens)
+
+        if sent > budget:
+            input_tokens = count_tokens(params["user_input"])
+            params["user_input"] = truncate_to_tokens(
+                params["user_input"], max(input_tokens - (sent - budget), 0), count_tokens
+            )
+            sent = count_prompt_tokens(system_prompt, human_prompt, params, count_tokens)
+
+        if sent > budget:
+            logger.warning("The prompts alone exceed the %d-token budget of %s", budget, description.full_name)
+        logger.info("Prompt for %s trimmed from %d to %d tokens", description.full_name, tokens, sent)
+
+    report = BudgetReport(description.full_name, budget, tokens, sent)
+    if stats is not None:
+        stats.record(report)
+
+    return params, report
@@ -0,0 +1,184 @@
+from padai.chains.abuse_analyzer import get_abuse_analyzer_params, get_abuse_analyzer_prompts
+from padai.chains.base import invoke_prompt_llm_parser_chain
+from padai.chains.budget import fit_abuse_analyzer_params
+from padai.config.language import Language
+from padai.llms.base import ChatModelDescriptionEx
+from padai.prompts.psychological_abuse import abuse_analyzer_cascade_prompts
+from padai.utils.text import process_response, strip_text
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import re
+import threading
+import time
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CascadeVerdict:
+    abusive: bool
+    severity: int       # index in the footer "levels", 0 the lowest
+    confidence: int     # 0-100
+
+
+@dataclass
+class CascadeResult:
+    analysis: str
+    verdict: Optional[CascadeVerdict]
+    tier: int                               # index of the tier whose analysis was kept
+    model: str
+    latencies: List[float] = field(default_factory=list)     # seconds spent in every tier tried
+
+
+def parse_cascade_footer(language: Language, response: str) -> Tuple[str, Optional[CascadeVerdict]]:
+    """
+    Split the verdict footer off *response*; the verdict is None when the
+    footer is missing or malformed, and the response is then returned whole.
+    """
+    footer = abuse_analyzer_cascade_prompts[language]["footer"]
+    levels = "|".join(footer["levels"])
+    pattern = re.compile(
+        rf"{footer['verdict']}\W*({footer['abuse']}|{footer['none']})\W+"
+        rf"{footer['severity']}\W*({levels})\W+"
+        rf"{footer['confidence']}\W*(\d{{1,3}})\W*$",
+        re.IGNORECASE,
+    )
+
+    match = pattern.search(response.rstrip())
+    if match is None:
+        return response, None
+
+    verdict = CascadeVerdict(
+        abusive=match.group(1).upper() == footer["abuse"],
+        severity=footer["levels"].index(match.group(2).upper()),
+        confidence=min(int(match.group(3)), 100),
+    )
+    return response[:match.start()].rstrip(), verdict
+
+
+@dataclass
+class TierTelemetry:
+    calls: int = 0
+    accepted: int = 0           # analyses kept, without escalating
+    unparseable: int = 0        # responses without a valid verdict footer
+    seconds: float = 0.0
+
+
+class CascadeStats:
+    """Per-tier hit rates and latencies of the cascades run in this process."""
+
+    def __init__(self) -> None:
+        self.tiers: Dict[str, TierTelemetry] = {}
+        self.results: List[CascadeResult] = []
+        self._lock = threading.Lock()
+
+    def record(self, models: Sequence[str], result: CascadeResult, unparseable: Sequence[bool]) -> None:
+        with self._lock:
+            for model, seconds, failed in zip(models, result.latencies, unparseable):
+                tier = self.tiers.setdefault(model, TierTelemetry())
+                tier.calls += 1
+                tier.seconds += seconds
+                tier.unparseable += failed
+            self.tiers[result.model].accepted += 1
+            self.results.append(result)
+
+    def as_df(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [
+                {
+                    "model": model,
+                    "calls": t.calls,
+                    "accepted": t.accepted,
+                    "hit_rate": t.accepted / t.calls if t.calls else 0.0,
+                    "unparseable": t.unparseable,
+                    "mean_seconds": t.seconds / t.calls if t.calls else 0.0,
+                }
+                for model, t in self.tiers.items()
+            ]
+        return pd.DataFrame(rows)
+
+    def latency_saved(self, top_model: str) -> Optional[float]:
+        """
+        Estimated seconds saved against sending every message straight to
+        *top_model*, from its mean latency; None until it has been called.
+        """
+        with self._lock:
+            top = self.tiers.get(top_model)
+            if top is None or not top.calls:
+                return None
+            top_mean = top.seconds / top.calls
+            return sum(top_mean - sum(r.latencies) for r in self.results)
+
+    def log_summary(self, top_model: Optional[str] = None) -> None:
+        for row in self.as_df().itertuples():
+            logger.info(
+                "Cascade tier %s: %d calls, %d accepted (%.0f%%), %d unparseable, %.2fs mean latency",
+                row.model, row.calls, row.accepted, 100 * row.hit_rate, row.unparseable, row.mean_seconds,
+            )
+
+        saved = self.latency_saved(top_model) if top_model is not None else None
+        if saved is not None:
+            logger.info("Cascade: %.1fs saved against %s alone", saved, top_model)
+
+
+CASCADE_STATS = CascadeStats()
+
+
+def invoke_abuse_analyzer_cascade(
+    tiers: Sequence[ChatModelDescriptionEx],
+    text: str,
+    language: Language,
+    context: Optional[str] = None,
+    severity: str = "vigilant",
+    min_confidence: int = 70,
+    escalate_severity: Optional[int] = 2,
+    stats: Optional[CascadeStats] = CASCADE_STATS,
+) -> CascadeResult:
+    """
+    Analyse *text* with the cheapest of *tiers* first, escalating to the
+    next one when its verdict footer is missing, its confidence is below
+    *min_confidence* or it finds abuse of *escalate_severity* or higher
+    (an index in the footer levels; None never escalates on severity).
+    The last tier's analysis is always kept.
+    """
+    if not tiers:
+        raise ValueError("The cascade needs at least one tier")
+
+    context = strip_text(context)
+    system_prompt, human_prompt = get_abuse_analyzer_prompts(language, severity, user_context=context)
+    system_prompt += abuse_analyzer_cascade_prompts[language]["system"]
+    params = get_abuse_analyzer_params(text, user_context=context)
+
+    latencies: List[float] = []
+    unparseable: List[bool] = []
+
+    for index, description in enumerate(tiers):
+        start = time.perf_counter()
+        tier_params, _ = fit_abuse_analyzer_params(description, system_prompt, human_prompt, params)
+        response = process_response(invoke_prompt_llm_parser_chain(description, system_prompt, human_prompt, tier_params))
+        latencies.append(time.perf_counter() - start)
+
+        analysis, verdict = parse_cascade_footer(language, response)
+        unparseable.append(verdict is None)
+
+        last = index == len(tiers) - 1
+        confident = verdict is not None and verdict.confidence >= min_confidence
+        serious = (
+            verdict is not None
+            and verdict.abusive
+            and escalate_severity is not None
+            and verdict.severity >= escalate_severity
+        )
+
+        if last or (confident and not serious):
+            break
+
+        logger.debug("Escalating from %s: verdict=%s", description.full_name, verdict)
+
+    result = CascadeResult(analysis, verdict, index, description.full_name, latencies)
+    if stats is not None:
+        stats.record([d.full_name for d in tiers[:index + 1]], result, unparseable)
+
+    return result
@@ -0,0 +1,124 @@
+from padai.chains.base import invoke_prompt_llm_parser_chain
+from padai.config.language import Language
+from padai.config.settings import settings
+from padai.llms.base import ChatModelDescriptionEx
+from padai.llms.tokenizers import TokenCounter, truncate_to_tokens
+from padai.prompts.psychological_abuse import abuse_analyzer_compress_prompts
+from padai.utils.text import process_response
+from contextlib import closing
+from pathlib import Path
+from typing import Literal, Optional
+import hashlib
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+CompressMode = Literal["truncate", "summarize"]
+
+_SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS summaries (
+        response_hash   TEXT        NOT NULL,
+        budget          INTEGER     NOT NULL,
+        compressor      TEXT        NOT NULL,
+        summary         TEXT        NOT NULL,
+        created_at      TEXT        DEFAULT (datetime('now')),
+        PRIMARY KEY (response_hash, budget, compressor)
+    );
+"""
+
+
+def get_response_hash(response: str) -> str:
+    return hashlib.sha256(response.encode()).hexdigest()
+
+
+def get_compressed_responses_path() -> Path:
+    return settings.path_in_cache("compress/summaries.sqlite")
+
+
+class CompressedResponses:
+    """
+    Summaries of analyses keyed by response hash, budget and compressor
+    model, so each analysis is summarized once however many pairs and
+    referees see it.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_compressed_responses_path()
+
+        with closing(self._connect()) as conn:
+            conn.execute(_SQL_CREATE)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, response_hash: str, budget: int, compressor: str) -> Optional[str]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT summary FROM summaries WHERE response_hash = ? AND budget = ? AND compressor = ?",
+                (response_hash, budget, compressor),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, response_hash: str, budget: int, compressor: str, summary: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (response_hash, budget, compressor, summary) VALUES (?, ?, ?, ?)",
+                (response_hash, budget, compressor, summary),
+            )
+            conn.commit()
+
+
+def summarize_response(
+    response: str,
+    budget: int,
+    compressor: ChatModelDescriptionEx,
+    language: Language,
+    store: CompressedResponses,
+) -> str:
+    response_hash = get_response_hash(response)
+
+    summary = store.get(response_hash, budget, compressor.full_name)
+    if summary is None:
+        prompts = abuse_analyzer_compress_prompts[language]
+        summary = process_response(
+            invoke_prompt_llm_parser_chain(
+                compressor,
+                prompts["system"]["default"],
+                prompts["human"]["default"],
+                {"budget": str(budget), "analysis": response},
+                temperature=0,
+            )
+        )
+        store.put(response_hash, budget, compressor.full_name, summary)
+
+    return summary
+
+
+def compress_response(
+    response: str,
+    budget: int,
+    count_tokens: TokenCounter,
+    language: Language,
+    mode: CompressMode = "truncate",
+    compressor: Optional[ChatModelDescriptionEx] = None,
+    store: Optional[CompressedResponses] = None,
+) -> str:
+    """
+    Fit *response* in *budget* tokens as counted by *count_tokens* (the
+    referee's tokenizer, see `get_token_counter`).
+
+    Responses within budget are returned unchanged.  Otherwise they are cut
+    (``"truncate"``) or first summarized by *compressor* (``"summarize"``)
+    and then cut if the summary is still too long.
+    """
+    if count_tokens(response) <= budget:
+        return response
+
+    if mode == "summarize":
+        if compressor is None:
+            raise ValueError("summarize needs a compressor model")
+        response = summarize_response(response, budget, compressor, language, store or CompressedResponses())
+
+    return truncate_to_tokens(response, budget, count_tokens)
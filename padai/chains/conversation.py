@@ -0,0 +1,205 @@
+from padai.chains.abuse_analyzer import get_abuse_analyzer_params, get_abuse_analyzer_prompts
+from padai.chains.base import invoke_prompt_llm_parser_chain
+from padai.config.language import Language
+from padai.config.settings import settings
+from padai.datasets.conversations import ConversationStore
+from padai.llms.base import ChatModelDescriptionEx
+from padai.llms.tokenizers import truncate_to_tokens
+from padai.prompts.psychological_abuse import conversation_summary_prompts
+from padai.utils.text import estimate_tokens, process_response
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+import logging
+import sqlite3
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS watermarks (
+        conversation_id TEXT        NOT NULL,
+        scope           TEXT        NOT NULL,
+        last_id         INTEGER     NOT NULL,
+        summary         TEXT        NOT NULL,
+        updated_at      TEXT        DEFAULT (datetime('now')),
+        PRIMARY KEY (conversation_id, scope)
+    );
+    CREATE TABLE IF NOT EXISTS windows (
+        id              INTEGER     PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT        NOT NULL,
+        scope           TEXT        NOT NULL,
+        first_id        INTEGER     NOT NULL,
+        last_id         INTEGER     NOT NULL,
+        context         TEXT,
+        analysis        TEXT        NOT NULL,
+        summary         TEXT        NOT NULL,
+        created_at      TEXT        DEFAULT (datetime('now'))
+    );
+"""
+
+
+def get_conversation_analyses_path() -> Path:
+    return settings.path_in_home("db/abuse_analyzer/conversations.sqlite")
+
+
+def get_conversation_scope(description: ChatModelDescriptionEx, severity: str) -> str:
+    return f"{description.full_name}/{severity}"
+
+
+class ConversationAnalyses:
+    """
+    Analyses of conversations window by window, with a watermark per
+    (conversation, scope): the id of the last message analysed and the
+    running summary of everything up to it.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_conversation_analyses_path()
+
+        with closing(self._connect()) as conn:
+            conn.executescript(_SQL_CREATE)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_watermark(self, conversation_id: str, scope: str) -> Tuple[int, Optional[str]]:
+        """(last message id analysed, running summary); (0, None) for a new conversation."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT last_id, summary FROM watermarks WHERE conversation_id = ? AND scope = ?",
+                (conversation_id, scope),
+            ).fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    def record_window(
+        self,
+        conversation_id: str,
+        scope: str,
+        first_id: int,
+        last_id: int,
+        context: Optional[str],
+        analysis: str,
+        summary: str,
+    ) -> None:
+        with closing(self._connect()) as conn, conn:    # window and watermark in one transaction
+            conn.execute(
+                "INSERT INTO windows (conversation_id, scope, first_id, last_id, context, analysis, summary) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (conversation_id, scope, first_id, last_id, context, analysis, summary),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO watermarks (conversation_id, scope, last_id, summary) VALUES (?, ?, ?, ?)",
+                (conversation_id, scope, last_id, summary),
+            )
+
+    def windows_df(self, conversation_id: str, scope: str) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                "SELECT first_id, last_id, analysis, summary, created_at FROM windows "
+                "WHERE conversation_id = ? AND scope = ? ORDER BY last_id",
+                conn,
+                params=(conversation_id, scope),
+            )
+
+
+@dataclass
+class ConversationWindow:
+    first_id: int
+    last_id: int
+    messages: str
+    context: Optional[str]
+    analysis: str
+    summary: str
+
+
+def format_conversation_message(row) -> str:
+    sent_at = f"[{row.sent_at:%Y-%m-%d %H:%M}] " if pd.notna(row.sent_at) else ""
+    return f"{sent_at}{row.sender or '?'}: {row.text}"
+
+
+def take_window(df: pd.DataFrame, max_tokens: int) -> pd.DataFrame:
+    """Leading messages of *df* within *max_tokens*; always at least one."""
+    total = 0
+    for count, row in enumerate(df.itertuples(), start=1):
+        total += estimate_tokens(format_conversation_message(row)) + 1
+        if total > max_tokens and count > 1:
+            return df.iloc[:count - 1]
+    return df
+
+
+def analyze_conversation(
+    conversations: ConversationStore,
+    store: ConversationAnalyses,
+    conversation_id: str,
+    description: ChatModelDescriptionEx,
+    language: Language,
+    severity: str = "vigilant",
+    summarizer: Optional[ChatModelDescriptionEx] = None,
+    window_messages: int = 20,
+    window_tokens: int = 2048,
+    summary_tokens: int = 512,
+    on_window: Optional[Callable[[ConversationWindow], None]] = None,
+) -> int:
+    """
+    Analyse the messages of *conversation_id* added since the last run, in
+    windows of at most *window_messages* messages and *window_tokens*
+    tokens.  Each window is analysed with the running summary of the
+    history as its context, and the summary is then updated by
+    *summarizer* (the analysis model by default).
+
+    Every window is committed with the new watermark, so an interrupted run
+    resumes where it stopped.  Returns the number of windows analysed.
+    """
+    summarizer = summarizer or description
+    scope = get_conversation_scope(description, severity)
+    summary_prompts = conversation_summary_prompts[language]
+
+    last_id, summary = store.get_watermark(conversation_id, scope)
+    windows = 0
+
+    while True:
+        df = conversations.get_messages_df(conversation_id, after_id=last_id, limit=window_messages)
+        if df.empty:
+            return windows
+
+        df = take_window(df, window_tokens)
+        messages = "\n".join(format_conversation_message(row) for row in df.itertuples())
+        first_id, last_id = int(df.index[0]), int(df.index[-1])
+
+        system_prompt, human_prompt = get_abuse_analyzer_prompts(language, severity, user_context=summary)
+        analysis = process_response(
+            invoke_prompt_llm_parser_chain(
+                description,
+                system_prompt,
+                human_prompt,
+                get_abuse_analyzer_params(messages, user_context=summary),
+            )
+        )
+
+        new_summary = process_response(
+            invoke_prompt_llm_parser_chain(
+                summarizer,
+                summary_prompts["system"]["default"],
+                summary_prompts["human"]["default"],
+                {
+                    "budget": str(summary_tokens),
+                    "summary": summary or summary_prompts["empty"],
+                    "messages": messages,
+                    "analysis": analysis,
+                },
+                temperature=0,
+            )
+        )
+        new_summary = truncate_to_tokens(new_summary, summary_tokens, estimate_tokens)
+
+        store.record_window(conversation_id, scope, first_id, last_id, summary, analysis, new_summary)
+        logger.info("Conversation %s: messages %d-%d analysed", conversation_id, first_id, last_id)
+
+        if on_window is not None:
+            on_window(ConversationWindow(first_id, last_id, messages, summary, analysis, new_summary))
+
+        summary = new_summary
+        windows += 1
@@ -0,0 +1,262 @@
+from padai.chains.base import build_prompt_llm_parser_chain
+from padai.config.language import Language
+from padai.config.settings import settings
+from padai.llms.base import ChatModelDescriptionEx
+from padai.llms.tokenizers import TokenCounter, get_token_counter
+from padai.prompts.psychological_abuse import abuse_analyzer_prompts, abuse_analyzer_map_reduce_prompts
+from padai.utils.text import process_response, strip_text
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import json
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+_SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS partials (
+        node_hash       TEXT        NOT NULL,
+        model           TEXT        NOT NULL,
+        result          TEXT        NOT NULL,
+        created_at      TEXT        DEFAULT (datetime('now')),
+        PRIMARY KEY (node_hash, model)
+    );
+"""
+
+# A chunk may end early, at a line whose hash is a multiple of this, once it
+# holds half its budget: boundaries then depend on the content around them,
+# not on everything before, so an edit only changes the chunks it touches.
+_BOUNDARY_DIVISOR = 8
+
+
+def get_partial_analyses_path() -> Path:
+    return settings.path_in_cache("map_reduce/partials.sqlite")
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+class PartialAnalyses:
+    """
+    Results of the map and merge steps keyed by node hash and model.  A
+    node hash covers its prompts and inputs (a chunk, or the hashes of the
+    nodes it merges), so only the branches above an edited chunk miss.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_partial_analyses_path()
+
+        with closing(self._connect()) as conn:
+            conn.execute(_SQL_CREATE)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, node_hashes: Sequence[str], model: str) -> Dict[str, str]:
+        with closing(self._connect()) as conn:
+            return {
+                node_hash: result
+                for node_hash in node_hashes
+                for (result,) in conn.execute(
+                    "SELECT result FROM partials WHERE node_hash = ? AND model = ?", (node_hash, model)
+                )
+            }
+
+    def put_many(self, results: Dict[str, str], model: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO partials (node_hash, model, result) VALUES (?, ?, ?)",
+                [(node_hash, model, result) for node_hash, result in results.items()],
+            )
+            conn.commit()
+
+
+def split_to_token_chunks(text: str, max_tokens: int, count_tokens: TokenCounter) -> List[str]:
+    """
+    Split *text* at line boundaries into chunks of at most *max_tokens*
+    (a single longer line is split at spaces), with content-defined
+    boundaries (see `_BOUNDARY_DIVISOR`).
+    """
+    lines: List[str] = []
+    for line in text.splitlines():
+        while count_tokens(line) > max_tokens:
+            words, head = line.split(" "), []
+            while words and count_tokens(" ".join(head + words[:1])) <= max_tokens:
+                head.append(words.pop(0))
+            if not head:    # one enormous word
+                head, words = [words[0][:max_tokens]], [words[0][max_tokens:], *words[1:]]
+            lines.append(" ".join(head))
+            line = " ".join(words)
+        lines.append(line)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    tokens = 0
+
+    for line in lines:
+        line_tokens = count_tokens(line) + 1
+        if current and tokens + line_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, tokens = [], 0
+
+        current.append(line)
+        tokens += line_tokens
+
+        digest = int(hashlib.sha256(line.encode()).hexdigest(), 16)
+        if tokens >= max_tokens // 2 and digest % _BOUNDARY_DIVISOR == 0:
+            chunks.append("\n".join(current))
+            current, tokens = [], 0
+
+    if current:
+        chunks.append("\n".join(current))
+
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def group_nodes(hashes: Sequence[str], fan_in: int) -> List[slice]:
+    """
+    Consecutive groups of between 2 and 2 × *fan_in* nodes (the last one may
+    be smaller), ending at content-defined nodes like chunks do.
+    """
+    groups: List[slice] = []
+    start = 0
+    for end, node_hash in enumerate(hashes, start=1):
+        size = end - start
+        if size == 2 * fan_in or (size >= 2 and int(node_hash, 16) % fan_in == 0):
+            groups.append(slice(start, end))
+            start = end
+    if start < len(hashes):
+        groups.append(slice(start, len(hashes)))
+    return groups
+
+
+@dataclass
+class _Node:
+    hash: str
+    params: Dict[str, str]
+
+
+@dataclass
+class MapReduceStats:
+    calls: int = 0      # map and merge steps sent to the model
+    cached: int = 0     # ... and served from `PartialAnalyses`
+
+
+def _run_nodes(
+    description: ChatModelDescriptionEx,
+    system_prompt: str,
+    human_prompt: str,
+    nodes: List[_Node],
+    store: PartialAnalyses,
+    max_concurrency: int,
+    temperature: Optional[float],
+    stats: MapReduceStats,
+) -> List[str]:
+    results = store.get_many([node.hash for node in nodes], description.full_name)
+    missing = [node for node in nodes if node.hash not in results]
+    stats.cached += len(nodes) - len(missing)
+
+    if missing:
+        chain, disposable = build_prompt_llm_parser_chain(description, system_prompt, human_prompt, temperature)
+        try:
+            responses = chain.batch(
+                [node.params for node in missing],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True,
+            )
+        finally:
+            del chain
+            disposable.dispose()
+
+        # Keep what succeeded before failing, so a rerun only retries the
+        # nodes that failed.
+        computed = {
+            node.hash: process_response(response)
+            for node, response in zip(missing, responses)
+            if not isinstance(response, Exception)
+        }
+        store.put_many(computed, description.full_name)
+        results.update(computed)
+        stats.calls += len(missing)
+
+        errors = [response for response in responses if isinstance(response, Exception)]
+        if errors:
+            logger.warning("%d of %d partial analyses failed with %s", len(errors), len(missing), description.full_name)
+            raise errors[0]
+
+    return [results[node.hash] for node in nodes]
+
+
+def invoke_abuse_analyzer_map_reduce(
+    description: ChatModelDescriptionEx,
+    text: str,
+    language: Language,
+    context: Optional[str] = None,
+    severity: str = "vigilant",
+    chunk_tokens: int = 2048,
+    fan_in: int = 4,
+    max_concurrency: int = 4,
+    temperature: Optional[float] = None,
+    store: Optional[PartialAnalyses] = None,
+    stats: Optional[MapReduceStats] = None,
+) -> str:
+    """
+    Analyse a text too long for one request: findings are extracted from
+    token-bounded chunks in parallel (at most *max_concurrency* requests at a
+    time), merged about *fan_in* at a time level by level, and the last level is
+    written up as one forensic analysis.
+
+    Every map and merge result is cached by node hash (`PartialAnalyses`),
+    so re-running after an edit only recomputes the affected branches.
+    """
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+
+    store = store or PartialAnalyses()
+    stats = stats if stats is not None else MapReduceStats()
+    prompts = abuse_analyzer_map_reduce_prompts[language]
+    system_prompt = abuse_analyzer_prompts[language]["system"][severity]
+    context = strip_text(context) or prompts["no_context"]
+
+    chunks = split_to_token_chunks(text, chunk_tokens, get_token_counter(description))
+    logger.info("Map-reduce over %d chunks with %s", len(chunks), description.full_name)
+
+    # Chunk positions are only prompt decoration; the hash leaves them out so
+    # that inserting a chunk does not invalidate all the ones after it.
+    map_prompt = prompts["human"]["map"]
+    nodes = [
+        _Node(
+            _hash("map", system_prompt, map_prompt, context, chunk),
+            {"index": str(index), "count": str(len(chunks)), "user_context": context, "fragment": chunk},
+        )
+        for index, chunk in enumerate(chunks, start=1)
+    ]
+    results = _run_nodes(description, system_prompt, map_prompt, nodes, store, max_concurrency, temperature, stats)
+    hashes = [node.hash for node in nodes]
+
+    def _findings(group: Sequence[str]) -> str:
+        return "\n\n".join(prompts["findings"].format(index=i, text=r) for i, r in enumerate(group, start=1))
+
+    merge_prompt = prompts["human"]["merge"]
+    while len(results) > fan_in:
+        nodes = [
+            _Node(
+                _hash("merge", system_prompt, merge_prompt, *hashes[group]),
+                {"findings": _findings(results[group])},
+            )
+            for group in group_nodes(hashes, fan_in)
+        ]
+        results = _run_nodes(description, system_prompt, merge_prompt, nodes, store, max_concurrency, temperature, stats)
+        hashes = [node.hash for node in nodes]
+
+    final_prompt = prompts["human"]["final"]
+    node = _Node(
+        _hash("final", system_prompt, final_prompt, context, *hashes),
+        {"user_context": context, "findings": _findings(results)},
+    )
+    return _run_nodes(description, system_prompt, final_prompt, [node], store, max_concurrency, temperature, stats)[0]
@@ -0,0 +1,160 @@
+from padai.chains.abuse_analyzer import get_abuse_analyzer_params, get_abuse_analyzer_prompts
+from padai.chains.base import get_chain_fingerprint, invoke_prompt_llm_parser_chain
+from padai.chains.budget import fit_abuse_analyzer_params
+from padai.config.language import Language
+from padai.config.settings import settings
+from padai.llms.base import ChatModelDescriptionEx
+from padai.utils.text import strip_text
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+import logging
+import sqlite3
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# The UI analyses predefined messages at temperature 0 unless the user moves
+# the slider; precomputed results are only useful for that setting.
+PRECOMPUTE_TEMPERATURE = 0.0
+
+_SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS analyses (
+        fingerprint       TEXT        PRIMARY KEY,
+        communication_id  INTEGER     NOT NULL,
+        preset            TEXT        NOT NULL,
+        model             TEXT        NOT NULL,
+        response          TEXT        NOT NULL,
+        created_at        TEXT        DEFAULT (datetime('now'))
+    );
+"""
+
+
+def get_precomputed_analyses_path() -> Path:
+    return settings.path_in_home("db/abuse_analyzer/precomputed.sqlite")
+
+
+class PrecomputedAnalyses:
+    """
+    Materialized store of analyses keyed by chain fingerprint
+    (`get_chain_fingerprint`), so a lookup only hits when model, prompts
+    and message are exactly those that were precomputed.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_precomputed_analyses_path()
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")    # UI reads while the refresh writes
+            conn.execute(_SQL_CREATE)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, fingerprint: str) -> Optional[str]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT response FROM analyses WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return row[0] if row else None
+
+    def fingerprints(self) -> Set[str]:
+        with closing(self._connect()) as conn:
+            return {row[0] for row in conn.execute("SELECT fingerprint FROM analyses")}
+
+    def put(self, fingerprint: str, response: str, *, communication_id: int, preset: str, model: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (fingerprint, communication_id, preset, model, response) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, communication_id, preset, model, response),
+            )
+            conn.commit()
+
+
+@dataclass
+class PrecomputeTask:
+    communication_id: int
+    preset: str
+    description: ChatModelDescriptionEx
+    system_prompt: str
+    human_prompt: str
+    params: Dict[str, str]
+    fingerprint: str
+
+
+def iter_precompute_tasks(
+    communications_df: pd.DataFrame,
+    presets: Iterable[str],
+    descriptions: Iterable[ChatModelDescriptionEx],
+    language: Language,
+) -> Iterator[PrecomputeTask]:
+    """
+    Yield one task per (message, preset, model), built exactly as the UI
+    builds its request when a predefined message and preset are selected.
+    """
+    df = communications_df[communications_df["language"] == language.value]
+    presets = list(presets)
+    descriptions = list(descriptions)
+
+    for id_, row in df.iterrows():
+        text = row["text"]
+        context = strip_text(row["context"] if pd.notna(row["context"]) else "")
+        params = get_abuse_analyzer_params(text, user_context=context)
+
+        for preset in presets:
+            system_prompt, human_prompt = get_abuse_analyzer_prompts(language, preset, user_context=context)
+
+            for description in descriptions:
+                # Fitted to the model's budget as the UI does before it
+                # fingerprints; not recorded, most tasks are never run.
+                fitted, _ = fit_abuse_analyzer_params(
+                    description, system_prompt, human_prompt, params, stats=None
+                )
+                yield PrecomputeTask(
+                    communication_id=int(id_),
+                    preset=preset,
+                    description=description,
+                    system_prompt=system_prompt,
+                    human_prompt=human_prompt,
+                    params=fitted,
+                    fingerprint=get_chain_fingerprint(
+                        description, system_prompt, human_prompt, fitted, temperature=PRECOMPUTE_TEMPERATURE
+                    ),
+                )
+
+
+def get_missing_precompute_tasks(store: PrecomputedAnalyses, tasks: Iterable[PrecomputeTask]) -> List[PrecomputeTask]:
+    done = store.fingerprints()
+    return [task for task in tasks if task.fingerprint not in done]
+
+
+def precompute(store: PrecomputedAnalyses, tasks: Iterable[PrecomputeTask]) -> int:
+    """Run *tasks* and store their responses; return how many succeeded."""
+    count = 0
+
+    for task in tasks:
+        logger.info("Precomputing %s / %s / %s", task.communication_id, task.preset, task.description.full_name)
+
+        try:
+            response = invoke_prompt_llm_parser_chain(
+                task.description,
+                task.system_prompt,
+                task.human_prompt,
+                task.params,
+                temperature=PRECOMPUTE_TEMPERATURE,
+            )
+        except Exception:
+            logger.exception("Precompute failed for %s", task.description.full_name)
+            continue
+
+        store.put(
+            task.fingerprint,
+            response,
+            communication_id=task.communication_id,
+            preset=task.preset,
+            model=task.description.full_name,
+        )
+        count += 1
+
+    return count
@@ -0,0 +1,268 @@
+from padai.chains.base import get_chain_fingerprint
+from padai.config.semantic_cache import SemanticCacheSettings
+from padai.config.settings import settings
+from padai.datasets.base import build_name_words, get_names_pool, strip_accents
+from padai.llms.base import MODEL_LOAD_LOCK, ChatModelDescriptionEx
+from padai.utils.text import strip_text
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Optional, Tuple
+import logging
+import re
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NAME_PLACEHOLDER = "<nombre>"
+
+# The names pool lists rare names that are also ordinary words ("Ya",
+# "Manana"); only names this common are replaced.
+NAME_MIN_FREQUENCY = 1000
+
+_SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS entries (
+        id              INTEGER     PRIMARY KEY AUTOINCREMENT,
+        scope           TEXT        NOT NULL,
+        normalized      TEXT        NOT NULL,
+        embedding       BLOB        NOT NULL,
+        response        TEXT        NOT NULL,
+        created_at      TEXT        DEFAULT (datetime('now'))
+    );
+    CREATE INDEX IF NOT EXISTS entries_scope ON entries (scope);
+    CREATE TABLE IF NOT EXISTS lookups (
+        id              INTEGER     PRIMARY KEY AUTOINCREMENT,
+        scope           TEXT        NOT NULL,
+        normalized      TEXT        NOT NULL,
+        neighbour_id    INTEGER,
+        similarity      REAL,
+        threshold       REAL        NOT NULL,
+        hit             INTEGER     NOT NULL,
+        created_at      TEXT        DEFAULT (datetime('now'))
+    );
+"""
+
+_WORD_RE = re.compile(r"\w+")
+_NON_WORD_RE = re.compile(r"[^\w<>]+")
+
+
+def get_semantic_cache_path() -> Path:
+    return settings.path_in_cache("semantic/entries.sqlite")
+
+
+def get_semantic_index_path(scope: str) -> Path:
+    return settings.path_in_cache(f"semantic/index/{scope}.hnsw")
+
+
+def get_semantic_scope(
+    description: ChatModelDescriptionEx,
+    system_prompt: str,
+    human_prompt: str,
+    temperature: Optional[float] = None,
+    top_p: Optional[float] = None,
+) -> str:
+    """Fingerprint of the chain without its variables: analyses are only reused within a scope."""
+    return get_chain_fingerprint(description, system_prompt, human_prompt, {}, temperature, top_p)
+
+
+@lru_cache(maxsize=None)
+def get_name_words(language: str) -> FrozenSet[str]:
+    pool = get_names_pool()
+    return build_name_words(pool[language], NAME_MIN_FREQUENCY) if language in pool else frozenset()
+
+
+def normalize_for_semantic_cache(text: str, names: FrozenSet[str]) -> str:
+    """
+    Capitalized words found in *names* become a placeholder, so messages
+    that only differ in the (pseudonymized) names match; then case,
+    punctuation and whitespace are normalized.
+    """
+    def _replace(match: re.Match) -> str:
+        word = match.group(0)
+        if word.istitle() and strip_accents(word).lower() in names:
+            return NAME_PLACEHOLDER
+        return word
+
+    text = _WORD_RE.sub(_replace, text).lower()
+    return _NON_WORD_RE.sub(" ", text).strip()
+
+
+def get_semantic_cache_key(text: str, context: Optional[str], language: str) -> str:
+    names = get_name_words(language)
+    key = normalize_for_semantic_cache(text, names)
+    context = strip_text(context)
+    if context:
+        key += "\n" + normalize_for_semantic_cache(context, names)
+    return key
+
+
+@lru_cache(maxsize=None)
+def _get_encoder(model: str):
+    from sentence_transformers import SentenceTransformer
+
+    with MODEL_LOAD_LOCK:
+        return SentenceTransformer(model, device="cpu")
+
+
+def _has_hnswlib() -> bool:
+    try:
+        import hnswlib  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ScopeIndex:
+    """
+    Nearest-neighbour index of the entries of one scope: an hnswlib index
+    persisted next to the store when hnswlib is installed, a brute-force
+    search over the stored embeddings otherwise.
+    """
+
+    def __init__(self, scope: str, ids: np.ndarray, vectors: np.ndarray) -> None:
+        self.scope = scope
+        self._hnsw = None
+        self._ids, self._vectors = ids, vectors
+
+        if _has_hnswlib() and len(ids):
+            self._hnsw = self._load_hnsw(ids, vectors)
+
+    def _load_hnsw(self, ids: np.ndarray, vectors: np.ndarray):
+        import hnswlib
+
+        path = get_semantic_index_path(self.scope)
+        index = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+
+        if path.exists():
+            index.load_index(str(path), max_elements=len(ids))
+            if index.get_current_count() == len(ids):
+                return index
+            logger.info("Rebuilding stale semantic index %s", path)
+            index = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+
+        index.init_index(max_elements=len(ids), ef_construction=200, M=16)
+        index.add_items(vectors, ids)
+        index.save_index(str(path))
+        return index
+
+    def add(self, id_: int, vector: np.ndarray) -> None:
+        self._ids = np.append(self._ids, id_)
+        self._vectors = np.vstack([self._vectors, vector]) if len(self._vectors) else vector[None, :]
+
+        if self._hnsw is None:
+            if _has_hnswlib():
+                self._hnsw = self._load_hnsw(self._ids, self._vectors)
+            return
+
+        if self._hnsw.get_max_elements() < len(self._ids):
+            self._hnsw.resize_index(2 * len(self._ids))
+        self._hnsw.add_items(vector[None, :], [id_])
+        self._hnsw.save_index(str(get_semantic_index_path(self.scope)))
+
+    def nearest(self, vector: np.ndarray) -> Optional[Tuple[int, float]]:
+        if not len(self._ids):
+            return None
+
+        if self._hnsw is not None:
+            self._hnsw.set_ef(64)
+            labels, distances = self._hnsw.knn_query(vector, k=1)
+            return int(labels[0][0]), 1.0 - float(distances[0][0])
+
+        similarities = self._vectors @ vector     # embeddings are normalized
+        best = int(np.argmax(similarities))
+        return int(self._ids[best]), float(similarities[best])
+
+
+class SemanticCache:
+    """
+    Analyses reused for messages that are *nearly* the same as one analysed
+    before: same chain scope (model, parameters and prompts, see
+    `get_semantic_scope`) and a normalized message + context whose
+    embedding is at least ``threshold`` cosine-similar.
+
+    Every lookup is audited with its best similarity, so the threshold can
+    be validated with `padai.commands.semantic_cache_audit`.
+    """
+
+    def __init__(self, path: Optional[Path] = None, config: Optional[SemanticCacheSettings] = None):
+        self.path = path or get_semantic_cache_path()
+        self.config = config or settings.semantic_cache
+        self._indexes: Dict[str, _ScopeIndex] = {}
+        self._lock = threading.Lock()
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SQL_CREATE)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _embed(self, key: str) -> np.ndarray:
+        encoder = _get_encoder(self.config.model)
+        return encoder.encode([key], normalize_embeddings=True, convert_to_numpy=True)[0].astype(np.float32)
+
+    def _index(self, scope: str) -> _ScopeIndex:
+        index = self._indexes.get(scope)
+        if index is None:
+            with closing(self._connect()) as conn:
+                rows = conn.execute("SELECT id, embedding FROM entries WHERE scope = ? ORDER BY id", (scope,)).fetchall()
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            vectors = np.array([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            index = self._indexes[scope] = _ScopeIndex(scope, ids, vectors)
+        return index
+
+    def lookup(self, scope: str, text: str, context: Optional[str], language: str) -> Optional[str]:
+        key = get_semantic_cache_key(text, context, language)
+        vector = self._embed(key)
+
+        with self._lock:
+            nearest = self._index(scope).nearest(vector)
+
+        neighbour_id, similarity = nearest if nearest is not None else (None, None)
+        hit = similarity is not None and similarity >= self.config.threshold
+
+        with closing(self._connect()) as conn:
+            if self.config.audit:
+                conn.execute(
+                    "INSERT INTO lookups (scope, normalized, neighbour_id, similarity, threshold, hit) VALUES (?, ?, ?, ?, ?, ?)",
+                    (scope, key, neighbour_id, similarity, self.config.threshold, int(hit)),
+                )
+                conn.commit()
+
+            if not hit:
+                return None
+            row = conn.execute("SELECT response FROM entries WHERE id = ?", (neighbour_id,)).fetchone()
+
+        logger.info("Semantic cache hit (similarity %.3f)", similarity)
+        return row[0] if row else None
+
+    def put(self, scope: str, text: str, context: Optional[str], language: str, response: str) -> None:
+        key = get_semantic_cache_key(text, context, language)
+        vector = self._embed(key)
+
+        with self._lock:
+            index = self._index(scope)     # loaded before the insert, which it must not see yet
+            with closing(self._connect()) as conn:
+                cursor = conn.execute(
+                    "INSERT INTO entries (scope, normalized, embedding, response) VALUES (?, ?, ?, ?)",
+                    (scope, key, vector.tobytes(), response),
+                )
+                conn.commit()
+            index.add(cursor.lastrowid, vector)
+
+    def lookups_df(self) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                "SELECT l.id, l.scope, l.normalized, e.normalized AS neighbour, l.similarity, l.threshold, l.hit, l.created_at "
+                "FROM lookups l LEFT JOIN entries e ON e.id = l.neighbour_id ORDER BY l.id",
+                conn,
+            )
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """The semantic cache when it is enabled, None otherwise."""
+    return SemanticCache() if settings.semantic_cache.enabled else None
@@ -0,0 +1,221 @@
+from padai.chains.base import invoke_prompt_llm_parser_chain
+from padai.config.language import Language
+from padai.config.settings import settings
+from padai.llms.base import ChatModelDescriptionEx
+from padai.prompts.psychological_abuse import abuse_verdict_prompts, abuse_verdict_responses
+from padai.utils.text import process_response
+from contextlib import closing
+from pathlib import Path
+from typing import Optional, Sequence
+import hashlib
+import logging
+import sqlite3
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS labels (
+        text_hash       TEXT        PRIMARY KEY,
+        text            TEXT        NOT NULL,
+        label           INTEGER     NOT NULL,
+        source          TEXT        NOT NULL,
+        created_at      TEXT        DEFAULT (datetime('now'))
+    );
+"""
+
+
+def get_text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def get_triage_labels_path() -> Path:
+    return settings.path_in_home("db/triage/labels.sqlite")
+
+
+def get_triage_classifier_path() -> Path:
+    return settings.path_in_home("models/triage/classifier.joblib")
+
+
+class TriageLabels:
+    """
+    Messages labelled as abusive (1) or not (0), keyed by text hash, with
+    where the label came from: ``"dataset"`` or the full name of the model
+    that gave the verdict.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_triage_labels_path()
+
+        with closing(self._connect()) as conn:
+            conn.execute(_SQL_CREATE)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, text: str) -> Optional[int]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT label FROM labels WHERE text_hash = ?", (get_text_hash(text),)).fetchone()
+        return row[0] if row else None
+
+    def put(self, text: str, label: int, source: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO labels (text_hash, text, label, source) VALUES (?, ?, ?, ?)",
+                (get_text_hash(text), text, int(label), source),
+            )
+            conn.commit()
+
+    def to_df(self) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query("SELECT text, label, source FROM labels ORDER BY created_at", conn)
+
+
+def parse_abuse_verdict(language: Language, response: str) -> Optional[int]:
+    responses = abuse_verdict_responses[language]
+    words = set(response.upper().replace(".", " ").split())
+
+    abuse, none = responses["abuse"] in words, responses["none"] in words
+    if abuse == none:
+        return None
+    return int(abuse)
+
+
+def get_abuse_verdict(description: ChatModelDescriptionEx, text: str, language: Language) -> Optional[int]:
+    """One-word verdict of *description* on *text*: 1 abusive, 0 not, None if unparseable."""
+    prompts = abuse_verdict_prompts[language]
+    responses = abuse_verdict_responses[language]
+
+    response = process_response(
+        invoke_prompt_llm_parser_chain(
+            description,
+            prompts["system"]["default"],
+            prompts["human"]["default"],
+            {"text": text, "abuse": responses["abuse"], "none": responses["none"]},
+            temperature=0,
+        )
+    )
+
+    verdict = parse_abuse_verdict(language, response)
+    if verdict is None:
+        logger.warning("Unparseable verdict from %s: %r", description.full_name, response)
+    return verdict
+
+
+def build_triage_pipeline():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    # Character n-grams cope with typos, slang and inflected Spanish forms
+    # far better than words do on a small training set.
+    return make_pipeline(
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), sublinear_tf=True, lowercase=True, min_df=1),
+        LogisticRegression(class_weight="balanced", max_iter=1000),
+    )
+
+
+def get_cross_validated_scores(texts: Sequence[str], labels: Sequence[int], folds: int = 5) -> np.ndarray:
+    """Out-of-fold abuse probabilities, for choosing a threshold without training-set optimism."""
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    labels = np.asarray(labels)
+    folds = min(folds, int(np.bincount(labels, minlength=2).min()))
+    if folds < 2:
+        raise ValueError("Cross-validation needs at least two examples of each label")
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=0)
+    return cross_val_predict(build_triage_pipeline(), list(texts), labels, cv=cv, method="predict_proba")[:, 1]
+
+
+def get_recall_cost_curve(scores: Sequence[float], labels: Sequence[int]) -> pd.DataFrame:
+    """
+    For every candidate threshold, the recall of abusive messages sent to the
+    LLM (score >= threshold) and the cost, as the fraction of all messages
+    sent.
+    """
+    scores, labels = np.asarray(scores), np.asarray(labels)
+    order = np.argsort(-scores, kind="stable")
+    scores, labels = scores[order], labels[order]
+
+    last = np.r_[scores[1:] != scores[:-1], True]    # last position of each distinct score
+    sent = np.arange(1, len(scores) + 1)[last]
+    positives = np.cumsum(labels)[last]
+
+    return pd.DataFrame({
+        "threshold": scores[last],
+        "recall": positives / max(labels.sum(), 1),
+        "cost": sent / len(scores),
+    })
+
+
+def choose_threshold(curve: pd.DataFrame, target_recall: float) -> float:
+    """Highest threshold of *curve* reaching *target_recall*."""
+    reached = curve[curve["recall"] >= target_recall]
+    return float(reached["threshold"].max()) if not reached.empty else float(curve["threshold"].min())
+
+
+class TriageClassifier:
+    """
+    Cheap CPU classifier scoring how likely a message is to be abusive, so
+    that only messages above the threshold (or just below it) are sent to
+    the expensive LLM analysis.
+    """
+
+    def __init__(self, pipeline, threshold: float):
+        self.pipeline = pipeline
+        self.threshold = threshold
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[int], threshold: float) -> "TriageClassifier":
+        pipeline = build_triage_pipeline()
+        pipeline.fit(list(texts), np.asarray(labels))
+        return cls(pipeline, threshold)
+
+    def score(self, texts: Sequence[str], batch_size: int = 4096) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty(0)
+        return np.concatenate([
+            self.pipeline.predict_proba(texts[start:start + batch_size])[:, 1]
+            for start in range(0, len(texts), batch_size)
+        ])
+
+    def needs_analysis(
+        self,
+        texts: Sequence[str],
+        threshold: Optional[float] = None,
+        uncertainty: float = 0.0,
+    ) -> np.ndarray:
+        """Mask of the *texts* that should go to the LLM."""
+        threshold = self.threshold if threshold is None else threshold
+        return self.score(texts) >= threshold - uncertainty
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        import joblib
+
+        path = path or get_triage_classifier_path()
+        joblib.dump({"pipeline": self.pipeline, "threshold": self.threshold}, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "TriageClassifier":
+        import joblib
+
+        data = joblib.load(path or get_triage_classifier_path())
+        return cls(data["pipeline"], data["threshold"])
+
+
+def load_triage_classifier() -> Optional[TriageClassifier]:
+    """The trained classifier when triage is enabled, None otherwise."""
+    if not settings.triage.enabled:
+        return None
+
+    path = get_triage_classifier_path()
+    if not path.exists():
+        logger.warning("Triage is enabled but no classifier has been trained (%s)", path)
+        return None
+
+    return TriageClassifier.load(path)
@@ -0,0 +1,187 @@
+from padai.chains.abuse_analyzer import AnalyzerInput
+from padai.chains.base import build_prompt, get_chat_model_params
+from padai.chains.budget import fit_abuse_analyzer_params
+from padai.config.language import Language
+from padai.llms.base import ChatModelDescriptionEx, get_chat_model
+from padai.llms.disposable import make_disposable
+from padai.prompts.psychological_abuse import abuse_screening_prompts
+from padai.utils.text import process_response, strip_text
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+import logging
+import re
+import sys
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Keys of the "categories" of `abuse_screening_prompts`.
+AbuseCategory = Literal[
+    "insult",
+    "humiliation",
+    "contempt",
+    "blame",
+    "gaslighting",
+    "manipulation",
+    "control",
+    "isolation",
+    "jealousy",
+    "threat",
+]
+
+# Engines whose chat models implement provider-side structured output
+# (JSON schema or tool calling); the rest are asked for JSON in the prompt,
+# constrained while decoding on HuggingFace when lm-format-enforcer is
+# installed.
+_STRUCTURED_OUTPUT_ENGINES = {"openai", "bedrock", "google"}
+
+_MAX_EVIDENCE = 3
+
+
+class AbuseVerdict(BaseModel):
+    """Compact screening verdict of one message, in place of a written analysis."""
+
+    abusive: bool = Field(description="Whether the message shows any sign of psychological abuse")
+    severity: int = Field(ge=0, le=3, description="0 none, 1 low, 2 medium, 3 high")
+    categories: List[AbuseCategory] = Field(default_factory=list, description="Kinds of abuse present")
+    evidence: List[str] = Field(default_factory=list, description="Up to 3 short literal quotes backing the verdict")
+    confidence: int = Field(ge=0, le=100, description="Confidence in the verdict, 0-100")
+
+    @field_validator("evidence")
+    @classmethod
+    def _keep_first_evidence(cls, evidence: List[str]) -> List[str]:
+        return evidence[:_MAX_EVIDENCE]
+
+
+def parse_abuse_verdict(response: str) -> AbuseVerdict:
+    """Parse the JSON object of a text *response* (reasoning and code fences are ignored)."""
+    match = re.search(r"\{.*\}", process_response(response), flags=re.DOTALL)
+    if match is None:
+        raise ValueError(f"No JSON object in response: {response[:200]!r}")
+    return AbuseVerdict.model_validate_json(match.group(0))
+
+
+class _JsonSchemaConstraint:
+    """
+    ``prefix_allowed_tokens_fn`` with a stable repr, so that the LLM cache key
+    of the constrained HuggingFace model is the same in every process.
+    """
+
+    def __init__(self, tokenizer, schema_name: str, schema: Dict):
+        from lmformatenforcer import JsonSchemaParser
+        from lmformatenforcer.integrations.transformers import build_transformers_prefix_allowed_tokens_fn
+
+        self._fn = build_transformers_prefix_allowed_tokens_fn(tokenizer, JsonSchemaParser(schema))
+        self._name = schema_name
+
+    def __call__(self, batch_id, input_ids):
+        return self._fn(batch_id, input_ids)
+
+    def __repr__(self) -> str:
+        return f"json_schema:{self._name}"
+
+
+def _constrain_huggingface(llm):
+    # Only an in-process ChatHuggingFace exposes its tokenizer; a model run in
+    # a worker process (`WorkerChatModel`) is left unconstrained.  Checking
+    # sys.modules avoids importing langchain_huggingface just to ask.
+    module = sys.modules.get("langchain_huggingface")
+    if module is None or not isinstance(llm, module.ChatHuggingFace):
+        logger.info("%s is not an in-process ChatHuggingFace, verdicts are not constrained", type(llm).__name__)
+        return llm
+
+    try:
+        constraint = _JsonSchemaConstraint(
+            llm.llm.pipeline.tokenizer, AbuseVerdict.__name__, AbuseVerdict.model_json_schema()
+        )
+    except ImportError:
+        logger.info("lm-format-enforcer is not installed, HuggingFace verdicts are not constrained")
+        return llm
+
+    return llm.bind(pipeline_kwargs={"prefix_allowed_tokens_fn": constraint})
+
+
+def get_abuse_screening_prompts(language: Language) -> Tuple[str, str]:
+    prompts = abuse_screening_prompts[language]
+    return prompts["system"]["default"], prompts["human"]["default"]
+
+
+def get_abuse_screening_params(language: Language, user_input: str, user_context: Optional[str] = None) -> Dict[str, str]:
+    prompts = abuse_screening_prompts[language]
+    return {
+        "categories": "\n".join(f"  - {key}: {text}" for key, text in prompts["categories"].items()),
+        "user_input": user_input,
+        "user_context": strip_text(user_context) or prompts["no_context"],
+    }
+
+
+def build_abuse_screening_chain(
+    description: ChatModelDescriptionEx,
+    language: Language,
+    temperature: Optional[float] = 0,
+):
+    """
+    Chain from screening params to an `AbuseVerdict`, and the disposable of
+    its model: provider structured output where the engine has it, else
+    JSON parsed from the text (constrained on HuggingFace, see
+    `_STRUCTURED_OUTPUT_ENGINES`).
+    """
+    llm = get_chat_model(description.engine, get_chat_model_params(description, temperature))
+    prompt = build_prompt(*get_abuse_screening_prompts(language))
+
+    if description.engine in _STRUCTURED_OUTPUT_ENGINES:
+        chain = prompt | llm.with_structured_output(AbuseVerdict)
+    else:
+        constrained = _constrain_huggingface(llm) if description.engine == "huggingface" else llm
+        chain = prompt | constrained | StrOutputParser() | RunnableLambda(parse_abuse_verdict)
+
+    return chain, make_disposable(llm)
+
+
+def invoke_abuse_screening(
+    description: ChatModelDescriptionEx,
+    messages: Sequence[AnalyzerInput],
+    language: Language,
+    temperature: Optional[float] = 0,
+    max_concurrency: int = 4,
+) -> List[Optional[AbuseVerdict]]:
+    """
+    Screen *messages* with *description*, at most *max_concurrency* requests
+    at a time.  Returns one verdict per message, in order; None where the
+    model failed or its output did not validate.
+    """
+    system_prompt, human_prompt = get_abuse_screening_prompts(language)
+    batch = [
+        fit_abuse_analyzer_params(
+            description, system_prompt, human_prompt, get_abuse_screening_params(language, text, context)
+        )[0]
+        for text, context in messages
+    ]
+
+    chain, disposable = build_abuse_screening_chain(description, language, temperature)
+    try:
+        results = chain.batch(batch, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+    finally:
+        del chain
+        disposable.dispose()
+
+    verdicts: List[Optional[AbuseVerdict]] = []
+    for index, result in enumerate(results):
+        if isinstance(result, Exception):
+            logger.warning("No verdict for message %d from %s: %s", index, description.full_name, result)
+            result = None
+        verdicts.append(result)
+
+    return verdicts
+
+
+def verdicts_df(texts: Sequence[str], verdicts: Sequence[Optional[AbuseVerdict]]) -> pd.DataFrame:
+    """Verdicts as rows, the most severe and confident first; missing verdicts last."""
+    rows = [
+        {"text": text, **(verdict.model_dump() if verdict is not None else {})}
+        for text, verdict in zip(texts, verdicts)
+    ]
+    df = pd.DataFrame(rows, columns=["text", *AbuseVerdict.model_fields])
+    return df.sort_values(["severity", "confidence"], ascending=False, na_position="last", kind="stable")
@@ -0,0 +1,101 @@
+"""
+analyze_cascade  –  analyse the predefined messages with the model cascade
+and report how often each tier was enough.
+
+Every message goes to the cheapest tier first and climbs the ladder
+(`padai.llms.available.default_cascade_tiers`, or ``--tiers``) only when the
+verdict footer of the analysis is missing, not confident enough, or reports
+serious abuse.  The report shows, per tier, calls, accepted analyses (hit
+rate), unparseable footers and mean latency, plus the latency saved against
+sending everything to the top tier.
+
+Usage
+-----
+    python -m padai.commands.analyze_cascade
+    python -m padai.commands.analyze_cascade --tiers gpt-4.1-nano gpt-4.1-mini gpt-4.1 --min-confidence 80
+    python -m padai.commands.analyze_cascade --escalate-severity never --limit 2
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+
+from padai.chains.budget import BUDGET_STATS
+from padai.chains.cascade import CascadeStats, invoke_abuse_analyzer_cascade
+from padai.config.settings import settings
+from padai.datasets.psychological_abuse import get_communications_df, get_communications_messages
+from padai.llms.available import default_available_models, default_cascade_tiers
+from padai.prompts.psychological_abuse import abuse_analyzer_cascade_prompts, abuse_analyzer_prompts
+from padai.utils.llm_cache import set_llm_sqlite_cache
+from padai.utils.text import make_label
+
+
+def main(argv: list[str] | None = None) -> None:
+    models = {m.id: m for m in default_available_models}
+    levels = abuse_analyzer_cascade_prompts[settings.language]["footer"]["levels"]
+
+    parser = argparse.ArgumentParser(
+        description="Analyse the predefined messages with the model cascade and report per-tier hit rates."
+    )
+    parser.add_argument(
+        "--tiers",
+        nargs="+",
+        choices=list(models),
+        default=[m.id for m in default_cascade_tiers],
+        metavar="ID",
+        help="Model ids, cheapest first (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--severity",
+        choices=list(abuse_analyzer_prompts[settings.language]["system"]),
+        default="vigilant",
+        help="System-prompt preset (default: vigilant)",
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=int,
+        default=70,
+        help="Escalate verdicts less confident than this, 0-100 (default: 70)",
+    )
+    parser.add_argument(
+        "--escalate-severity",
+        choices=[*levels, "never"],
+        default=levels[-1],
+        help=f"Escalate abuse of this severity or higher (default: {levels[-1]})",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Only analyse the first N predefined messages")
+    args = parser.parse_args(argv)
+
+    set_llm_sqlite_cache()
+
+    messages = get_communications_messages(get_communications_df(), language=settings.language, limit=args.limit)
+
+    tiers = [models[id_] for id_ in args.tiers]
+    escalate_severity = None if args.escalate_severity == "never" else levels.index(args.escalate_severity)
+    stats = CascadeStats()
+
+    for text, context in messages:
+        result = invoke_abuse_analyzer_cascade(
+            tiers,
+            text,
+            settings.language,
+            context=context,
+            severity=args.severity,
+            min_confidence=args.min_confidence,
+            escalate_severity=escalate_severity,
+            stats=stats,
+        )
+        print(f"{make_label(text, width=60):<62} → {result.model} ({result.verdict})")
+
+    print()
+    print(stats.as_df().to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+
+    saved = stats.latency_saved(tiers[-1].full_name)
+    if saved is not None:
+        print(f"Latency saved against {tiers[-1].full_name} alone: {saved:.1f}s")
+
+    BUDGET_STATS.log_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+analyze_conversation  –  analyse the messages of an imported conversation
+that have not been analysed yet.
+
+Messages (see `padai.commands.ingest_chat_export`) are analysed in windows,
+each with a compact summary of the history before it as context; the summary
+is updated after every window and stored with the watermark of the last
+message covered.  Re-running after importing an updated export only analyses
+the new messages, so the cost grows with them and not with the history.
+
+Usage
+-----
+    python -m padai.commands.analyze_conversation CONVERSATION_ID --model gpt-5-mini
+    python -m padai.commands.analyze_conversation CONVERSATION_ID --model gpt-5 --summarizer gpt-5-nano --window 40
+    python -m padai.commands.analyze_conversation CONVERSATION_ID --model gpt-5-mini --show
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+
+from padai.chains.conversation import (
+    ConversationAnalyses,
+    ConversationWindow,
+    analyze_conversation,
+    get_conversation_scope,
+)
+from padai.config.settings import settings
+from padai.datasets.conversations import ConversationStore
+from padai.llms.available import default_available_models
+from padai.prompts.psychological_abuse import abuse_analyzer_prompts
+from padai.utils.llm_cache import set_llm_sqlite_cache
+from padai.utils.text import make_label
+
+
+def _print_window(window: ConversationWindow) -> None:
+    print(f"── messages {window.first_id}-{window.last_id} ──")
+    print(window.analysis)
+    print()
+
+
+def main(argv: list[str] | None = None) -> None:
+    models = {m.id: m for m in default_available_models}
+
+    parser = argparse.ArgumentParser(
+        description="Analyse the new messages of an imported conversation, window by window."
+    )
+    parser.add_argument("conversation", help="Conversation id, as printed by ingest_chat_export")
+    parser.add_argument("--model", choices=list(models), required=True, metavar="ID", help="Analysis model id")
+    parser.add_argument("--summarizer", choices=list(models), metavar="ID", help="Model updating the history summary (default: --model)")
+    parser.add_argument(
+        "--severity",
+        choices=list(abuse_analyzer_prompts[settings.language]["system"]),
+        default="vigilant",
+        help="System-prompt preset (default: vigilant)",
+    )
+    parser.add_argument("--window", type=int, default=20, help="Messages per window (default: 20)")
+    parser.add_argument("--window-tokens", type=int, default=2048, help="Token limit of a window (default: 2048)")
+    parser.add_argument("--summary-tokens", type=int, default=512, help="Token limit of the history summary (default: 512)")
+    parser.add_argument("--show", action="store_true", help="Print the stored windows instead of analysing")
+    args = parser.parse_args(argv)
+
+    description = models[args.model]
+    store = ConversationAnalyses()
+
+    if args.show:
+        df = store.windows_df(args.conversation, get_conversation_scope(description, args.severity))
+        for row in df.itertuples():
+            print(f"{row.first_id:>8}-{row.last_id:<8} {make_label(row.analysis, width=100)}")
+        return
+
+    set_llm_sqlite_cache()
+    windows = analyze_conversation(
+        ConversationStore(),
+        store,
+        args.conversation,
+        description,
+        settings.language,
+        severity=args.severity,
+        summarizer=models[args.summarizer] if args.summarizer else None,
+        window_messages=args.window,
+        window_tokens=args.window_tokens,
+        summary_tokens=args.summary_tokens,
+        on_window=_print_window,
+    )
+
+    last_id, _ = store.get_watermark(args.conversation, get_conversation_scope(description, args.severity))
+    print(f"✔ {windows} new windows analysed; watermark at message {last_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+analyze_map_reduce  –  analyse a text or conversation too long for a single
+request, map-reduce style.
+
+The text is split into token-bounded chunks whose findings are extracted in
+parallel, then merged level by level into one forensic analysis.  Partial
+results are cached per chunk, so analysing an edited or extended text again
+only recomputes the branches that changed.
+
+Usage
+-----
+    python -m padai.commands.analyze_map_reduce --file history.txt --model gpt-5-mini
+    python -m padai.commands.analyze_map_reduce --conversation CONVERSATION_ID --model gpt-4.1 --concurrency 8
+    python -m padai.commands.analyze_map_reduce --file history.txt --context context.txt --model gpt-5 --chunk-tokens 4096
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+from pathlib import Path
+import time
+
+from padai.chains.conversation import format_conversation_message
+from padai.chains.map_reduce import MapReduceStats, invoke_abuse_analyzer_map_reduce
+from padai.config.settings import settings
+from padai.datasets.conversations import ConversationStore
+from padai.llms.available import default_available_models
+from padai.prompts.psychological_abuse import abuse_analyzer_prompts
+from padai.utils.llm_cache import set_llm_sqlite_cache
+
+
+def main(argv: list[str] | None = None) -> None:
+    models = {m.id: m for m in default_available_models}
+
+    parser = argparse.ArgumentParser(
+        description="Analyse a long text or imported conversation with a map-reduce chain."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", type=Path, help="Text file to analyse")
+    source.add_argument("--conversation", help="Imported conversation id (see ingest_chat_export)")
+    parser.add_argument("--context", type=Path, help="Text file with the context of the analysis")
+    parser.add_argument("--model", choices=list(models), required=True, metavar="ID", help="Model id")
+    parser.add_argument(
+        "--severity",
+        choices=list(abuse_analyzer_prompts[settings.language]["system"]),
+        default="vigilant",
+        help="System-prompt preset (default: vigilant)",
+    )
+    parser.add_argument("--chunk-tokens", type=int, default=2048, help="Token limit of a chunk (default: 2048)")
+    parser.add_argument("--fan-in", type=int, default=4, help="Partial results merged per request, roughly (default: 4)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at a time (default: 4)")
+    args = parser.parse_args(argv)
+
+    if args.file is not None:
+        text = args.file.read_text(encoding="utf-8")
+    else:
+        df = ConversationStore().get_messages_df(args.conversation)
+        text = "\n".join(format_conversation_message(row) for row in df.itertuples())
+
+    context = args.context.read_text(encoding="utf-8") if args.context else None
+
+    set_llm_sqlite_cache()
+    stats = MapReduceStats()
+    start = time.perf_counter()
+
+    analysis = invoke_abuse_analyzer_map_reduce(
+        models[args.model],
+        text,
+        settings.language,
+        context=context,
+        severity=args.severity,
+        chunk_tokens=args.chunk_tokens,
+        fan_in=args.fan_in,
+        max_concurrency=args.concurrency,
+        stats=stats,
+    )
+
+    print(analysis)
+    print()
+    print(f"✔ {stats.calls} requests, {stats.cached} partial results reused, {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
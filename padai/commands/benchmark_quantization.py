@@ -0,0 +1,162 @@
+"""
+benchmark_quantization  –  compare a CPU HuggingFace model loaded in full
+precision against its ``quantize`` variants (int8, bf16).
+
+Each variant is loaded in a fresh interpreter, so its peak memory is not
+polluted by the others, and analyses the predefined messages with greedy
+decoding.  The report shows load time, median latency per message, peak RSS
+and how closely every variant's analyses agree with the full-precision ones
+(text similarity and exact matches).
+
+The first int8 run also fills the on-disk quantized model cache; run the
+command twice to see the cached load time.
+
+Usage
+-----
+    python -m padai.commands.benchmark_quantization
+    python -m padai.commands.benchmark_quantization --model-id Qwen/Qwen2.5-0.5B-Instruct --modes int8
+    python -m padai.commands.benchmark_quantization --max-new-tokens 128 --limit 2
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+import difflib
+import json
+import statistics
+import subprocess
+import sys
+
+FULL_PRECISION = "fp32"
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # KiB on Linux
+
+
+def run_variant(model_id: str, mode: str, max_new_tokens: int, limit: int | None) -> dict:
+    """Load one variant and analyse the predefined messages; runs in the worker process."""
+    import time
+
+    from padai.chains.abuse_analyzer import get_abuse_analyzer_params, get_abuse_analyzer_prompts
+    from padai.chains.base import build_prompt_parser_chain
+    from padai.config.settings import settings
+    from padai.datasets.psychological_abuse import get_communications_df
+    from padai.llms.huggingface import get_chat_huggingface
+    from padai.utils.text import process_response
+
+    params = {
+        "model_id": model_id,
+        "max_new_tokens": max_new_tokens,
+        "do_sample": False,
+        "device": -1,
+    }
+    if mode == FULL_PRECISION:
+        params["torch_dtype"] = "float32"
+    else:
+        params["quantize"] = mode
+
+    start = time.perf_counter()
+    llm = get_chat_huggingface(params)
+    load = time.perf_counter() - start
+
+    df = get_communications_df()
+    df = df[df["language"] == settings.language.value]
+    if limit is not None:
+        df = df.head(limit)
+
+    system_prompt, human_prompt = get_abuse_analyzer_prompts(settings.language, "vigilant")
+    chain = build_prompt_parser_chain(llm, system_prompt, human_prompt)
+
+    outputs: list[str] = []
+    latencies: list[float] = []
+    for text in df["text"]:
+        start = time.perf_counter()
+        outputs.append(process_response(chain.invoke(get_abuse_analyzer_params(text))))
+        latencies.append(time.perf_counter() - start)
+
+    return {"load": load, "latencies": latencies, "outputs": outputs, "peak_rss_mb": _peak_rss_mb()}
+
+
+def measure_variant(model_id: str, mode: str, max_new_tokens: int, limit: int | None) -> dict:
+    cmd = [
+        sys.executable, "-m", __spec__.name,
+        "--model-id", model_id,
+        "--max-new-tokens", str(max_new_tokens),
+        "--worker", mode,
+    ]
+    if limit is not None:
+        cmd += ["--limit", str(limit)]
+
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def agreement(reference: list[str], outputs: list[str]) -> tuple[float, float]:
+    """Mean text similarity and fraction of exact matches of *outputs* against *reference*."""
+    ratios = [difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(reference, outputs)]
+    exact = [a == b for a, b in zip(reference, outputs)]
+    return statistics.mean(ratios), sum(exact) / len(exact)
+
+
+def main(argv: list[str] | None = None) -> None:
+    from padai.config.settings import settings
+
+    default_model_id = settings.huggingface.chat.model_id if settings.huggingface else None
+
+    parser = argparse.ArgumentParser(
+        description="Compare latency, memory and agreement of quantized CPU HuggingFace models."
+    )
+    parser.add_argument(
+        "--model-id",
+        default=default_model_id,
+        required=default_model_id is None,
+        help="HuggingFace model id (default: APP_HUGGINGFACE__CHAT__MODEL_ID)",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["int8", "bf16"],
+        default=["int8", "bf16"],
+        help="Quantization modes to compare against fp32 (default: all)",
+    )
+    parser.add_argument(
+        "--max-new-tokens",
+        type=int,
+        default=256,
+        help="Tokens generated per message (default: 256)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Only analyse the first N predefined messages",
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_variant(args.model_id, args.worker, args.max_new_tokens, args.limit)))
+        return
+
+    results = {
+        mode: measure_variant(args.model_id, mode, args.max_new_tokens, args.limit)
+        for mode in [FULL_PRECISION, *args.modes]
+    }
+    reference = results[FULL_PRECISION]["outputs"]
+
+    print(f"{args.model_id}, {len(reference)} messages, {args.max_new_tokens} new tokens")
+    print(f"{'mode':<6} {'load s':>8} {'median s':>9} {'peak MB':>9} {'similarity':>11} {'exact':>6}")
+
+    for mode, result in results.items():
+        similarity, exact = agreement(reference, result["outputs"])
+        print(
+            f"{mode:<6} {result['load']:8.1f} {statistics.median(result['latencies']):9.2f} "
+            f"{result['peak_rss_mb']:9.0f} {similarity:11.3f} {exact:6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
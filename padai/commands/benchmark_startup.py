@@ -0,0 +1,107 @@
+"""
+benchmark_startup  –  measure how long PADAI entry points take to import and
+fail if they regress.
+
+Every module is imported in a fresh interpreter (so nothing is cached between
+runs) and the median wall time over several runs is compared against a
+budget.  The command also fails if a heavy provider SDK or torch ends up in
+``sys.modules``: those must only be imported when an engine is first used.
+
+Usage
+-----
+    python -m padai.commands.benchmark_startup                  # default modules and budget
+    python -m padai.commands.benchmark_startup --repeat 10 --budget 0.8
+    python -m padai.commands.benchmark_startup padai.llms.base
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+DEFAULT_MODULES = [
+    "padai.commands.text_uuid",
+    "padai.llms.base",
+    "padai.llms.available",
+]
+
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "langchain_aws",
+    "langchain_openai",
+    "langchain_google_genai",
+    "langchain_huggingface",
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeat: int = 5) -> tuple[float, list[str]]:
+    """Return the median import time of *module* (seconds) and the heavy modules it loaded."""
+    timings: list[float] = []
+    heavy: set[str] = set()
+
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        timings.append(result["elapsed"])
+        heavy.update(result["heavy"])
+
+    return statistics.median(timings), sorted(heavy)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure the import time of PADAI entry points and fail on regressions."
+    )
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=DEFAULT_MODULES,
+        help="Modules to import (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Fresh interpreters per module; the median is reported (default: 5)",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=1.5,
+        help="Maximum median import time in seconds (default: 1.5)",
+    )
+    args = parser.parse_args(argv)
+
+    failures: list[str] = []
+
+    for module in args.modules:
+        elapsed, heavy = measure_import(module, args.repeat)
+        print(f"{module:<40} {elapsed * 1000:8.1f} ms  heavy={heavy or '-'}")
+
+        if elapsed > args.budget:
+            failures.append(f"{module} took {elapsed:.2f}s (budget {args.budget:.2f}s)")
+        if heavy:
+            failures.append(f"{module} eagerly imported {', '.join(heavy)}")
+
+    if failures:
+        sys.exit("ERROR: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+openai_stub_server  –  minimal stand-in for an OpenAI-compatible inference
+server (vLLM, TGI, llama.cpp server…), for trying the ``openai_compatible``
+engine without a GPU.
+
+It serves ``GET /v1/models`` and ``POST /v1/chat/completions`` (plain and
+streamed) and answers every request with a canned analysis that quotes the
+last user message.  The peak number of concurrent requests is logged, which
+makes it easy to check the engine's connection limits.
+
+Usage
+-----
+    python -m padai.commands.openai_stub_server                       # http://127.0.0.1:8000/v1
+    python -m padai.commands.openai_stub_server --port 8001 --delay 0.05
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+import json
+import logging
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from padai.utils.text import make_label
+
+logger = logging.getLogger(__name__)
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+
+    def enter(self) -> None:
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            if self.in_flight > self.peak:
+                self.peak = self.in_flight
+                logger.info("Peak concurrent requests: %d", self.peak)
+
+    def leave(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+
+def _reply_tokens(messages: list[dict]) -> list[str]:
+    user = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "") or ""
+    if not isinstance(user, str):
+        user = " ".join(part.get("text", "") for part in user if isinstance(part, dict))
+
+    reply = f"Análisis simulado del mensaje «{make_label(user, width=80)}»: sin indicios evaluados."
+    return [word + " " for word in reply.split(" ")]
+
+
+def make_handler(model: str, delay: float, stats: _Stats):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, like real servers
+
+        def log_message(self, format, *args):
+            logger.debug("%s - " + format, self.address_string(), *args)
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/v1/models":
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            self._send_json(200, {"object": "list", "data": [{"id": model, "object": "model", "owned_by": "padai"}]})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/v1/chat/completions":
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            tokens = _reply_tokens(request.get("messages", []))
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            created = int(time.time())
+            name = request.get("model", model)
+
+            stats.enter()
+            try:
+                if request.get("stream"):
+                    self._stream(completion_id, created, name, tokens)
+                else:
+                    time.sleep(delay * len(tokens))
+                    self._send_json(200, {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": created,
+                        "model": name,
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                    })
+            finally:
+                stats.leave()
+
+        def _stream(self, completion_id: str, created: int, name: str, tokens: list[str]) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def event(delta: dict, finish_reason=None) -> None:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": name,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                self._chunk(f"data: {json.dumps(payload)}\n\n")
+
+            event({"role": "assistant", "content": ""})
+            for token in tokens:
+                time.sleep(delay)
+                event({"content": token})
+            event({}, finish_reason="stop")
+
+            self._chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _chunk(self, text: str) -> None:
+            data = text.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve a stand-in OpenAI-compatible chat completions API."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Port (default: 8000)")
+    parser.add_argument("--model", default="stub", help="Model name reported by /v1/models (default: stub)")
+    parser.add_argument("--delay", type=float, default=0.02, help="Seconds per generated token (default: 0.02)")
+    args = parser.parse_args(argv)
+
+    stats = _Stats()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.model, args.delay, stats))
+    print(f"Serving OpenAI-compatible stub on http://{args.host}:{args.port}/v1")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"{stats.requests} requests served, peak concurrency {stats.peak}")
+
+
+if __name__ == "__main__":
+    main()
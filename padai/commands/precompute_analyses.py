@@ -0,0 +1,87 @@
+"""
+precompute_analyses  –  fill the materialized store of analyses served
+instantly by the abuse analyzer UI.
+
+One analysis is computed for every (predefined message, system-prompt preset,
+model) combination that is not in the store yet, so re-running the command
+after changing prompts or models only computes what changed.
+
+Usage
+-----
+    python -m padai.commands.precompute_analyses                         # everything missing
+    python -m padai.commands.precompute_analyses --dry-run               # just count
+    python -m padai.commands.precompute_analyses --models gpt-5 o3 --presets neutral vigilant
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+import sys
+
+from padai.chains.precomputed import (
+    PrecomputedAnalyses,
+    iter_precompute_tasks,
+    get_missing_precompute_tasks,
+    precompute,
+)
+from padai.config.settings import settings
+from padai.datasets.psychological_abuse import get_communications_df
+from padai.llms.available import default_available_models
+from padai.prompts.psychological_abuse import abuse_analyzer_prompts
+from padai.utils.llm_cache import set_llm_sqlite_cache
+
+
+def main(argv: list[str] | None = None) -> None:
+    presets = list(abuse_analyzer_prompts[settings.language]["system"])
+    models = {m.id: m for m in default_available_models}
+
+    parser = argparse.ArgumentParser(
+        description="Precompute analyses of the predefined messages for every preset and model."
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        choices=list(models),
+        default=list(models),
+        metavar="ID",
+        help="Model ids to precompute (default: all available models)",
+    )
+    parser.add_argument(
+        "--presets",
+        nargs="+",
+        choices=presets,
+        default=presets,
+        help="System-prompt presets to precompute (default: all)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report how many analyses are missing",
+    )
+    args = parser.parse_args(argv)
+
+    store = PrecomputedAnalyses()
+    tasks = get_missing_precompute_tasks(
+        store,
+        iter_precompute_tasks(
+            get_communications_df(),
+            args.presets,
+            [models[id_] for id_ in args.models],
+            settings.language,
+        ),
+    )
+
+    print(f"{len(tasks)} analyses missing in {store.path}")
+    if args.dry_run or not tasks:
+        return
+
+    set_llm_sqlite_cache()
+    done = precompute(store, tasks)
+    print(f"✔ {done}/{len(tasks)} analyses stored")
+
+    if done < len(tasks):
+        sys.exit("ERROR: some analyses failed, see the log")
+
+
+if __name__ == "__main__":
+    main()
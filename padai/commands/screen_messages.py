@@ -0,0 +1,84 @@
+"""
+screen_messages  –  screen many messages with compact structured verdicts
+instead of full analyses.
+
+Each message gets an `AbuseVerdict` (abuse or not, severity 0-3, categories,
+up to three short evidence quotes and a confidence) rather than a written
+analysis, so answers are a few dozen tokens and the results can be sorted
+and filtered.  Providers with structured output return it natively; other
+engines are asked for JSON, constrained while decoding on HuggingFace when
+lm-format-enforcer is installed.
+
+Usage
+-----
+    python -m padai.commands.screen_messages --model gpt-5-nano
+    python -m padai.commands.screen_messages --model gpt-4.1-mini --conversation CONVERSATION_ID --output verdicts.csv
+    python -m padai.commands.screen_messages --model gpt-5-mini --limit 100 --concurrency 16 --top 20
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+from pathlib import Path
+import time
+
+from padai.chains.budget import BUDGET_STATS
+from padai.chains.verdict import invoke_abuse_screening, verdicts_df
+from padai.config.settings import settings
+from padai.datasets.conversations import ConversationStore
+from padai.datasets.psychological_abuse import get_communications_df, get_communications_messages
+from padai.llms.available import default_available_models
+from padai.utils.llm_cache import set_llm_sqlite_cache
+from padai.utils.text import estimate_tokens, make_label
+
+
+def main(argv: list[str] | None = None) -> None:
+    models = {m.id: m for m in default_available_models}
+
+    parser = argparse.ArgumentParser(
+        description="Screen messages with compact structured verdicts, sorted by severity."
+    )
+    parser.add_argument("--model", choices=list(models), required=True, metavar="ID", help="Model id")
+    parser.add_argument("--conversation", help="Screen the messages of an imported conversation (default: predefined messages)")
+    parser.add_argument("--limit", type=int, default=None, help="Only screen the first N messages")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at a time (default: 4)")
+    parser.add_argument("--top", type=int, default=10, help="Verdicts to print (default: 10)")
+    parser.add_argument("--output", type=Path, help="Write every verdict to this CSV file")
+    args = parser.parse_args(argv)
+
+    if args.conversation is not None:
+        df = ConversationStore().get_messages_df(args.conversation, limit=args.limit)
+        messages = [(text, None) for text in df["text"]]
+    else:
+        messages = get_communications_messages(get_communications_df(), language=settings.language, limit=args.limit)
+
+    set_llm_sqlite_cache()
+    start = time.perf_counter()
+
+    verdicts = invoke_abuse_screening(
+        models[args.model],
+        messages,
+        settings.language,
+        max_concurrency=args.concurrency,
+    )
+    elapsed = time.perf_counter() - start
+
+    results = verdicts_df([text for text, _ in messages], verdicts)
+    for row in results.dropna(subset=["abusive"]).head(args.top).itertuples():
+        print(f"{row.severity:.0f} {row.confidence:>3.0f}% {make_label(row.text, width=70):<72} {', '.join(row.categories)}")
+
+    if args.output is not None:
+        results.to_csv(args.output, index=False)
+
+    valid = [verdict for verdict in verdicts if verdict is not None]
+    mean_tokens = sum(estimate_tokens(v.model_dump_json()) for v in valid) / len(valid) if valid else 0
+    print()
+    print(
+        f"✔ {len(valid)} of {len(messages)} messages screened in {elapsed:.1f}s, "
+        f"{sum(v.abusive for v in valid)} flagged, ~{mean_tokens:.0f} tokens per verdict"
+    )
+    BUDGET_STATS.log_summary()
+
+
+if __name__ == "__main__":
+    main()
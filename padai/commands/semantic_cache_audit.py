@@ -0,0 +1,70 @@
+"""
+semantic_cache_audit  –  review the lookups of the semantic cache to validate
+its similarity threshold.
+
+The report gives the hit rate, the similarity distribution of the nearest
+neighbours, the hit rate other thresholds would have had, and the lookups
+closest to the threshold (on both sides) with the normalized message next to
+the one it matched, for checking by hand that hits really are the same
+message and misses really are different.
+
+Usage
+-----
+    python -m padai.commands.semantic_cache_audit
+    python -m padai.commands.semantic_cache_audit --thresholds 0.9 0.93 0.97 --examples 20
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+
+from padai.chains.semantic_cache import SemanticCache
+from padai.config.settings import settings
+from padai.utils.text import make_label
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Report semantic cache hits and misses to validate the similarity threshold."
+    )
+    parser.add_argument(
+        "--thresholds",
+        nargs="+",
+        type=float,
+        default=[0.85, 0.9, 0.95, 0.98],
+        help="Thresholds to simulate on the recorded lookups",
+    )
+    parser.add_argument(
+        "--examples",
+        type=int,
+        default=10,
+        help="Lookups shown on each side of the threshold (default: 10)",
+    )
+    args = parser.parse_args(argv)
+
+    cache = SemanticCache()
+    df = cache.lookups_df()
+    if df.empty:
+        print(f"No lookups recorded in {cache.path}")
+        return
+
+    threshold = settings.semantic_cache.threshold
+    print(f"{len(df)} lookups, {df['hit'].mean():.1%} hits at threshold {threshold}")
+    print(df["similarity"].describe(percentiles=[0.1, 0.25, 0.5, 0.75, 0.9]).to_string())
+
+    print()
+    for value in args.thresholds:
+        print(f"threshold {value:.2f}: {(df['similarity'] >= value).mean():.1%} hits")
+
+    near = df.dropna(subset=["similarity"]).copy()
+    near["distance"] = (near["similarity"] - threshold).abs()
+    near = near.sort_values("distance")
+
+    for title, subset in (("Weakest hits", near[near["hit"] == 1]), ("Closest misses", near[near["hit"] == 0])):
+        print(f"\n{title}:")
+        for row in subset.head(args.examples).itertuples():
+            print(f"  {row.similarity:.3f}  {make_label(row.normalized, width=50):<52} ~ {make_label(row.neighbour or '', width=50)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+train_triage  –  train the cheap triage classifier that decides which messages
+go to the LLM analysis.
+
+Training labels come from the labels store (`padai.chains.triage.TriageLabels`):
+
+* the predefined messages of the dataset, all abuse examples, as positives;
+* messages from text files (one per line) labelled by hand with
+  ``--positives`` / ``--negatives``;
+* messages from ``--unlabelled`` files given a one-word verdict by the
+  ``--labeler`` model; verdicts are stored, so re-running only asks for new
+  messages.
+
+The threshold is chosen on cross-validated scores as the highest one that
+still sends ``--target-recall`` of the abusive messages to the LLM.  The
+recall/cost curve is printed and saved next to the classifier so the
+threshold can be tuned later with ``APP_TRIAGE__THRESHOLD``.
+
+Usage
+-----
+    python -m padai.commands.train_triage --negatives chats/ordinary.txt
+    python -m padai.commands.train_triage --unlabelled chats/export.txt --labeler gpt-5-mini
+    python -m padai.commands.train_triage --target-recall 0.99 --dry-run
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+from pathlib import Path
+
+from padai.chains.triage import (
+    TriageClassifier,
+    TriageLabels,
+    choose_threshold,
+    get_abuse_verdict,
+    get_cross_validated_scores,
+    get_recall_cost_curve,
+    get_triage_classifier_path,
+)
+from padai.config.settings import settings
+from padai.datasets.psychological_abuse import get_communications_df
+from padai.llms.available import default_available_models
+from padai.utils.llm_cache import set_llm_sqlite_cache
+
+
+def _read_lines(paths: list[Path]) -> list[str]:
+    lines = []
+    for path in paths:
+        lines.extend(line.strip() for line in path.read_text(encoding="utf-8").splitlines())
+    return [line for line in lines if line]
+
+
+def main(argv: list[str] | None = None) -> None:
+    models = {m.id: m for m in default_available_models}
+
+    parser = argparse.ArgumentParser(
+        description="Label messages and train the triage classifier placed in front of the LLM analysis."
+    )
+    parser.add_argument("--positives", nargs="+", type=Path, default=[], metavar="FILE", help="Abusive messages, one per line")
+    parser.add_argument("--negatives", nargs="+", type=Path, default=[], metavar="FILE", help="Non-abusive messages, one per line")
+    parser.add_argument("--unlabelled", nargs="+", type=Path, default=[], metavar="FILE", help="Messages to label with --labeler, one per line")
+    parser.add_argument("--labeler", choices=list(models), metavar="ID", help="Model id giving verdicts on --unlabelled messages")
+    parser.add_argument(
+        "--target-recall",
+        type=float,
+        default=0.98,
+        help="Fraction of abusive messages that must reach the LLM (default: 0.98)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Print the recall/cost curve without saving the classifier")
+    args = parser.parse_args(argv)
+
+    if args.unlabelled and args.labeler is None:
+        parser.error("--unlabelled needs --labeler")
+
+    store = TriageLabels()
+
+    df = get_communications_df()
+    for text in df[df["language"] == settings.language.value]["text"]:
+        store.put(text, 1, "dataset")
+    for text in _read_lines(args.positives):
+        store.put(text, 1, "manual")
+    for text in _read_lines(args.negatives):
+        store.put(text, 0, "manual")
+
+    if args.unlabelled:
+        set_llm_sqlite_cache()
+        labeler = models[args.labeler]
+        pending = [text for text in _read_lines(args.unlabelled) if store.get(text) is None]
+        print(f"Labelling {len(pending)} messages with {labeler.full_name}")
+        for text in pending:
+            verdict = get_abuse_verdict(labeler, text, settings.language)
+            if verdict is not None:
+                store.put(text, verdict, labeler.full_name)
+
+    labels = store.to_df()
+    counts = labels["label"].value_counts()
+    print(f"{len(labels)} labelled messages: {counts.get(1, 0)} abusive, {counts.get(0, 0)} not abusive")
+
+    scores = get_cross_validated_scores(labels["text"], labels["label"])
+    curve = get_recall_cost_curve(scores, labels["label"])
+    threshold = choose_threshold(curve, args.target_recall)
+
+    print(curve.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    chosen = curve[curve["threshold"] == threshold].iloc[0]
+    print(f"Threshold {threshold:.3f}: recall {chosen['recall']:.1%}, {chosen['cost']:.1%} of messages sent to the LLM")
+
+    if args.dry_run:
+        return
+
+    path = TriageClassifier.train(labels["text"], labels["label"], threshold).save()
+    curve.to_csv(get_triage_classifier_path().with_suffix(".curve.csv"), index=False)
+    print(f"✔ Classifier saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
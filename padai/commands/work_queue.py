@@ -0,0 +1,308 @@
+"""
+work_queue  –  enqueue analyses, screenings and tournament shards in the
+durable work queue, and run workers that consume them.
+
+Jobs live in a SQLite file (`padai.utils.sqlite.WorkQueue`) and are taken
+by any number of worker processes, started here or on other terminals; a
+worker that dies loses its lease and its job is retried by another one.
+Enqueuing is idempotent, and completed jobs are never run again, so after a
+crash the same commands simply pick up what is left.
+
+Usage
+-----
+    python -m padai.commands.work_queue enqueue-analyses --models gpt-5-mini gpt-4.1-mini
+    python -m padai.commands.work_queue enqueue-analyses --models gpt-5-mini --packed --pack-budget 16384
+    python -m padai.commands.work_queue enqueue-screening --model gpt-5-nano --conversation CONVERSATION_ID
+    python -m padai.commands.work_queue enqueue-tournament --version v2 --shards 8 --listwise
+    python -m padai.commands.work_queue worker --processes 4 --stop-when-idle
+    python -m padai.commands.work_queue status
+    python -m padai.commands.work_queue retry
+"""
+
+import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from padai.config.language import Language
+from padai.config.settings import settings
+from padai.datasets.conversations import ConversationStore
+from padai.datasets.psychological_abuse import get_communications_df, get_communications_messages
+from padai.llms.available import default_available_models, default_available_models_registry
+from padai.prompts.psychological_abuse import abuse_analyzer_prompts
+from padai.utils.llm_cache import set_llm_sqlite_cache
+from padai.utils.sqlite import WorkQueue, work
+
+
+def get_work_queue_path() -> Path:
+    return settings.path_in_home("db/queue/jobs.sqlite")
+
+
+def _hash(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Handlers: payload → JSON-serializable result
+# ---------------------------------------------------------------------------
+
+def _handle_analyze(payload: Dict[str, Any]) -> str:
+    from padai.chains.abuse_analyzer import invoke_abuse_analyzer
+
+    return invoke_abuse_analyzer(
+        default_available_models_registry[payload["model"]],
+        (payload["text"], payload["context"]),
+        Language(payload["language"]),
+        payload["severity"],
+        temperature=None,
+        top_p=None,
+    )
+
+
+def _handle_analyze_packed(payload: Dict[str, Any]) -> List[str]:
+    from padai.chains.abuse_analyzer import invoke_abuse_analyzer_packed
+
+    return invoke_abuse_analyzer_packed(
+        default_available_models_registry[payload["model"]],
+        [tuple(message) for message in payload["messages"]],
+        Language(payload["language"]),
+        payload["severity"],
+        budget=payload["budget"],
+    )
+
+
+def _handle_screen(payload: Dict[str, Any]) -> List[Optional[Dict[str, Any]]]:
+    from padai.chains.verdict import invoke_abuse_screening
+
+    verdicts = invoke_abuse_screening(
+        default_available_models_registry[payload["model"]],
+        [tuple(message) for message in payload["messages"]],
+        Language(payload["language"]),
+    )
+    return [verdict.model_dump() if verdict is not None else None for verdict in verdicts]
+
+
+def _get_tournament(version: str):
+    if version == "v1":
+        return default_available_models, default_available_models_registry
+    from padai.examples.abuse_analyzer_compare_llms.v2.models import models, models_registry
+    return models, models_registry
+
+
+def _run_tournament(payload: Dict[str, Any], **kwargs) -> None:
+    from padai.examples.abuse_analyzer_compare_llms.common.compare_llms import run
+
+    descriptions, registry = _get_tournament(payload["version"])
+    options = dict(payload["options"])
+    if options.get("compressor") is not None:
+        options["compressor"] = next(m for m in descriptions if m.id == options["compressor"])
+
+    run(descriptions, registry, f"abuse_analyzer_compare_llms/{payload['version']}", **options, **kwargs)
+
+
+def _handle_tournament_shard(payload: Dict[str, Any]) -> None:
+    _run_tournament(payload, shards=payload["shards"], shard=payload["shard"])
+
+
+def _handle_tournament_merge(payload: Dict[str, Any]) -> None:
+    _run_tournament(payload, merge_only=True)
+
+
+HANDLERS = {
+    "analyze": _handle_analyze,
+    "analyze_packed": _handle_analyze_packed,
+    "screen": _handle_screen,
+    "tournament_shard": _handle_tournament_shard,
+    "tournament_merge": _handle_tournament_merge,
+}
+
+
+def _work(kinds: List[str], lease: float, stop_when_idle: bool) -> None:
+    from padai.chains.budget import BUDGET_STATS
+
+    set_llm_sqlite_cache()
+    completed = work(
+        WorkQueue(get_work_queue_path()),
+        {kind: HANDLERS[kind] for kind in kinds},
+        lease=lease,
+        stop_when_idle=stop_when_idle,
+    )
+    print(f"✔ {completed} jobs completed")
+    BUDGET_STATS.log_summary()
+
+
+# ---------------------------------------------------------------------------
+# Subcommands
+# ---------------------------------------------------------------------------
+
+def _enqueue_analyses(queue: WorkQueue, args: argparse.Namespace) -> None:
+    models = {m.id: m for m in default_available_models}
+    messages = get_communications_messages(get_communications_df(), language=settings.language, limit=args.limit)
+    if args.packed:
+        _enqueue_packed_analyses(queue, args, messages)
+        return
+
+    for text, context in messages:
+        for model_id in args.models:
+            model = models[model_id].full_name
+            payload = {
+                "model": model,
+                "text": text,
+                "context": context,
+                "language": settings.language.value,
+                "severity": args.severity,
+            }
+            key = f"analyze/{model}/{args.severity}/{_hash(text, context)}"
+            queue.enqueue("analyze", payload, key=key, priority=args.priority)
+    print(f"✔ Analyses enqueued, {queue.pending(['analyze'])} pending")
+
+
+def _enqueue_packed_analyses(queue: WorkQueue, args: argparse.Namespace, messages) -> None:
+    # Each job packs its batch into as few requests as fit in the budget
+    # (`invoke_abuse_analyzer_packed`), sending the system prompt once per pack.
+    models = {m.id: m for m in default_available_models}
+    for start in range(0, len(messages), args.batch_size):
+        batch = messages[start:start + args.batch_size]
+        for model_id in args.models:
+            model = models[model_id].full_name
+            payload = {
+                "model": model,
+                "messages": batch,
+                "language": settings.language.value,
+                "severity": args.severity,
+                "budget": args.pack_budget,
+            }
+            key = f"analyze_packed/{model}/{args.severity}/{args.pack_budget}/{_hash(batch)}"
+            queue.enqueue("analyze_packed", payload, key=key, priority=args.priority)
+    print(f"✔ Packed analyses enqueued, {queue.pending(['analyze_packed'])} pending")
+
+
+def _enqueue_screening(queue: WorkQueue, args: argparse.Namespace) -> None:
+    model = {m.id: m for m in default_available_models}[args.model].full_name
+    if args.conversation is not None:
+        df = ConversationStore().get_messages_df(args.conversation, limit=args.limit)
+        messages = [(text, None) for text in df["text"]]
+    else:
+        messages = get_communications_messages(get_communications_df(), language=settings.language, limit=args.limit)
+
+    for start in range(0, len(messages), args.batch_size):
+        batch = messages[start:start + args.batch_size]
+        payload = {"model": model, "messages": batch, "language": settings.language.value}
+        queue.enqueue("screen", payload, key=f"screen/{model}/{_hash(batch)}", priority=args.priority)
+    print(f"✔ {len(messages)} messages enqueued in batches of {args.batch_size}")
+
+
+def _enqueue_tournament(queue: WorkQueue, args: argparse.Namespace) -> None:
+    options = {
+        "listwise": args.listwise,
+        "compress_budget": args.compress_budget,
+        "compress_mode": args.compress_mode,
+        "compressor": args.compressor,
+        "early_stopping": args.early_stopping,
+    }
+    prefix = f"tournament/{args.version}/{_hash(options)}/{args.shards}"
+    shard_keys = [f"{prefix}/shard-{shard}" for shard in range(args.shards)]
+
+    for shard, key in enumerate(shard_keys):
+        payload = {"version": args.version, "options": options, "shards": args.shards, "shard": shard}
+        queue.enqueue("tournament_shard", payload, key=key, priority=args.priority)
+
+    # The merge needs the judgements of every shard: it waits until they are done.
+    queue.enqueue(
+        "tournament_merge",
+        {"version": args.version, "options": options},
+        key=f"{prefix}/merge",
+        priority=args.priority,
+        requires=shard_keys,
+    )
+    print(f"✔ {args.shards} shards and their merge enqueued")
+
+
+def _status(queue: WorkQueue, args: argparse.Namespace) -> None:
+    print(queue.counts_df().to_string(index=False))
+
+
+def _retry(queue: WorkQueue, args: argparse.Namespace) -> None:
+    print(f"✔ {queue.retry_failed(args.kind)} failed jobs queued again")
+
+
+def _worker(queue: WorkQueue, args: argparse.Namespace) -> None:
+    worker_args = (args.kinds, args.lease, args.stop_when_idle)
+    if args.processes == 1:
+        _work(*worker_args)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_work, args=worker_args) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def main(argv: list[str] | None = None) -> None:
+    models = [m.id for m in default_available_models]
+
+    parser = argparse.ArgumentParser(description="Durable work queue for analyses, screenings and tournaments.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    analyses = subparsers.add_parser("enqueue-analyses", help="One analysis job per predefined message and model")
+    analyses.add_argument("--models", nargs="+", choices=models, required=True, metavar="ID", help="Model ids")
+    analyses.add_argument(
+        "--severity",
+        choices=list(abuse_analyzer_prompts[settings.language]["system"]),
+        default="vigilant",
+        help="System-prompt preset (default: vigilant)",
+    )
+    analyses.add_argument("--packed", action="store_true", help="Pack several messages into each request")
+    analyses.add_argument(
+        "--pack-budget", type=int, default=8 * 1024, metavar="TOKENS", help="Tokens per packed request (default: 8192)"
+    )
+    analyses.add_argument("--batch-size", type=int, default=50, help="Messages per packed job (default: 50)")
+    analyses.set_defaults(handler=_enqueue_analyses)
+
+    screening = subparsers.add_parser("enqueue-screening", help="Structured verdict jobs, a batch of messages each")
+    screening.add_argument("--model", choices=models, required=True, metavar="ID", help="Model id")
+    screening.add_argument("--conversation", help="Screen an imported conversation (default: predefined messages)")
+    screening.add_argument("--batch-size", type=int, default=50, help="Messages per job (default: 50)")
+    screening.set_defaults(handler=_enqueue_screening)
+
+    for subparser in (analyses, screening):
+        subparser.add_argument("--limit", type=int, default=None, help="Only enqueue the first N messages")
+
+    tournament = subparsers.add_parser("enqueue-tournament", help="Tournament shards, then their merge")
+    tournament.add_argument("--version", choices=["v1", "v2"], default="v2", help="Model comparison (default: v2)")
+    tournament.add_argument("--shards", type=int, default=4, help="Number of shards (default: 4)")
+    tournament.add_argument("--listwise", action="store_true", help="Referees rank all analyses in one call")
+    tournament.add_argument("--compress-budget", type=int, default=None, metavar="TOKENS", help="Shorten analyses before judging")
+    tournament.add_argument("--compress-mode", choices=["truncate", "summarize"], default="truncate", help="How to shorten them")
+    tournament.add_argument("--compressor", default=None, metavar="ID", help="Model id writing the summaries")
+    tournament.add_argument("--early-stopping", type=float, default=None, metavar="CONFIDENCE", help="Sequential judging")
+    tournament.set_defaults(handler=_enqueue_tournament)
+
+    for subparser in (analyses, screening, tournament):
+        subparser.add_argument("--priority", type=int, default=0, help="Higher runs first (default: 0)")
+
+    worker = subparsers.add_parser("worker", help="Run jobs until interrupted")
+    worker.add_argument("--processes", type=int, default=1, help="Worker processes (default: 1)")
+    worker.add_argument("--kinds", nargs="+", choices=list(HANDLERS), default=list(HANDLERS), help="Job kinds to take")
+    worker.add_argument("--lease", type=float, default=60.0, help="Seconds a job stays leased without a heartbeat (default: 60)")
+    worker.add_argument("--stop-when-idle", action="store_true", help="Exit once no job is queued or running")
+    worker.set_defaults(handler=_worker)
+
+    subparsers.add_parser("status", help="Jobs by kind and state").set_defaults(handler=_status)
+
+    retry = subparsers.add_parser("retry", help="Queue the failed jobs again")
+    retry.add_argument("--kind", choices=list(HANDLERS), default=None, help="Only jobs of this kind")
+    retry.set_defaults(handler=_retry)
+
+    args = parser.parse_args(argv)
+    args.handler(WorkQueue(get_work_queue_path()), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+
+
+class ContextBudgetSettings(BaseModel):
+    enabled: bool = True                    # trim prompts that would not fit the model's context window
+    max_input_tokens: Optional[int] = None  # per-call cap on prompt tokens, e.g. to limit paid input
+    output_reserve: int = 4096              # tokens kept free for the answer when the model sets no limit
+    context_windows: Dict[str, int] = Field(default_factory=dict)   # full model name → window, overriding the known ones
+
+    model_config = dict(extra="forbid")
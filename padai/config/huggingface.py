@@ -1,18 +1,19 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import SecretStr, BaseModel, Field
+from pydantic import SecretStr, BaseModel
 from typing import Optional, Dict, Any
-import torch
 
 
 def get_default_device_int() -> int:
     """Return 0 if a CUDA GPU is available, else -1 (CPU)."""
+    import torch  # deferred: importing torch costs seconds
+
     return 0 if torch.cuda.is_available() else -1
 
 
 class HuggingFaceChatModelDefaults(BaseModel):
     model_id: str = "meta-llama/Llama-3.2-1B-Instruct"
     task: str = "text-generation"
-    device: int = Field(default_factory=get_default_device_int)
+    device: Optional[int] = None    # None → get_default_device_int() when the model is built
     temperature: Optional[float] = None
     max_new_tokens: Optional[int] = None
     top_p: Optional[float] = None
@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+
+
+class LlamaCppChatModelDefaults(BaseModel):
+    model_id: str = "bartowski/Llama-3.2-1B-Instruct-GGUF"
+    filename: str = "Llama-3.2-1B-Instruct-Q4_K_M.gguf"
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    top_p: Optional[float] = None
+
+    def as_kwargs(self) -> Dict[str, Any]:
+        return self.model_dump(exclude_none=True)
+
+
+class LlamaCppSettings(BaseModel):
+    """
+    Defaults for GGUF models run in-process by llama.cpp on the CPU.  Any of
+    these can be overridden per model in ``ChatModelDescriptionEx.params``.
+    """
+    n_threads: Optional[int] = None     # None → llama.cpp default (half the logical cores)
+    n_ctx: int = 8192                   # context window allocated for the KV cache
+    n_batch: int = 512                  # prompt tokens evaluated per batch
+    use_mmap: bool = True               # memory-map the weights instead of reading them
+    use_mlock: bool = False             # pin the mapped weights in RAM
+    chat: LlamaCppChatModelDefaults = LlamaCppChatModelDefaults()
+
+    model_config = dict(extra="forbid")
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class MemorySettings(BaseModel):
+    rss_high_watermark_mb: Optional[int] = None     # collect after a dispose when RSS is above it
+    vram_high_watermark: float = 0.8                # ... or when reserved VRAM is above this fraction
+    collect_on_model_switch: bool = True            # collect before loading a different local model
+
+    model_config = dict(extra="forbid")
@@ -0,0 +1,29 @@
+from pydantic import SecretStr, BaseModel
+from typing import Optional, Dict, Any
+
+
+class ChatModelDefaults(BaseModel):
+    model: str = "meta-llama/Llama-3.2-1B-Instruct"
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    top_p: Optional[float] = None
+
+    def as_kwargs(self) -> Dict[str, Any]:
+        return self.model_dump(exclude_none=True)
+
+
+class OpenAICompatibleSettings(BaseModel):
+    """
+    Defaults for local inference servers exposing the OpenAI chat API
+    (vLLM, TGI, llama.cpp server…).  Any of these can be overridden per
+    model in ``ChatModelDescriptionEx.params``.
+    """
+    base_url: str = "http://localhost:8000/v1"
+    api_key: SecretStr = SecretStr("EMPTY")     # most local servers ignore it
+    max_connections: int = 16                   # concurrent requests per server
+    max_keepalive_connections: int = 16
+    timeout: float = 600.0                      # seconds; local generations can be long
+    max_retries: int = 2
+    chat: ChatModelDefaults = ChatModelDefaults()
+
+    model_config = dict(extra="forbid")
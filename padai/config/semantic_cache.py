@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class SemanticCacheSettings(BaseModel):
+    enabled: bool = False       # reuse analyses of near-duplicate messages
+    model: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"    # local CPU encoder
+    threshold: float = 0.95     # cosine similarity needed to reuse an analysis
+    audit: bool = True          # record every lookup, hit or miss, for validating the threshold
+
+    model_config = dict(extra="forbid")
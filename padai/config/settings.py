@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Literal, List
+from typing import Literal, List, Optional, Any
 from pathlib import Path
 from pydantic import Field, SecretStr, computed_field
 from padai.config.logging import LoggingSettings
@@ -7,8 +7,16 @@ from padai.config.openai import OpenAISettings
 from padai.config.aws import BedrockSettings
 from padai.config.google import GoogleSettings
 from padai.config.huggingface import HuggingFaceSettings
+from padai.config.openai_compatible import OpenAICompatibleSettings
+from padai.config.llamacpp import LlamaCppSettings
 from padai.config.language import Language
 from padai.config.experiment import ExperimentSettings
+from padai.config.ui import UISettings
+from padai.config.workers import ModelWorkerSettings
+from padai.config.memory import MemorySettings
+from padai.config.triage import TriageSettings
+from padai.config.semantic_cache import SemanticCacheSettings
+from padai.config.budget import ContextBudgetSettings
 from padai.llms.engine import ChatEngine
 from slugify import slugify
 import os
@@ -32,14 +40,24 @@ class AppSettings(BaseSettings):
     secret: SecretStr = Field(...)
 
     logging: LoggingSettings = Field(default_factory=LoggingSettings)
-    openai: OpenAISettings = Field(default_factory=OpenAISettings)
-    bedrock: BedrockSettings = Field(default_factory=BedrockSettings)
-    google: GoogleSettings = Field(default_factory=GoogleSettings)
-    huggingface: HuggingFaceSettings = Field(default_factory=HuggingFaceSettings)
+    # Provider settings are optional: a provider is only required to be
+    # configured when one of its engines is actually used (see `require`).
+    openai: Optional[OpenAISettings] = None
+    bedrock: Optional[BedrockSettings] = None
+    google: Optional[GoogleSettings] = None
+    huggingface: Optional[HuggingFaceSettings] = None
+    openai_compatible: OpenAICompatibleSettings = Field(default_factory=OpenAICompatibleSettings)
+    llamacpp: LlamaCppSettings = Field(default_factory=LlamaCppSettings)
 
     default_chat_model: ChatEngine = "openai"
+    model_workers: ModelWorkerSettings = Field(default_factory=ModelWorkerSettings)
+    memory: MemorySettings = Field(default_factory=MemorySettings)
+    triage: TriageSettings = Field(default_factory=TriageSettings)
+    semantic_cache: SemanticCacheSettings = Field(default_factory=SemanticCacheSettings)
+    context_budget: ContextBudgetSettings = Field(default_factory=ContextBudgetSettings)
 
     experiment: ExperimentSettings = Field(default_factory=ExperimentSettings)
+    ui: UISettings = Field(default_factory=UISettings)
 
     model_config = SettingsConfigDict(
         env_file=BASE_DIR / ".env",
@@ -60,9 +78,23 @@ class AppSettings(BaseSettings):
         if self.huggingface_home is None:
             self.huggingface_home = self.home / "huggingface"
 
-        os.environ["HF_TOKEN"] = self.huggingface.hub_token.get_secret_value()
+        if self.huggingface is not None:
+            os.environ["HF_TOKEN"] = self.huggingface.hub_token.get_secret_value()
         os.environ["HF_HOME"] = str(self.huggingface_home)
 
+    def require(self, provider: str) -> Any:
+        """
+        Return the settings of *provider* (e.g. ``"openai"``), raising a
+        ``ValueError`` when they have not been configured.
+        """
+        value = getattr(self, provider, None)
+        if value is None:
+            raise ValueError(
+                f"Settings for {provider!r} are not configured: "
+                f"set {self.model_config['env_prefix']}{provider.upper()} in the environment or .env file"
+            )
+        return value
+
     def init_logging(self) -> None:
         import logging.config
         logging.config.dictConfig(self.logging.as_dict())
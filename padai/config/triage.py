@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class TriageSettings(BaseModel):
+    enabled: bool = False               # score messages with the triage classifier before the LLM
+    threshold: Optional[float] = None   # messages scoring below it skip the LLM; None: the one chosen at training
+    uncertainty: float = 0.05           # messages this close below the threshold still go to the LLM
+
+    model_config = dict(extra="forbid")
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class UISettings(BaseModel):
+    workers: int = 4                # analyses running at the same time
+    max_jobs_per_user: int = 1      # analyses a browser session may have in flight
+    warm_models: int = 4            # chat models kept loaded between analyses
+    poll_interval_ms: int = 500     # how often the browser polls for partial output
+    job_retention: int = 600        # seconds a finished job is kept for polling
+    precompute_refresh: bool = False    # compute missing precomputed analyses in the background
+
+    model_config = dict(extra="forbid")
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class ModelWorkerSettings(BaseModel):
+    isolate_local: bool = False     # run local engines (huggingface, llamacpp) in worker subprocesses
+    start_timeout: float = 900      # seconds a worker may take to load its model
+    stop_timeout: float = 10        # seconds to wait for a clean exit before killing a worker
+
+    model_config = dict(extra="forbid")
@@ -1,8 +1,9 @@
 import random
 import pandas as pd
-from typing import Dict, Tuple, List, Optional, Iterable
+from typing import Dict, FrozenSet, Tuple, List, Optional, Iterable
 from padai.datasets.nombres_por_edad_media import get_nombres_por_edad_media_dataframe
 import re
+import unicodedata
 
 NameFrequency = Tuple[List[str], List[int]]
 NameFrequencyCache = Dict[str, NameFrequency]
@@ -80,3 +81,17 @@ def build_name_token_dict_many(
         result = build_name_token_dict(text, df, base=result, cache=cache)
 
     return result
+
+
+def strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def build_name_words(df: pd.DataFrame, min_frequency: int = 0) -> FrozenSet[str]:
+    """
+    Every single word of the names in *df* with at least *min_frequency*
+    people, lowercase and without accents (compound names like
+    "Maria Carmen" contribute both words).
+    """
+    names = df.loc[df["frequency"] >= min_frequency, "name"].dropna()
+    return frozenset(strip_accents(word).lower() for name in names for word in name.split())
@@ -0,0 +1,392 @@
+from dataclasses import dataclass
+from datetime import datetime
+from email import message_from_bytes, policy
+from email.utils import parseaddr, parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional
+from padai.datasets.base import NameFrequencyCache, build_name_token_dict, strip_accents
+from padai.utils.text import substitute_placeholders
+import hashlib
+import pandas as pd
+import re
+import unicodedata
+
+# Every parser is a generator reading its file incrementally, so memory stays
+# constant however long the export is.
+ChatExportFormat = Literal["whatsapp", "telegram", "mbox"]
+
+
+@dataclass
+class ChatMessage:
+    sent_at: Optional[datetime]
+    sender: Optional[str]
+    text: str
+
+
+# ---------------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------------
+
+# Bidirectional marks WhatsApp scatters around names, dates and attachments
+_INVISIBLE_RE = re.compile("[\u200e\u200f\u202a-\u202e\u2066-\u2069\ufeff]")
+_SPACES_RE = re.compile(r"[^\S\n]+")
+
+# Messages without text of their own
+_OMITTED = {
+    "<multimedia omitido>",
+    "<media omitted>",
+    "<sin archivos adjuntos>",
+    "se eliminó este mensaje.",
+    "eliminaste este mensaje.",
+    "this message was deleted",
+    "you deleted this message",
+    "null",
+}
+
+
+def normalize_chat_text(text: str) -> Optional[str]:
+    """Normalized message text, or None for messages with nothing to analyse."""
+    text = unicodedata.normalize("NFC", _INVISIBLE_RE.sub("", text))
+    text = "\n".join(_SPACES_RE.sub(" ", line).strip() for line in text.splitlines()).strip()
+
+    if not text or text.lower() in _OMITTED:
+        return None
+    return text
+
+
+# ---------------------------------------------------------------------------
+# WhatsApp
+# ---------------------------------------------------------------------------
+
+# Android: "31/12/23, 21:41 - Ana: hola"    iOS: "[31/12/23, 21:41:05] Ana: hola"
+_WHATSAPP_START_RE = re.compile(
+    r"^\[?(?P<date>\d{1,4}[/.-]\d{1,2}[/.-]\d{1,4}),?\s+"
+    r"(?P<time>\d{1,2}:\d{2}(?::\d{2})?(?:\s*[ap]\.?\s?m\.?)?)\]?"
+    r"\s*(?:-\s*)?"
+    r"(?P<rest>.*)$",
+    re.IGNORECASE,
+)
+
+
+def _parse_whatsapp_datetime(date: str, time: str, dayfirst: bool) -> Optional[datetime]:
+    parts = [int(p) for p in re.split(r"[/.-]", date)]
+    if parts[0] > 31:    # year first
+        year, month, day = parts
+    elif dayfirst:
+        day, month, year = parts
+    else:
+        month, day, year = parts
+    if year < 100:
+        year += 2000
+
+    match = re.match(r"(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([ap])?", time.replace(".", "").replace(" ", ""), re.IGNORECASE)
+    hour, minute, second = int(match.group(1)), int(match.group(2)), int(match.group(3) or 0)
+    meridiem = (match.group(4) or "").lower()
+    if meridiem == "p" and hour < 12:
+        hour += 12
+    elif meridiem == "a" and hour == 12:
+        hour = 0
+
+    try:
+        return datetime(year, month, day, hour, minute, second)
+    except ValueError:
+        return None
+
+
+def parse_whatsapp(lines: Iterable[str], dayfirst: bool = True) -> Iterator[ChatMessage]:
+    """
+    Messages of a WhatsApp "export chat" text file.  Lines not starting with
+    a timestamp continue the previous message; system notices (no sender)
+    are dropped.
+    """
+    current: Optional[ChatMessage] = None
+    body: List[str] = []
+
+    def _flush() -> Optional[ChatMessage]:
+        if current is None or current.sender is None:
+            return None
+        current.text = "\n".join(body)
+        return current
+
+    for line in lines:
+        match = _WHATSAPP_START_RE.match(_INVISIBLE_RE.sub("", line))
+        if match is None:
+            body.append(line)
+            continue
+
+        message = _flush()
+        if message is not None:
+            yield message
+
+        sender, sep, text = match.group("rest").partition(": ")
+        current = ChatMessage(
+            sent_at=_parse_whatsapp_datetime(match.group("date"), match.group("time"), dayfirst),
+            sender=sender.strip() if sep else None,
+            text="",
+        )
+        body = [text if sep else ""]
+
+    message = _flush()
+    if message is not None:
+        yield message
+
+
+# ---------------------------------------------------------------------------
+# Email (mbox)
+# ---------------------------------------------------------------------------
+
+def _parse_email(raw: bytes) -> Optional[ChatMessage]:
+    message = message_from_bytes(raw, policy=policy.default)
+
+    name, address = parseaddr(str(message.get("From", "")))
+    try:
+        sent_at = parsedate_to_datetime(str(message["Date"])) if message["Date"] else None
+    except (TypeError, ValueError):
+        sent_at = None
+
+    body = message.get_body(preferencelist=("plain",))
+    if body is None:
+        return None
+
+    # Quoted history would repeat earlier messages of the same thread.
+    text = "\n".join(
+        line for line in body.get_content().splitlines()
+        if not line.lstrip().startswith(">")
+    )
+    return ChatMessage(sent_at=sent_at, sender=name or address.split("@")[0] or None, text=text)
+
+
+def parse_mbox(lines: Iterable[bytes]) -> Iterator[ChatMessage]:
+    """Messages of an mbox file, read line by line and parsed one at a time."""
+    raw: List[bytes] = []
+
+    for line in lines:
+        if line.startswith(b"From ") and raw:
+            message = _parse_email(b"".join(raw))
+            if message is not None:
+                yield message
+            raw = []
+        elif not line.startswith(b"From "):
+            raw.append(line[1:] if line.startswith(b">From ") else line)
+
+    if raw:
+        message = _parse_email(b"".join(raw))
+        if message is not None:
+            yield message
+
+
+# ---------------------------------------------------------------------------
+# Telegram
+# ---------------------------------------------------------------------------
+
+def _telegram_text(text) -> str:
+    if isinstance(text, str):
+        return text
+    return "".join(part if isinstance(part, str) else part.get("text", "") for part in text)
+
+
+def parse_telegram(file) -> Iterator[ChatMessage]:
+    """
+    Messages of a Telegram Desktop single-chat JSON export (``result.json``),
+    streamed with ijson.
+    """
+    try:
+        import ijson
+    except ImportError as exc:
+        raise ImportError("Streaming Telegram exports needs ijson: pip install ijson") from exc
+
+    for item in ijson.items(file, "messages.item"):
+        if item.get("type") != "message":
+            continue
+        sent_at = datetime.fromisoformat(item["date"]) if item.get("date") else None
+        yield ChatMessage(sent_at=sent_at, sender=item.get("from"), text=_telegram_text(item.get("text", "")))
+
+
+# ---------------------------------------------------------------------------
+# Files
+# ---------------------------------------------------------------------------
+
+_SUFFIX_FORMATS: Dict[str, ChatExportFormat] = {".txt": "whatsapp", ".json": "telegram", ".mbox": "mbox"}
+
+
+def detect_chat_export_format(path: Path) -> ChatExportFormat:
+    try:
+        return _SUFFIX_FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Cannot tell the export format of {path.name}; pass it explicitly") from None
+
+
+def iter_chat_export(path: Path, format: Optional[ChatExportFormat] = None, dayfirst: bool = True) -> Iterator[ChatMessage]:
+    """Normalized messages of the export at *path*, in file order."""
+    format = format or detect_chat_export_format(path)
+
+    if format == "whatsapp":
+        with open(path, encoding="utf-8-sig", errors="replace") as f:
+            messages = parse_whatsapp((line.rstrip("\r\n") for line in f), dayfirst=dayfirst)
+            yield from _normalized(messages)
+    elif format == "mbox":
+        with open(path, "rb") as f:
+            yield from _normalized(parse_mbox(f))
+    elif format == "telegram":
+        with open(path, "rb") as f:
+            yield from _normalized(parse_telegram(f))
+    else:
+        raise ValueError(f"Unknown chat export format: {format!r}")
+
+
+def iter_chat_export_senders(path: Path, format: Optional[ChatExportFormat] = None, dayfirst: bool = True) -> List[str]:
+    """Distinct senders of an export in order of appearance, from a streaming pass that only keeps their names."""
+    return list(dict.fromkeys(message.sender for message in iter_chat_export(path, format, dayfirst) if message.sender))
+
+
+def _normalized(messages: Iterable[ChatMessage]) -> Iterator[ChatMessage]:
+    for message in messages:
+        text = normalize_chat_text(message.text)
+        if text is not None:
+            message.text = text
+            message.sender = normalize_chat_text(message.sender or "")
+            yield message
+
+
+# ---------------------------------------------------------------------------
+# Pseudonymization
+# ---------------------------------------------------------------------------
+
+def normalize_name(name: str) -> str:
+    return " ".join(strip_accents(name).lower().split())
+
+
+# Given names rarer than this in *names_df* ("Mi", "Que") are more likely an
+# ordinary word than a contact's name: a participant's first word is only
+# matched on its own when it is at least this frequent.
+_MIN_GIVEN_NAME_FREQUENCY = 1000
+
+
+def _title_name(key: str) -> str:
+    """A `normalize_name` key as names are written in text: "ana garcia" → "Ana Garcia"."""
+    return key.title()
+
+
+def guess_gender(name: str, names_df: pd.DataFrame) -> str:
+    """"f" or "m" for the first word of *name*, by the most frequent use in *names_df*; "f" when unknown."""
+    first = strip_accents(name.split()[0]).title() if name.split() else ""
+    matches = names_df[names_df["name"] == first]
+    if matches.empty:
+        return "f"
+    return matches.sort_values("frequency").iloc[-1]["gender"].lower()
+
+
+class Pseudonymizer:
+    """
+    Replaces participants' names with random ones, consistently for a whole
+    conversation.
+
+    Each participant gets a ``{name:n:g}`` placeholder, which
+    `build_name_token_dict` maps to a random name of the same gender.
+    Participants are remembered by a salted hash of their name only; the
+    placeholders and pseudonyms of earlier imports are passed in *known* and
+    *mapping*, so re-importing an updated export keeps the same pseudonyms.
+    """
+
+    def __init__(
+        self,
+        names_df: pd.DataFrame,
+        salt: str,
+        known: Optional[Dict[str, str]] = None,         # name hash → placeholder
+        mapping: Optional[Dict[str, str]] = None,       # placeholder → pseudonym
+        on_new_participant: Optional[Callable[[str, str, str], None]] = None,
+    ) -> None:
+        self.names_df = names_df
+        self.salt = salt
+        self.known: Dict[str, str] = dict(known or {})
+        self.mapping: Dict[str, str] = dict(mapping or {})
+        self.on_new_participant = on_new_participant
+        self._participants: Dict[str, str] = {}         # normalized name → placeholder, seen in this import
+        self._variants: Dict[str, str] = {}             # name as written (accents folded) → placeholder
+        self._given_names = set(names_df.loc[names_df["frequency"] >= _MIN_GIVEN_NAME_FREQUENCY, "name"])
+        self._cache: NameFrequencyCache = {}
+        self._pattern: Optional[re.Pattern] = None
+
+    def hash_name(self, name: str) -> str:
+        return hashlib.sha256(f"{self.salt}:{normalize_name(name)}".encode()).hexdigest()
+
+    def _add(self, name: str) -> str:
+        key = normalize_name(name)
+        placeholder = self._participants.get(key)
+        if placeholder is not None:
+            return placeholder
+
+        name_hash = self.hash_name(name)
+        placeholder = self.known.get(name_hash)
+        if placeholder is None:
+            placeholder = f"{{name:{len(self.known) + 1}:{guess_gender(name, self.names_df)}}}"
+            self.known[name_hash] = placeholder
+            self.mapping = build_name_token_dict(placeholder, self.names_df, base=self.mapping, cache=self._cache)
+            if self.on_new_participant is not None:
+                self.on_new_participant(name_hash, placeholder, self.mapping[placeholder])
+
+        self._participants[key] = placeholder
+        self._pattern = None
+        return placeholder
+
+    def _name_pattern(self) -> re.Pattern:
+        if self._pattern is None:
+            # Full names first, then their first words when they are given
+            # names ("Ana Garcia", "Ana"; not "Mi" of "Mi Amor").  Case
+            # sensitive: "luz" or "rosa" in a sentence are not names.
+            self._variants = {_title_name(key): placeholder for key, placeholder in self._participants.items()}
+            for key, placeholder in self._participants.items():
+                first = _title_name(key.split()[0])
+                if first in self._given_names:
+                    self._variants.setdefault(first, placeholder)
+            alternation = "|".join(re.escape(v) for v in sorted(self._variants, key=len, reverse=True))
+            self._pattern = re.compile(rf"\b(?:{alternation})\b")
+        return self._pattern
+
+    def add_participants(self, names: Iterable[str]) -> None:
+        """
+        Register every participant before any text is pseudonymized, so that
+        a name mentioned before its owner's first message is replaced too.
+        """
+        for name in names:
+            if name:
+                self._add(name)
+
+    def sender(self, name: Optional[str]) -> Optional[str]:
+        if not name:
+            return None
+        placeholder = self._add(name)     # may rebind self.mapping
+        return self.mapping[placeholder]
+
+    def text(self, text: str) -> str:
+        """
+        *text* with the names of the participants replaced by their
+        pseudonyms (see `add_participants`).  Names are matched capitalized,
+        as they are written, so ordinary words are left alone.
+
+        Example
+        -------
+        >>> names_df = pd.DataFrame({"name": ["Luz", "Mi"], "gender": ["F", "F"], "frequency": [3451, 30]})
+        >>> pseudonymizer = Pseudonymizer(names_df, salt="salt")
+        >>> pseudonymizer.add_participants(["Mi Amor", "Luz García"])
+        >>> pseudonymizer.text("mi casa es tu casa, apaga la luz")
+        'mi casa es tu casa, apaga la luz'
+        >>> pseudonymizer.text("Luz García") == pseudonymizer.text("Luz") == pseudonymizer.sender("Luz García")
+        True
+        """
+        if not self._participants:
+            return text
+
+        pattern = self._name_pattern()
+        folded = strip_accents(text)
+        if len(folded) != len(text):    # accents that do not fold one to one: match as written
+            folded = text
+
+        pieces, last = [], 0
+        for match in pattern.finditer(folded):
+            pieces.append(text[last:match.start()])
+            pieces.append(self._variants[match.group(0)])
+            last = match.end()
+        pieces.append(text[last:])
+
+        return substitute_placeholders("".join(pieces), self.mapping)
@@ -0,0 +1,174 @@
+from padai.config.settings import settings
+from padai.datasets.chat_exports import ChatMessage, Pseudonymizer
+from contextlib import closing
+from pathlib import Path
+from typing import Counter, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import hmac
+import logging
+import sqlite3
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS conversations (
+        id              TEXT        PRIMARY KEY,
+        source_id       TEXT,
+        language        TEXT        NOT NULL,
+        created_at      TEXT        DEFAULT (datetime('now'))
+    );
+    CREATE TABLE IF NOT EXISTS participants (
+        conversation_id TEXT        NOT NULL REFERENCES conversations(id),
+        name_hash       TEXT        NOT NULL,
+        placeholder     TEXT        NOT NULL,
+        pseudonym       TEXT        NOT NULL,
+        PRIMARY KEY (conversation_id, name_hash)
+    );
+    CREATE TABLE IF NOT EXISTS communications (
+        id              INTEGER     PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT        NOT NULL REFERENCES conversations(id),
+        message_hash    TEXT        NOT NULL,
+        sent_at         TEXT,
+        sender          TEXT,
+        text            TEXT        NOT NULL,
+        language        TEXT        NOT NULL,
+        created_at      TEXT        DEFAULT (datetime('now')),
+        UNIQUE (conversation_id, message_hash)
+    );
+"""
+
+_SQL_INSERT = """
+    INSERT OR IGNORE INTO communications (conversation_id, message_hash, sent_at, sender, text, language)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def get_conversations_path() -> Path:
+    return settings.path_in_home("db/psychological_abuse/conversations.sqlite")
+
+
+def get_message_hash(message: ChatMessage, salt: str, occurrence: int = 0) -> str:
+    """
+    Identity of a message in its conversation, computed before
+    pseudonymization: a keyed hash (so it cannot be brute-forced back to the
+    real sender and text) of the message and of its *occurrence* among
+    identical ones, so that repeated messages are all kept.
+    """
+    payload = f"{message.sent_at.isoformat() if message.sent_at else ''}\x1f{message.sender or ''}\x1f{message.text}\x1f{occurrence}"
+    return hmac.new(salt.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+class ConversationStore:
+    """
+    Pseudonymized messages of imported chat exports, grouped by
+    conversation.  Real names are never stored: participants are kept as a
+    salted hash with their placeholder and pseudonym.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_conversations_path()
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SQL_CREATE)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def ensure_conversation(self, conversation_id: str, language: str, source_id: Optional[str] = None) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO conversations (id, source_id, language) VALUES (?, ?, ?)",
+                (conversation_id, source_id, language),
+            )
+            conn.commit()
+
+    def get_participants(self, conversation_id: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """(name hash → placeholder, placeholder → pseudonym) of *conversation_id*."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT name_hash, placeholder, pseudonym FROM participants WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchall()
+        return {h: p for h, p, _ in rows}, {p: n for _, p, n in rows}
+
+    def add_participant(self, conversation_id: str, name_hash: str, placeholder: str, pseudonym: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO participants (conversation_id, name_hash, placeholder, pseudonym) VALUES (?, ?, ?, ?)",
+                (conversation_id, name_hash, placeholder, pseudonym),
+            )
+            conn.commit()
+
+    def insert_messages(
+        self,
+        conversation_id: str,
+        messages: Iterable[ChatMessage],
+        pseudonymizer: Pseudonymizer,
+        language: str,
+        batch_size: int = 1000,
+    ) -> Tuple[int, int]:
+        """
+        Pseudonymize and insert *messages*, *batch_size* per transaction;
+        messages already stored (same hash) are skipped.  Every participant
+        must be registered with the pseudonymizer first (see
+        `Pseudonymizer.add_participants`).  Returns (inserted, skipped).
+        """
+        inserted = skipped = 0
+        batch: List[tuple] = []
+
+        # Occurrences of identical (sender, text) at the current sent_at;
+        # exports are chronological, so only the current minute is kept.
+        occurrences: Counter[Tuple[Optional[str], str]] = Counter()
+        current_sent_at = None
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA synchronous=NORMAL")    # safe with WAL, much faster for bulk inserts
+
+            def _flush() -> None:
+                nonlocal inserted, skipped
+                before = conn.total_changes
+                with conn:
+                    conn.executemany(_SQL_INSERT, batch)
+                changes = conn.total_changes - before
+                inserted += changes
+                skipped += len(batch) - changes
+                batch.clear()
+
+            for message in messages:
+                if message.sent_at != current_sent_at:
+                    occurrences.clear()
+                    current_sent_at = message.sent_at
+                occurrence = occurrences[message.sender, message.text]
+                occurrences[message.sender, message.text] += 1
+
+                sender = pseudonymizer.sender(message.sender)
+                batch.append((
+                    conversation_id,
+                    get_message_hash(message, pseudonymizer.salt, occurrence),
+                    message.sent_at.isoformat(sep=" ") if message.sent_at else None,
+                    sender,
+                    pseudonymizer.text(message.text),
+                    language,
+                ))
+                if len(batch) >= batch_size:
+                    _flush()
+                    logger.debug("%d messages inserted, %d skipped", inserted, skipped)
+
+            if batch:
+                _flush()
+
+        return inserted, skipped
+
+    def get_messages_df(self, conversation_id: str, after_id: int = 0, limit: Optional[int] = None) -> pd.DataFrame:
+        """Messages of *conversation_id* with an id above *after_id*, in import order."""
+        query = "SELECT id, sent_at, sender, text, language FROM communications WHERE conversation_id = ? AND id > ? ORDER BY id"
+        params: tuple = (conversation_id, after_id)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(query, conn, params=params, index_col="id", parse_dates=["sent_at"])
@@ -3,7 +3,7 @@ import sqlite3
 import pandas as pd
 from padai.datasets.base import get_names_pool, NameFrequencyCache, build_name_token_dict_many
 from padai.config.language import Language
-from typing import Dict, Tuple, Iterable, Optional
+from typing import Dict, Tuple, Iterable, List, Optional
 from padai.utils.text import substitute_placeholders
 from padai.config.settings import settings
 import time
@@ -157,6 +157,26 @@ def get_communications_sample(
     return row["text"], row["context"]
 
 
+def get_communications_messages(
+    df: pd.DataFrame,
+    *,
+    language: Language,
+    limit: Optional[int] = None,
+) -> List[Tuple[str, Optional[str]]]:
+    """
+    (text, context) of the communications in *language*, in order, the
+    first *limit* only when set; missing contexts (``pd.NA``) become None.
+    """
+    subset = df[df["language"] == language.value]
+    if limit is not None:
+        subset = subset.head(limit)
+
+    return [
+        (text, context if isinstance(context, str) else None)
+        for text, context in zip(subset["text"], subset["context"])
+    ]
+
+
 def get_or_create_communication(
     id_: int,
     df: pd.DataFrame,
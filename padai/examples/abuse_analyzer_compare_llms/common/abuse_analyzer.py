@@ -2,8 +2,10 @@ from padai.llms.base import get_chat_model
 from padai.datasets.psychological_abuse import get_communications_df, get_communications_sample
 from padai.config.settings import settings
 from padai.chains.abuse_analyzer import get_abuse_analyzer_chain, get_abuse_analyzer_params
+from padai.chains.budget import BUDGET_STATS
 from padai.utils.text import process_response
 from padai.llms.disposable import make_disposable
+from padai.llms.gc_policy import DISPOSAL_POLICY
 import logging
 
 
@@ -33,4 +35,7 @@ def log_models(models) -> None:
         finally:
             # Important: drop chain reference so GC can break the link to llm
             del chain
-            disposable.dispose()
\ No newline at end of file
+            disposable.dispose()
+
+    DISPOSAL_POLICY.log_summary()
+    BUDGET_STATS.log_summary()
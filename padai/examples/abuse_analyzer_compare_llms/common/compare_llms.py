@@ -8,14 +8,23 @@ from padai.chains.abuse_analyzer import (
     get_abuse_analyzer_prompts,
     get_abuse_analyzer_compare_llm_params,
     get_abuse_analyzer_compare_llm_prompts,
+    get_abuse_analyzer_rank_llm_params,
+    get_abuse_analyzer_rank_llm_prompts,
+    parse_abuse_analyzer_ranking,
 )
 from padai.prompts.psychological_abuse import compare_llm_responses
-from typing import Dict, MutableMapping, List, Set, cast
+from typing import Callable, Dict, MutableMapping, List, Optional, Set, Tuple, cast
+from collections import Counter
 from itertools import combinations
-from padai.chains.base import build_prompt_llm_parser_chain
+from padai.chains.base import invoke_prompt_llm_parser_chain
+from padai.chains.budget import BUDGET_STATS
+from padai.chains.compress import CompressMode, CompressedResponses, compress_response
+from padai.llms.gc_policy import DISPOSAL_POLICY
+from padai.llms.tokenizers import get_token_counter
 from padai.plots.compare_llms import (
     create_compare_llm_figure,
     create_empty_compare_llm_dataframe,
+    SKIPPED,
     get_row_scores,
     get_row_scores_many,
     normalize_scores,
@@ -29,9 +38,17 @@ from padai.plots.compare_llms import (
 )
 from padai.config.settings import settings
 from padai.utils.path import safe_file_name
+from filelock import FileLock
 from pathlib import Path
+import argparse
 import hashlib
 import logging
+import math
+import os
+import random
+import string
+import subprocess
+import sys
 import pandas as pd
 from padai.experiments.base import Experiments
 
@@ -52,15 +69,7 @@ def invoke(
 
     system_prompt, human_prompt = get_abuse_analyzer_prompts(language, severity, user_context=context)
 
-    chain, disposable = build_prompt_llm_parser_chain(description, system_prompt, human_prompt)
-
-    try:
-        return chain.invoke(params)
-
-    finally:
-        # Important: drop chain reference so GC can break the link to llm
-        del chain
-        disposable.dispose()
+    return invoke_prompt_llm_parser_chain(description, system_prompt, human_prompt, params)
 
 
 def _fingerprint(text: str, context: str) -> str:
@@ -157,11 +166,352 @@ def get_referee_errors(scores: Dict[int, Dict[str, pd.DataFrame]]) -> pd.DataFra
     return errors
 
 
+def get_responses(
+        llm_cache: LLMCache,
+        severity: str,
+        text: str,
+        context: str,
+        language: Language,
+        descriptions: List[ChatModelDescriptionEx],
+) -> Dict[str, str]:
+    return {
+        description.full_name: process_response(invoke_cached(llm_cache, severity, text, context, language, description))
+        for description in descriptions
+    }
+
+
+def judge_pair(
+        referee: ChatModelDescriptionEx,
+        text: str,
+        context: str,
+        language: Language,
+        left_response: str,
+        right_response: str,
+) -> Tuple[int, int]:
+    """Ask *referee* to compare two analyses; return the (left, right) scores."""
+    params = get_abuse_analyzer_compare_llm_params(text, left_response, right_response, context=context)
+
+    system_prompt, human_prompt = get_abuse_analyzer_compare_llm_prompts(language)
+
+    response: str = process_response(
+        invoke_prompt_llm_parser_chain(
+            referee,
+            system_prompt,
+            human_prompt,
+            params,
+            temperature=0,
+            top_p=1,
+        )
+    )
+
+    logger.info(f"Response: {response}")
+
+    if response.startswith(compare_llm_responses[language]["left"]):
+        return 2, 0
+    elif response.startswith(compare_llm_responses[language]["right"]):
+        return 0, 2
+    elif response.startswith(compare_llm_responses[language]["tie"]):
+        return 1, 1
+    else:
+        return -2, -2
+
+
+def judge_pairwise(
+        referee: ChatModelDescriptionEx,
+        text: str,
+        context: str,
+        language: Language,
+        model_names: List[str],
+        responses: Dict[str, str],
+) -> pd.DataFrame:
+    """One referee call per pair of models."""
+    df = create_empty_compare_llm_dataframe(model_names)
+
+    for left, right in combinations(model_names, 2):
+        logger.info(f"{left} vs {right}")
+
+        df.at[left, right], df.at[right, left] = judge_pair(
+            referee, text, context, language, responses[left], responses[right]
+        )
+
+    return df
+
+
+def judge_listwise(
+        referee: ChatModelDescriptionEx,
+        text: str,
+        context: str,
+        language: Language,
+        model_names: List[str],
+        responses: Dict[str, str],
+        seed: str,
+) -> pd.DataFrame:
+    """
+    One referee call ranking every model at once; the ranking is turned into
+    the same pairwise matrix `judge_pairwise` produces.
+
+    Models are shown under letters assigned in a random order (reproducible
+    from *seed*), so the referee can neither recognise them nor favour a
+    position.
+    """
+    if len(model_names) > len(string.ascii_uppercase):
+        raise ValueError(f"Listwise judging supports at most {len(string.ascii_uppercase)} models")
+
+    shuffled = list(model_names)
+    random.Random(seed).shuffle(shuffled)
+    labels = dict(zip(string.ascii_uppercase, shuffled))
+
+    params = get_abuse_analyzer_rank_llm_params(
+        language,
+        text,
+        {label: responses[name] for label, name in labels.items()},
+        context=context,
+    )
+
+    system_prompt, human_prompt = get_abuse_analyzer_rank_llm_prompts(language)
+
+    response: str = process_response(
+        invoke_prompt_llm_parser_chain(
+            referee,
+            system_prompt,
+            human_prompt,
+            params,
+            temperature=0,
+            top_p=1,
+        )
+    )
+
+    logger.info(f"Response: {response}")
+
+    df = create_empty_compare_llm_dataframe(model_names)
+    ranks = parse_abuse_analyzer_ranking(response, list(labels))
+
+    for left, right in combinations(labels, 2):
+        if ranks is None:
+            value = (-2, -2)
+        elif ranks[left] < ranks[right]:
+            value = (2, 0)
+        elif ranks[left] > ranks[right]:
+            value = (0, 2)
+        else:
+            value = (1, 1)
+
+        df.at[labels[left], labels[right]], df.at[labels[right], labels[left]] = value
+
+    return df
+
+
+def majority_confidence(votes: List[int]) -> float:
+    """
+    Posterior probability that the most common valid vote among *votes* is
+    what most referees would answer: P(p > 1/2) for p ~ Beta(k + 1, n - k + 1),
+    with k votes for it out of n valid ones, which equals
+    P(Binomial(n + 1, 1/2) <= k).
+    """
+    valid = [vote for vote in votes if vote >= 0]
+    if not valid:
+        return 0.0
+
+    n = len(valid)
+    k = Counter(valid).most_common(1)[0][1]
+    return sum(math.comb(n + 1, i) for i in range(k + 1)) / 2 ** (n + 1)
+
+
+def load_cached_scores(
+        cache_path: Path,
+        ids: List[int],
+        descriptions: List[ChatModelDescriptionEx],
+) -> Dict[int, Dict[str, pd.DataFrame]]:
+    """Pairwise matrices of previous full runs found in *cache_path*."""
+    scores: Dict[int, Dict[str, pd.DataFrame]] = {}
+
+    for id_ in ids:
+        for referee in descriptions:
+            df_path = cache_path / safe_file_name(f"df.{id_}.{referee.full_name}.pkl")
+            if df_path.exists():
+                scores.setdefault(id_, {})[referee.full_name] = pd.read_pickle(df_path)
+
+    return scores
+
+
+def get_referee_order(
+        descriptions: List[ChatModelDescriptionEx],
+        history: Dict[int, Dict[str, pd.DataFrame]],
+) -> List[ChatModelDescriptionEx]:
+    """*descriptions* sorted from most to least reliable referee (lowest MSE, then mode errors)."""
+    if not history:
+        return list(descriptions)
+
+    errors = get_referee_errors(history)
+
+    def key(description: ChatModelDescriptionEx) -> Tuple[float, float]:
+        if description.full_name not in errors.index:
+            return math.inf, math.inf     # no history: ask last
+        row = errors.loc[description.full_name]
+        return row["mse"], row["mode"]
+
+    return sorted(descriptions, key=key)
+
+
+def judge_sequential(
+        referees: List[ChatModelDescriptionEx],
+        text: str,
+        context: str,
+        language: Language,
+        model_names: List[str],
+        get_referee_responses: Callable[[ChatModelDescriptionEx], Dict[str, str]],
+        confidence: float,
+) -> Tuple[Dict[str, pd.DataFrame], int]:
+    """
+    Judge every pair asking *referees* in order, and stop asking about a
+    pair as soon as the majority verdict reaches *confidence* (see
+    `majority_confidence`).  Cells of referees that were not asked are
+    `SKIPPED`.  Returns one matrix per referee and the number of skipped calls.
+    """
+    dfs: Dict[str, pd.DataFrame] = {}
+    for referee in referees:
+        df = create_empty_compare_llm_dataframe(model_names)
+        dfs[referee.full_name] = df.mask(df >= 0, SKIPPED)
+
+    responses: Dict[str, Dict[str, str]] = {}
+    skipped = 0
+
+    for left, right in combinations(model_names, 2):
+        votes: List[int] = []
+
+        for referee in referees:
+            logger.info(f"{left} vs {right} ({referee.full_name})")
+
+            if referee.full_name not in responses:
+                responses[referee.full_name] = get_referee_responses(referee)
+            referee_responses = responses[referee.full_name]
+
+            df = dfs[referee.full_name]
+            df.at[left, right], df.at[right, left] = judge_pair(
+                referee, text, context, language, referee_responses[left], referee_responses[right]
+            )
+            votes.append(df.at[left, right])
+
+            if majority_confidence(votes) >= confidence:
+                break
+
+        skipped += len(referees) - len(votes)
+
+    return dfs, skipped
+
+
+def impute_skipped(dfs: Dict[str, pd.DataFrame], referees: List[ChatModelDescriptionEx]) -> Dict[str, pd.DataFrame]:
+    """
+    Replace `SKIPPED` cells with the verdict of the referees that were asked
+    (the most common one; ties go to the most reliable referee), so that
+    totals summed over referees stay comparable with a full run.
+    """
+    imputed = {name: df.copy() for name, df in dfs.items()}
+    model_names = list(next(iter(dfs.values())).index)
+
+    for left, right in combinations(model_names, 2):
+        votes = [dfs[r.full_name].at[left, right] for r in referees if dfs[r.full_name].at[left, right] >= 0]
+        if not votes:
+            continue
+
+        counts = Counter(votes)
+        best = max(counts.values())
+        consensus = next(vote for vote in votes if counts[vote] == best)
+
+        for df in imputed.values():
+            if df.at[left, right] == SKIPPED:
+                df.at[left, right], df.at[right, left] = consensus, 2 - consensus
+
+    return imputed
+
+
+def get_shard(key: str, shards: int) -> int:
+    """Shard of a unit of work, from a stable hash so that every process and machine agrees."""
+    return int(hashlib.sha256(key.encode()).hexdigest(), 16) % shards
+
+
+def _to_pickle_atomic(obj, path: Path) -> None:
+    """Pickle *obj* so that readers (e.g. the merge step) never see a partial file."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    pd.to_pickle(obj, tmp_path)
+    tmp_path.replace(path)
+
+
+def add_shard_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("sharding")
+    group.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Judge in N local worker processes, one shard each, then merge",
+    )
+    group.add_argument("--shards", type=int, default=1, metavar="N", help="Number of shards (default: 1)")
+    group.add_argument(
+        "--shard",
+        type=int,
+        default=None,
+        metavar="I",
+        help="Only judge shard I (0-based) of --shards and skip the report, e.g. on another machine",
+    )
+    group.add_argument("--merge", action="store_true", help="Only build the report from the judgements of every shard")
+
+
+def check_shard_arguments(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.shard is not None and not 0 <= args.shard < args.shards:
+        parser.error("--shard must be between 0 and --shards - 1")
+    if args.workers is not None and (args.shard is not None or args.merge):
+        parser.error("--workers launches the shards and merges them itself")
+
+
+def launch_shards(module: str, argv: List[str], workers: int) -> None:
+    """
+    Run ``python -m module`` once per shard, *workers* processes at once,
+    with *argv* plus the shard options, and wait for all of them.
+    """
+    argv = list(argv)
+    for option in ("--workers", "--shards"):
+        while option in argv:
+            index = argv.index(option)
+            del argv[index:index + 2]
+    argv = [arg for arg in argv if not arg.startswith(("--workers=", "--shards="))]
+
+    processes = [
+        subprocess.Popen([sys.executable, "-m", module, *argv, "--shards", str(workers), "--shard", str(shard)])
+        for shard in range(workers)
+    ]
+    failed = [shard for shard, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        raise RuntimeError(f"Shards {failed} failed; run them again with --shards {workers} --shard I")
+
+
 def run(
         descriptions: List[ChatModelDescriptionEx],
         descriptions_registry: Dict[str, ChatModelDescriptionEx],
         relative: str | Path,
+        listwise: bool = False,
+        compress_budget: Optional[int] = None,
+        compress_mode: CompressMode = "truncate",
+        compressor: Optional[ChatModelDescriptionEx] = None,
+        early_stopping: Optional[float] = None,
+        shards: int = 1,
+        shard: Optional[int] = None,
+        merge_only: bool = False,
 ) -> None:
+    """
+    Judge every communication × referee and build the score figures.
+
+    With *shard* set, only the judgements whose key hashes to it (see
+    `get_shard`) out of *shards* are made and the report is skipped, so that
+    several processes or machines sharing the cache directory can split the
+    work; a final run with *merge_only* then builds the same figures as a
+    single-process run from their judgement files.
+    """
+
+    if listwise and early_stopping is not None:
+        raise ValueError("early_stopping applies to pairwise judging, not listwise")
+    if compress_budget is not None and compress_mode == "summarize" and compressor is None:
+        raise ValueError("summarize needs a compressor model")
 
     set_llm_sqlite_cache()
 
@@ -173,74 +523,182 @@ def run(
 
     model_names = [description.full_name for description in descriptions]
 
-    scores: Dict[int, Dict[str, pd.DataFrame]] = {}
-
     cache_path = settings.path_in_cache(relative, is_file=False)
 
-    experiments: Experiments = Experiments(relative)
+    # Listwise matrices, or matrices judged on compressed analyses, are not
+    # comparable with the plain pairwise ones: keep them apart (summaries by
+    # different compressors too)
+    variant: List[str] = []
+    if listwise:
+        variant.append("listwise")
+    if compress_budget is not None:
+        if compress_mode == "summarize":
+            variant.append(f"{compress_mode}-{compress_budget}-{safe_file_name(compressor.full_name)}")
+        else:
+            variant.append(f"{compress_mode}-{compress_budget}")
+    if early_stopping is not None:
+        variant.append(f"sequential-{early_stopping}")
+
+    prefix = ".".join(["df", *variant])
+
+    compressed_responses = CompressedResponses() if compress_mode == "summarize" else None
+
+    referees = list(descriptions)
+    if early_stopping is not None:
+        referees = get_referee_order(
+            descriptions,
+            load_cached_scores(cache_path, list(communications_df.index), descriptions),
+        )
+        logger.info("Referee order: %s", ", ".join(r.full_name for r in referees))
+
+    # Early stopping decides which referees to ask per communication, so its
+    # unit of work is the communication; otherwise it is communication × referee.
+    def get_sequential_path(id_) -> Path:
+        return cache_path / safe_file_name(f"{prefix}.{id_}.pkl")
+
+    def get_df_path(id_, referee: ChatModelDescriptionEx) -> Path:
+        return cache_path / safe_file_name(f"{prefix}.{id_}.{referee.full_name}.pkl")
 
-    for id_ in communications_df.index:
+    def is_mine(key: str) -> bool:
+        return shard is None or get_shard(key, shards) == shard
+
+    for id_ in [] if merge_only else communications_df.index:
         communication = get_or_create_communication(id_, communications_df)
 
         text = communication["text"]
         context = strip_text(communication["context"])
         language = Language(communication["language"])
 
-        scores[id_] = {}
+        def get_referee_responses(referee: ChatModelDescriptionEx) -> Dict[str, str]:
+            # Shards judging the same communication wait for the first one to
+            # fill the LLM cache instead of all asking for the same analyses.
+            with FileLock(cache_path / safe_file_name(f"responses.{id_}.lock")):
+                responses = get_responses(llm_cache, severity, text, context, language, descriptions)
+
+            if compress_budget is None:
+                return responses
+
+            count_tokens = get_token_counter(referee)
+            return {
+                name: compress_response(
+                    response,
+                    compress_budget,
+                    count_tokens,
+                    language,
+                    mode=compress_mode,
+                    compressor=compressor,
+                    store=compressed_responses,
+                )
+                for name, response in responses.items()
+            }
+
+        if early_stopping is not None:
+            sequential_path = get_sequential_path(id_)
+
+            if is_mine(str(id_)) and not sequential_path.exists():
+                _to_pickle_atomic(
+                    judge_sequential(
+                        referees, text, context, language, model_names, get_referee_responses, early_stopping
+                    ),
+                    sequential_path,
+                )
+            continue
 
         for referee in descriptions:
-            logger.info(f"Referee: {referee.full_name}")
+            df_path = get_df_path(id_, referee)
 
-            df_path = cache_path / safe_file_name(f"df.{id_}.{referee.full_name}.pkl")
+            if not is_mine(f"{id_}.{referee.full_name}") or df_path.exists():
+                continue
 
-            if df_path.exists():
-                df = pd.read_pickle(df_path)
-            else:
-                df = create_empty_compare_llm_dataframe(model_names)
+            logger.info(f"Referee: {referee.full_name}")
+            responses = get_referee_responses(referee)
 
-                for left, right in combinations(descriptions, 2):
-                    logger.info(f"{left.full_name} vs {right.full_name}")
+            if listwise:
+                df = judge_listwise(
+                    referee, text, context, language, model_names, responses, seed=f"{id_}.{referee.full_name}"
+                )
+            else:
+                df = judge_pairwise(referee, text, context, language, model_names, responses)
+
+            _to_pickle_atomic(df, df_path)
+
+    if shard is not None:
+        logger.info("Shard %d of %d judged", shard, shards)
+        DISPOSAL_POLICY.log_summary()
+        BUDGET_STATS.log_summary()
+        return
+
+    missing = [
+        path
+        for id_ in communications_df.index
+        for path in (
+            [get_sequential_path(id_)] if early_stopping is not None
+            else [get_df_path(id_, referee) for referee in descriptions]
+        )
+        if not path.exists()
+    ]
+    if missing:
+        raise FileNotFoundError(f"{len(missing)} judgements missing (e.g. {missing[0]}): not every shard has finished")
+
+    report(
+        communications_df.index,
+        descriptions,
+        descriptions_registry,
+        referees,
+        Experiments(Path(relative, *variant)),
+        get_sequential_path if early_stopping is not None else None,
+        get_df_path,
+        len(model_names),
+    )
 
-                    left_response: str = process_response(invoke_cached(llm_cache, severity, text, context, language, left))
-                    right_response: str = process_response(invoke_cached(llm_cache, severity, text, context, language, right))
+    DISPOSAL_POLICY.log_summary()
+    BUDGET_STATS.log_summary()
 
-                    params = get_abuse_analyzer_compare_llm_params(text, left_response, right_response, context=context)
 
-                    system_prompt, human_prompt = get_abuse_analyzer_compare_llm_prompts(language)
+def report(
+        ids,
+        descriptions: List[ChatModelDescriptionEx],
+        descriptions_registry: Dict[str, ChatModelDescriptionEx],
+        referees: List[ChatModelDescriptionEx],
+        experiments: Experiments,
+        get_sequential_path: Optional[Callable[..., Path]],
+        get_df_path: Callable[..., Path],
+        model_count: int,
+) -> None:
+    """
+    Build the score figures from the judgement files, in the order of a
+    single-process run, so that sharded and single runs give the same ones.
+    """
+    scores: Dict[int, Dict[str, pd.DataFrame]] = {}       # what totals and rankings are computed from
+    raw_scores: Dict[int, Dict[str, pd.DataFrame]] = {}   # as judged (with SKIPPED cells); for referee errors
 
-                    chain, disposable = build_prompt_llm_parser_chain(
-                        referee,
-                        system_prompt,
-                        human_prompt,
-                        temperature=0,
-                        top_p=1,
-                    )
-                    try:
-                        response: str = process_response(chain.invoke(params))
+    skipped_calls = 0
+    total_calls = 0
 
-                    finally:
-                        # Important: drop chain reference so GC can break the link to llm
-                        del chain
-                        disposable.dispose()
+    for id_ in ids:
+        scores[id_] = {}
+        raw_scores[id_] = {}
 
-                    logger.info(f"Response: {response}")
+        sequential: Optional[Dict[str, pd.DataFrame]] = None
+        if get_sequential_path is not None:
+            sequential, skipped = pd.read_pickle(get_sequential_path(id_))
 
-                    if response.startswith(compare_llm_responses[language]["left"]):
-                        df.at[left.full_name, right.full_name] = 2
-                        df.at[right.full_name, left.full_name] = 0
-                    elif response.startswith(compare_llm_responses[language]["right"]):
-                        df.at[left.full_name, right.full_name] = 0
-                        df.at[right.full_name, left.full_name] = 2
-                    elif response.startswith(compare_llm_responses[language]["tie"]):
-                        df.at[left.full_name, right.full_name] = 1
-                        df.at[right.full_name, left.full_name] = 1
-                    else:
-                        df.at[left.full_name, right.full_name] = -2
-                        df.at[right.full_name, left.full_name] = -2
+            calls = len(referees) * model_count * (model_count - 1) // 2
+            logger.info("Early stopping skipped %d of %d referee calls for %s", skipped, calls, id_)
+            skipped_calls += skipped
+            total_calls += calls
 
-                df.to_pickle(df_path)
+            imputed = impute_skipped(sequential, referees)
 
-            scores[id_][referee.full_name] = df
+        for referee in descriptions:
+            if sequential is not None:
+                df = sequential[referee.full_name]
+                raw_scores[id_][referee.full_name] = df
+                scores[id_][referee.full_name] = imputed[referee.full_name]
+            else:
+                df = pd.read_pickle(get_df_path(id_, referee))
+                raw_scores[id_][referee.full_name] = df
+                scores[id_][referee.full_name] = df
 
             fig = create_compare_llm_figure(
                 ChatModelDescriptionEx.nice_index(
@@ -272,7 +730,7 @@ def run(
             )
             experiments.add_figure(total_mode_fig, "llm_score_matrix_mode")
 
-            errors = get_referee_errors(scores)
+            errors = get_referee_errors(raw_scores)
 
             errors_mse_barplot = barplot_with_outliers(
                 ChatModelDescriptionEx.nice_index(
@@ -301,4 +759,7 @@ def run(
                 title="LLM Ranking",
                 dpi=200,
             )
-            experiments.add_figure(barplot, "llm_ranking")
\ No newline at end of file
+            experiments.add_figure(barplot, "llm_ranking")
+
+    if get_sequential_path is not None:
+        logger.info("Early stopping skipped %d of %d referee calls in total", skipped_calls, total_calls)
@@ -1,16 +1,33 @@
 import padai.config.bootstrap  # noqa: F401 always first import in main entry points
 
 from padai.llms.available import default_available_models, default_available_models_registry
-from padai.examples.abuse_analyzer_compare_llms.common.compare_llms import run
+from padai.examples.abuse_analyzer_compare_llms.common.compare_llms import (
+    add_shard_arguments,
+    check_shard_arguments,
+    launch_shards,
+    run,
+)
 from pathlib import Path
+import argparse
+import sys
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare the available models, each one refereeing the others.")
+    add_shard_arguments(parser)
+    args = parser.parse_args(argv)
+    check_shard_arguments(parser, args)
+
+    if args.workers is not None:
+        launch_shards(__spec__.name, sys.argv[1:] if argv is None else argv, args.workers)
 
     run(
         default_available_models,
         default_available_models_registry,
         "abuse_analyzer_compare_llms/v1",
+        shards=args.workers or args.shards,
+        shard=args.shard,
+        merge_only=args.merge or args.workers is not None,
     )
 
 
@@ -1,16 +1,73 @@
 import padai.config.bootstrap  # noqa: F401 always first import in main entry points
 
 from padai.examples.abuse_analyzer_compare_llms.v2.models import models, models_registry
-from padai.examples.abuse_analyzer_compare_llms.common.compare_llms import run
+from padai.examples.abuse_analyzer_compare_llms.common.compare_llms import (
+    add_shard_arguments,
+    check_shard_arguments,
+    launch_shards,
+    run,
+)
 from pathlib import Path
+import argparse
+import sys
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare the v2 models, each one refereeing the others.")
+    parser.add_argument(
+        "--listwise",
+        action="store_true",
+        help="Referees rank all analyses in one call instead of judging every pair",
+    )
+    parser.add_argument(
+        "--compress-budget",
+        type=int,
+        default=None,
+        metavar="TOKENS",
+        help="Shorten each analysis to this many referee tokens before judging",
+    )
+    parser.add_argument(
+        "--compress-mode",
+        choices=["truncate", "summarize"],
+        default="truncate",
+        help="How analyses over budget are shortened (default: truncate)",
+    )
+    parser.add_argument(
+        "--compressor",
+        choices=[m.id for m in models],
+        default=None,
+        metavar="ID",
+        help="Model id that writes the summaries with --compress-mode summarize",
+    )
+    parser.add_argument(
+        "--early-stopping",
+        type=float,
+        default=None,
+        metavar="CONFIDENCE",
+        help="Ask referees in order of reliability and stop once a pair's verdict reaches this confidence (e.g. 0.95)",
+    )
+    add_shard_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.compress_mode == "summarize" and args.compressor is None:
+        parser.error("--compress-mode summarize needs --compressor")
+    check_shard_arguments(parser, args)
+
+    if args.workers is not None:
+        launch_shards(__spec__.name, sys.argv[1:] if argv is None else argv, args.workers)
 
     run(
         models,
         models_registry,
         "abuse_analyzer_compare_llms/v2",
+        listwise=args.listwise,
+        compress_budget=args.compress_budget,
+        compress_mode=args.compress_mode,
+        compressor=next((m for m in models if m.id == args.compressor), None),
+        early_stopping=args.early_stopping,
+        shards=args.workers or args.shards,
+        shard=args.shard,
+        merge_only=args.merge or args.workers is not None,
     )
 
 
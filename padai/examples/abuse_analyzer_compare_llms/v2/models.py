@@ -1,6 +1,7 @@
 from padai.llms.base import ChatModelDescriptionEx
 from padai.config.huggingface import get_default_device_int
 from typing import List, Dict
+import importlib.util
 
 MAX_NEW_TOKENS = 16 * 1024
 
@@ -26,6 +27,13 @@ _CPU_MODELS: List[ChatModelDescriptionEx] = [
     ChatModelDescriptionEx(id="gemma-3-1b-it",          label="CPU: Google Gemma 3 1B",             engine="huggingface",   params={"model_id": "google/gemma-3-1b-it", "max_new_tokens": MAX_NEW_TOKENS}),
 ]
 
+# Same CPU models as quantized GGUF weights run by llama.cpp: several times
+# faster and much smaller in RAM, used when llama-cpp-python is installed.
+_CPU_GGUF_MODELS: List[ChatModelDescriptionEx] = [
+    ChatModelDescriptionEx(id="Llama-3.2-1B-Instruct-GGUF", label="CPU: Meta Llama-3.2-1B-Instruct (GGUF Q4_K_M)", engine="llamacpp",     params={"model_id": "bartowski/Llama-3.2-1B-Instruct-GGUF", "filename": "Llama-3.2-1B-Instruct-Q4_K_M.gguf", "max_tokens": MAX_NEW_TOKENS, "n_ctx": MAX_NEW_TOKENS + 8 * 1024}),
+    ChatModelDescriptionEx(id="gemma-3-1b-it-GGUF",         label="CPU: Google Gemma 3 1B (GGUF Q4_K_M)",           engine="llamacpp",     params={"model_id": "bartowski/google_gemma-3-1b-it-GGUF", "filename": "google_gemma-3-1b-it-Q4_K_M.gguf", "max_tokens": MAX_NEW_TOKENS, "n_ctx": MAX_NEW_TOKENS + 8 * 1024}),
+]
+
 _GPU_MODELS: List[ChatModelDescriptionEx] = [
     ChatModelDescriptionEx(id="phi-4",                      label="GPU: Microsoft Phi-4",               engine="huggingface",   params={"model_id": "microsoft/phi-4", "max_new_tokens": MAX_NEW_TOKENS}),
     ChatModelDescriptionEx(id="gemma-3-12b-it",             label="GPU: Google Gemma 3 12B Instruct",   engine="huggingface",   params={"model_id": "google/gemma-3-12b-it", "max_new_tokens": MAX_NEW_TOKENS}),
@@ -36,9 +44,13 @@ _GPU_MODELS: List[ChatModelDescriptionEx] = [
 ]
 
 
+def _get_cpu_models() -> List[ChatModelDescriptionEx]:
+    return _CPU_GGUF_MODELS if importlib.util.find_spec("llama_cpp") is not None else _CPU_MODELS
+
+
 def _build_models() -> List["ChatModelDescriptionEx"]:
     out: List[ChatModelDescriptionEx] = list(_BASE_MODELS)
-    out.extend(_CPU_MODELS if get_default_device_int() == -1 else _GPU_MODELS)
+    out.extend(_get_cpu_models() if get_default_device_int() == -1 else _GPU_MODELS)
     return out
 
 
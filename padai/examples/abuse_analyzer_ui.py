@@ -3,44 +3,44 @@ import padai.config.bootstrap  # noqa: F401 always first import in main entry po
 import dash
 from dash import html, dcc, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
-from langchain.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from padai.config.settings import settings
 from padai.prompts.psychological_abuse import abuse_analyzer_prompts, abuse_analyzer_prompts_with_context
 from padai.datasets.psychological_abuse import get_communications_df, get_communications_sample
 from typing import Dict, Any
-from padai.llms.base import ChatModelDescriptionEx, get_chat_model
+from padai.llms.base import ChatModelDescriptionEx
 from padai.llms.available import default_available_models_registry, default_available_models
+from padai.llms.warm import WarmChatModels
 import logging
 from padai.chains.abuse_analyzer import get_abuse_analyzer_params
-from padai.utils.text import make_label, strip_text, process_response
+from padai.chains.base import get_chat_model_params, get_chain_fingerprint, build_prompt
+from padai.chains.budget import fit_abuse_analyzer_params
+from padai.utils.llm_cache import set_llm_sqlite_cache, lookup_llm_cache, update_llm_cache
+from langchain_core.output_parsers import StrOutputParser
+from padai.utils.text import make_label, strip_text, process_response, ReasoningStreamFilter
+from padai.utils.jobs import Job, JobQueue, JobLimitError
+from padai.chains.precomputed import (
+    PrecomputedAnalyses,
+    iter_precompute_tasks,
+    get_missing_precompute_tasks,
+    precompute,
+)
+from padai.chains.triage import load_triage_classifier
+from padai.chains.semantic_cache import get_semantic_cache, get_semantic_scope
+import threading
+import uuid
 
 logger = logging.getLogger(__name__)
 
+set_llm_sqlite_cache()
 
-def build_chain(
-    *,
-    model_description: ChatModelDescriptionEx,
-    system_prompt: str,
-    human_prompt: str,
-    temperature: float | None,
-):
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            ("human", human_prompt),
-        ]
-    )
-
-    params: Dict[str, Any] = model_description.params.copy()
-
-    if "no-temperature" not in model_description.tags:
-        params["temperature"] = temperature
-
-    llm = get_chat_model(model_description.engine, params)
-    parser = StrOutputParser()
-
-    return prompt | llm | parser
+# Analyses run on a shared worker pool, outside the Dash request threads, and
+# reuse loaded models between clicks.
+JOBS = JobQueue(
+    workers=settings.ui.workers,
+    max_jobs_per_owner=settings.ui.max_jobs_per_user,
+    retention=settings.ui.job_retention,
+)
+WARM_MODELS = WarmChatModels(settings.ui.warm_models)
 
 
 PRESET_LABELS = {
@@ -62,6 +62,34 @@ DEFAULT_HUMAN_CTX = abuse_analyzer_prompts_with_context[settings.language]["huma
 PREDEFINED_MESSAGES = get_communications_df()
 DEFAULT_TEXT, DEFAULT_CONTEXT = get_communications_sample(PREDEFINED_MESSAGES, language=settings.language)
 
+# Analyses of every predefined message × preset × model, computed offline by
+# `padai.commands.precompute_analyses` and served without calling the model.
+PRECOMPUTED = PrecomputedAnalyses()
+
+# Analyses reused for near-duplicates of messages analysed before (opt-in).
+SEMANTIC_CACHE = get_semantic_cache()
+
+# Messages the triage classifier scores clearly below its threshold are not
+# sent to the model (see `padai.commands.train_triage`).
+TRIAGE = load_triage_classifier()
+TRIAGE_SKIPPED = (
+    "El filtro previo no ha encontrado indicios de maltrato en este mensaje, por lo que no se ha enviado al modelo "
+    "para su análisis."
+)
+
+
+def _refresh_precomputed() -> None:
+    tasks = get_missing_precompute_tasks(
+        PRECOMPUTED,
+        iter_precompute_tasks(PREDEFINED_MESSAGES, PRESET_LABELS, default_available_models, settings.language),
+    )
+    logger.info("Refreshing %d precomputed analyses in the background", len(tasks))
+    precompute(PRECOMPUTED, tasks)
+
+
+if settings.ui.precompute_refresh:
+    threading.Thread(target=_refresh_precomputed, name="precompute-refresh", daemon=True).start()
+
 
 def _get_context_tab(context: str):
     return "ctx" if strip_text(context) else "no_ctx"
@@ -248,7 +276,15 @@ main_cards = html.Div(
         dbc.Card(
             [
                 dbc.CardHeader(html.H5("Análisis generado")),
-                dbc.CardBody(dcc.Markdown(id="output-md"), className="p-3"),
+                dbc.CardBody(
+                    [
+                        dcc.Markdown(id="output-md"),
+                        dcc.Store(id="session-id", storage_type="session"),
+                        dcc.Store(id="job-id"),
+                        dcc.Interval(id="job-interval", interval=settings.ui.poll_interval_ms, disabled=True),
+                    ],
+                    className="p-3",
+                ),
             ],
             style={"minHeight": "35vh", "overflowY": "auto"},
             className="shadow-sm",
@@ -344,10 +380,47 @@ def apply_preset(preset):
         return no_update, no_update
 
 
+def _run_analysis_job(
+    job: Job,
+    model_description: ChatModelDescriptionEx,
+    llm_params: Dict[str, Any],
+    system_prompt: str,
+    human_prompt: str,
+    params: Dict[str, str],
+    semantic_scope: str | None = None,
+) -> None:
+    stream_filter = ReasoningStreamFilter()
+    raw = []
+
+    messages = build_prompt(system_prompt, human_prompt).format_messages(**params)
+
+    with WARM_MODELS.lease(model_description.engine, llm_params) as llm:
+        cached = lookup_llm_cache(llm, messages)
+        if cached is not None:
+            job.text = process_response(cached)
+            return
+
+        for chunk in (llm | StrOutputParser()).stream(messages):
+            raw.append(chunk)
+            job.text += stream_filter.feed(chunk)
+
+        update_llm_cache(llm, messages, "".join(raw))
+
+    job.text += stream_filter.flush()
+    job.text = process_response("".join(raw))  # exact final rendering
+
+    if semantic_scope is not None:
+        SEMANTIC_CACHE.put(semantic_scope, params["user_input"], params.get("user_context"), settings.language.value, "".join(raw))
+
+
 @app.callback(
+    Output("job-id", "data"),
+    Output("job-interval", "disabled"),
+    Output("session-id", "data"),
     Output("output-md", "children"),
     Output("error", "children"),
     Input("analyze-btn", "n_clicks"),
+    State("session-id", "data"),
     State("model", "value"),
     State("temperature", "value"),
     State("system-prompt-no-ctx", "value"),
@@ -358,9 +431,11 @@ def apply_preset(preset):
     State("user-context", "value"),
     prevent_initial_call=True,
 )
-def run_analysis(n_clicks, model_id, temperature, system_prompt_no_ctx, human_prompt_no_ctx, system_prompt_ctx, human_prompt_ctx, user_input, user_context):
+def run_analysis(n_clicks, session_id, model_id, temperature, system_prompt_no_ctx, human_prompt_no_ctx, system_prompt_ctx, human_prompt_ctx, user_input, user_context):
+    session_id = session_id or str(uuid.uuid4())
+
     if not user_input or not user_input.strip():
-        return no_update, "Escribe un mensaje y pulsa Analizar."
+        return no_update, no_update, session_id, no_update, "Escribe un mensaje y pulsa Analizar."
 
     temp = None if model_id in NO_TEMP_MODELS else float(temperature or 0.0)
 
@@ -381,18 +456,66 @@ def run_analysis(n_clicks, model_id, temperature, system_prompt_no_ctx, human_pr
         system_prompt = system_prompt_no_ctx
         human_prompt = human_prompt_no_ctx
 
-    chain = build_chain(
-        model_description=model_description,
-        system_prompt=system_prompt,
-        human_prompt=human_prompt,
-        temperature=temp,
-    )
+    # Long contexts are trimmed to what the model accepts before anything is
+    # keyed on the params, so caches see what is actually sent.
+    params, _ = fit_abuse_analyzer_params(model_description, system_prompt, human_prompt, params)
+
+    llm_params = get_chat_model_params(model_description, temperature=temp)
+
+    # Identical requests already in flight (e.g. several users opening the
+    # same predefined message) share one job and one provider call.
+    fingerprint = get_chain_fingerprint(model_description, system_prompt, human_prompt, params, temperature=temp)
+
+    precomputed = PRECOMPUTED.get(fingerprint)
+    if precomputed is not None:
+        return no_update, True, session_id, process_response(precomputed), ""
+
+    semantic_scope = None
+    if SEMANTIC_CACHE is not None:
+        semantic_scope = get_semantic_scope(model_description, system_prompt, human_prompt, temperature=temp)
+        similar = SEMANTIC_CACHE.lookup(semantic_scope, params["user_input"], params.get("user_context"), settings.language.value)
+        if similar is not None:
+            return no_update, True, session_id, process_response(similar), ""
+
+    if TRIAGE is not None and not TRIAGE.needs_analysis(
+        [user_input], settings.triage.threshold, settings.triage.uncertainty
+    )[0]:
+        logger.info("run_analysis: skipped by triage")
+        return no_update, True, session_id, TRIAGE_SKIPPED, ""
+
     try:
-        result: str = process_response(chain.invoke(params))
-    except Exception as exc:  # fallback
-        return "", f"⚠️ Error inesperado: {exc}"
+        job = JOBS.submit(
+            session_id,
+            lambda j: _run_analysis_job(j, model_description, llm_params, system_prompt, human_prompt, params, semantic_scope),
+            key=fingerprint,
+        )
+    except JobLimitError:
+        return no_update, no_update, session_id, no_update, "Ya hay un análisis en curso; espera a que termine."
+
+    return job.id, False, session_id, "", ""
+
+
+@app.callback(
+    Output("output-md", "children", allow_duplicate=True),
+    Output("error", "children", allow_duplicate=True),
+    Output("job-interval", "disabled", allow_duplicate=True),
+    Input("job-interval", "n_intervals"),
+    State("job-id", "data"),
+    prevent_initial_call=True,
+)
+def poll_analysis(n_intervals, job_id):
+    job = JOBS.get(job_id)
+
+    if job is None:
+        return no_update, no_update, True
+
+    if not job.done:
+        return job.text, "", False
+
+    if job.error:
+        return "", f"⚠️ Error inesperado: {job.error}", True
 
-    return result, ""
+    return job.text, "", True
 
 
 # ---------------------------------------------------------------------------
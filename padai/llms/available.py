@@ -39,3 +39,10 @@ default_available_models_registry: Dict[str, ChatModelDescriptionEx] = {
     m.full_name: m for m in default_available_models
 }
 
+
+# Models of the analysis cascade (`padai.chains.cascade`), cheapest first:
+# a message only reaches a tier when the previous one was not confident enough.
+default_cascade_tiers: List[ChatModelDescriptionEx] = [
+    next(m for m in default_available_models if m.id == id_)
+    for id_ in ("gpt-5-nano", "gpt-5-mini", "gpt-5")
+]
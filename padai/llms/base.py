@@ -1,44 +1,87 @@
 from padai.config.settings import settings
-from padai.llms.aws import get_default_chat_bedrock, get_chat_bedrock
-from padai.llms.openai import get_default_chat_openai, get_chat_openai
-from padai.llms.google import get_default_chat_google, get_chat_google
-from padai.llms.huggingface import get_default_chat_huggingface, get_chat_huggingface
 from typing import Dict, Any, Callable, Set
 from pydantic import BaseModel, ConfigDict, Field, computed_field
-from padai.llms.engine import ChatEngine
+from padai.llms.engine import ChatEngine, LOCAL_CHAT_ENGINES
+from functools import lru_cache
+import importlib
+import threading
 import pandas as pd
 
 
-_FACTORIES: dict[str, Callable[[Dict[str, Any]], Any]] = {
-    "bedrock": get_chat_bedrock,
-    "openai":  get_chat_openai,
-    "google": get_chat_google,
-    "huggingface": get_chat_huggingface,
+# Factories are referenced as "module:function" and only imported the first
+# time an engine is used, so that importing this module does not pull in every
+# provider SDK (or torch) at startup.
+_FACTORIES: dict[str, str] = {
+    "bedrock": "padai.llms.aws:get_chat_bedrock",
+    "openai":  "padai.llms.openai:get_chat_openai",
+    "google": "padai.llms.google:get_chat_google",
+    "huggingface": "padai.llms.huggingface:get_chat_huggingface",
+    "openai_compatible": "padai.llms.openai_compatible:get_chat_openai_compatible",
+    "llamacpp": "padai.llms.llamacpp:get_chat_llamacpp",
 }
 
-_DEFAULT_FACTORIES: dict[str, Callable[[], Any]] = {
-    "bedrock": get_default_chat_bedrock,
-    "openai":  get_default_chat_openai,
-    "google": get_default_chat_google,
-    "huggingface": get_default_chat_huggingface,
+# Held while any model is built in this process.  Loaders that build module
+# skeletons without weights (`padai.llms.huggingface`) patch torch for the
+# whole process, so no other module may be constructed meanwhile, on any
+# thread; every construction path takes this lock.
+MODEL_LOAD_LOCK = threading.RLock()
+
+_DEFAULT_FACTORIES: dict[str, str] = {
+    "bedrock": "padai.llms.aws:get_default_chat_bedrock",
+    "openai":  "padai.llms.openai:get_default_chat_openai",
+    "google": "padai.llms.google:get_default_chat_google",
+    "huggingface": "padai.llms.huggingface:get_default_chat_huggingface",
+    "openai_compatible": "padai.llms.openai_compatible:get_default_chat_openai_compatible",
+    "llamacpp": "padai.llms.llamacpp:get_default_chat_llamacpp",
 }
 
 
-def get_chat_model(engine: ChatEngine, params: Dict[str, Any]):
+@lru_cache(maxsize=None)
+def _resolve_factory(spec: str) -> Callable[..., Any]:
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def build_chat_model(engine: ChatEngine, params: Dict[str, Any]):
+    """Build the chat model of *engine* in this process."""
     try:
-        return _FACTORIES[engine](params)
+        spec = _FACTORIES[engine]
     except KeyError:
         raise ValueError(f"Unknown chat model: {engine!r}") from None
 
+    with MODEL_LOAD_LOCK:
+        return _resolve_factory(spec)(params)
+
+
+def get_chat_model(engine: ChatEngine, params: Dict[str, Any]):
+    """
+    Build the chat model of *engine*.
+
+    Local engines run in a worker subprocess (see `padai.llms.worker`) when
+    ``params["isolate"]`` is true, defaulting to
+    ``settings.model_workers.isolate_local``.
+    """
+    params = dict(params)
+    isolate = params.pop("isolate", settings.model_workers.isolate_local)
+
+    if isolate and engine in LOCAL_CHAT_ENGINES:
+        worker_chat_model = _resolve_factory("padai.llms.worker:WorkerChatModel")
+        return worker_chat_model(engine=engine, worker_params=params)
+
+    return build_chat_model(engine, params)
+
 
 def get_default_chat_model():
     try:
-        return _DEFAULT_FACTORIES[settings.default_chat_model]()
+        spec = _DEFAULT_FACTORIES[settings.default_chat_model]
     except KeyError:
         raise ValueError(
             f"Unknown default chat model: {settings.default_chat_model!r}"
         ) from None
 
+    with MODEL_LOAD_LOCK:
+        return _resolve_factory(spec)()
+
 
 class ChatModelDescription(BaseModel):
     engine: ChatEngine
@@ -1,13 +1,15 @@
+from padai.llms.gc_policy import DISPOSAL_POLICY
 from typing import Protocol
-from langchain_huggingface import ChatHuggingFace
-import gc, torch
+import sys
 
 
 def _dispose_hf_chat_llm(chat_llm, *, aggressive: bool = False) -> None:
     """
     Best-effort cleanup for ChatHuggingFace wrapping a HuggingFacePipeline.
-    Frees GPU VRAM by moving model to CPU, dropping refs, and clearing caches.
+    Frees GPU VRAM by moving model to CPU and dropping refs; whether a full
+    collection follows is up to the disposal policy (see `DisposalPolicy`).
     """
+    model_id = getattr(chat_llm, "model_id", None)
     try:
         # chat_llm.llm is a HuggingFacePipeline wrapper
         pipe_wrapper = getattr(chat_llm, "llm", None)
@@ -25,10 +27,13 @@ def _dispose_hf_chat_llm(chat_llm, *, aggressive: bool = False) -> None:
         # Drop references
         del model, tok, t_pipe, pipe_wrapper
     finally:
-        gc.collect()
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-            if aggressive:
+        if not aggressive:
+            DISPOSAL_POLICY.after_dispose(model_id)
+        else:
+            import torch  # already loaded: the pipeline above was built with it
+
+            DISPOSAL_POLICY.force()
+            if torch.cuda.is_available():
                 # Only really useful if you've used CUDA IPC / multi-process sharing
                 torch.cuda.ipc_collect()
 
@@ -54,5 +59,44 @@ class HuggingFaceDisposable:
         self._llm = None
 
 
+class LlamaCppDisposable:
+    def __init__(self, chat_llm):
+        self._llm = chat_llm
+
+    def dispose(self) -> None:
+        if self._llm is None:
+            return
+        # Unmaps the weights and frees the llama.cpp context right away
+        close = getattr(self._llm.client, "close", None)
+        if close is not None:
+            close()
+        self._llm = None
+
+
+class WorkerDisposable:
+    def __init__(self, chat_llm):
+        self._llm = chat_llm
+
+    def dispose(self) -> None:
+        if self._llm is None:
+            return
+        # Ending the worker process frees everything it allocated, no gc needed
+        self._llm.close()
+        self._llm = None
+
+
+def _is_instance(llm, module_name: str, class_name: str) -> bool:
+    # If the module was never imported, *llm* cannot be one of its models;
+    # checking sys.modules avoids importing it (and torch) just to ask.
+    module = sys.modules.get(module_name)
+    return module is not None and isinstance(llm, getattr(module, class_name))
+
+
 def make_disposable(llm) -> Disposable:
-    return HuggingFaceDisposable(llm) if isinstance(llm, ChatHuggingFace) else NullDisposable()
+    if _is_instance(llm, "langchain_huggingface", "ChatHuggingFace"):
+        return HuggingFaceDisposable(llm)
+    if _is_instance(llm, "langchain_community.chat_models.llamacpp", "ChatLlamaCpp"):
+        return LlamaCppDisposable(llm)
+    if _is_instance(llm, "padai.llms.worker", "WorkerChatModel"):
+        return WorkerDisposable(llm)
+    return NullDisposable()
@@ -1,4 +1,9 @@
-from typing import Literal
+from typing import Literal, Set
 
 
-ChatEngine = Literal["openai", "bedrock", "google", "huggingface"]
+ChatEngine = Literal["openai", "bedrock", "google", "huggingface", "openai_compatible", "llamacpp"]
+
+
+# Engines that run the model inside this process: a loaded instance must not
+# be used by two threads at the same time.
+LOCAL_CHAT_ENGINES: Set[str] = {"huggingface", "llamacpp"}
@@ -0,0 +1,108 @@
+from padai.config.memory import MemorySettings
+from padai.config.settings import settings
+from padai.utils.memory import get_rss_bytes, get_vram_bytes
+from dataclasses import dataclass
+from typing import Optional
+import gc
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+
+@dataclass
+class CollectionTelemetry:
+    disposes: int = 0
+    collections: int = 0
+    gc_seconds: float = 0.0
+    rss_reclaimed: int = 0      # bytes
+    vram_reclaimed: int = 0     # bytes
+
+
+class DisposalPolicy:
+    """
+    Decides when disposing of a local model is worth a full collection.
+
+    Dropping the references to a model frees most of it right away; a full
+    ``gc.collect()`` (plus emptying the CUDA cache) is only needed to break
+    reference cycles, and it is slow.  Collections therefore happen only
+    when memory is above the configured watermarks after a dispose, or
+    before a *different* model is loaded while garbage from the previous one
+    may still be around.
+    """
+
+    def __init__(self, memory: MemorySettings) -> None:
+        self.memory = memory
+        self.telemetry = CollectionTelemetry()
+        self._pending: Optional[str] = None     # last disposed model not collected since
+        self._lock = threading.Lock()
+
+    def _under_pressure(self) -> Optional[str]:
+        if self.memory.rss_high_watermark_mb is not None:
+            rss = get_rss_bytes()
+            if rss is not None and rss > self.memory.rss_high_watermark_mb * _MB:
+                return "rss watermark"
+
+        vram = get_vram_bytes()
+        if vram is not None and vram[0] > self.memory.vram_high_watermark * vram[1]:
+            return "vram watermark"
+
+        return None
+
+    def _collect(self, reason: str) -> None:
+        rss_before, vram_before = get_rss_bytes(), get_vram_bytes()
+        start = time.perf_counter()
+
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+        elapsed = time.perf_counter() - start
+        rss_after, vram_after = get_rss_bytes(), get_vram_bytes()
+
+        rss_reclaimed = max(rss_before - rss_after, 0) if rss_before is not None and rss_after is not None else 0
+        vram_reclaimed = max(vram_before[0] - vram_after[0], 0) if vram_before and vram_after else 0
+
+        self.telemetry.collections += 1
+        self.telemetry.gc_seconds += elapsed
+        self.telemetry.rss_reclaimed += rss_reclaimed
+        self.telemetry.vram_reclaimed += vram_reclaimed
+        self._pending = None
+
+        logger.info(
+            "Collected (%s) in %.3fs: %.0f MB RAM, %.0f MB VRAM reclaimed",
+            reason, elapsed, rss_reclaimed / _MB, vram_reclaimed / _MB,
+        )
+
+    def after_dispose(self, model: Optional[str]) -> None:
+        with self._lock:
+            self.telemetry.disposes += 1
+            self._pending = model
+
+            reason = self._under_pressure()
+            if reason is not None:
+                self._collect(reason)
+
+    def before_load(self, model: Optional[str]) -> None:
+        with self._lock:
+            if self.memory.collect_on_model_switch and self._pending is not None and self._pending != model:
+                self._collect("model switch")
+
+    def force(self) -> None:
+        with self._lock:
+            self._collect("forced")
+
+    def log_summary(self) -> None:
+        t = self.telemetry
+        logger.info(
+            "Disposal policy: %d disposes, %d collections, %.2fs in gc, %.0f MB RAM and %.0f MB VRAM reclaimed",
+            t.disposes, t.collections, t.gc_seconds, t.rss_reclaimed / _MB, t.vram_reclaimed / _MB,
+        )
+
+
+DISPOSAL_POLICY = DisposalPolicy(settings.memory)
@@ -1,11 +1,242 @@
 from padai.config.settings import settings
 from padai.config.huggingface import get_default_device_int
+from padai.llms.base import MODEL_LOAD_LOCK
+from padai.llms.gc_policy import DISPOSAL_POLICY
+from padai.utils.path import safe_file_name
 from langchain_huggingface import HuggingFacePipeline, ChatHuggingFace
-from typing import Dict, Any
+from contextlib import contextmanager
+from filelock import FileLock
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUANTIZE_MODES = ("int8", "bf16")
 
 
 def get_default_chat_huggingface() -> ChatHuggingFace:
-    return get_chat_huggingface(settings.huggingface.chat.as_kwargs())
+    return get_chat_huggingface(settings.require("huggingface").chat.as_kwargs())
+
+
+def _cpu_supports_bf16() -> bool:
+    import torch
+
+    capability = torch.backends.cpu.get_cpu_capability()
+    return capability == "AVX512" or capability.startswith("SVE")
+
+
+def _get_model_snapshot(model_id: str, revision: Optional[str]) -> str:
+    """
+    Commit of *revision* of *model_id* on the hub (read from its snapshot
+    folder in HF_HOME), or the modification time of a local model folder.
+    """
+    folder = Path(model_id)
+    if folder.is_dir():
+        return f"local-{int(max(p.stat().st_mtime for p in folder.iterdir()))}"
+
+    from huggingface_hub import hf_hub_download
+
+    return Path(hf_hub_download(model_id, "config.json", revision=revision)).parent.name
+
+
+def _load_int8_model(model_id: str, model_kwargs: Dict[str, Any]):
+    """
+    Load *model_id* with every ``nn.Linear`` dynamically quantized to int8.
+
+    The quantized state dict is cached on disk, keyed by the model commit,
+    the torch and transformers versions and *model_kwargs*, so only the
+    first load pays for the fp32 load and conversion.  Later loads build the
+    model from its config, quantize the empty skeleton and restore the
+    weights with ``weights_only=True``.
+    """
+    import torch
+    import transformers
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    revision = model_kwargs.get("revision")
+    kwargs_hash = hashlib.sha256(json.dumps(model_kwargs, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    cache_path = settings.path_in_cache(
+        f"huggingface/quantized/{safe_file_name(model_id)}.{_get_model_snapshot(model_id, revision)}"
+        f".int8.torch-{torch.__version__}.transformers-{transformers.__version__}.{kwargs_hash}.pt"
+    )
+    lock_path = cache_path.with_suffix(".lock")
+
+    with FileLock(lock_path):
+        if cache_path.exists():
+            trust_remote_code = model_kwargs.get("trust_remote_code", False)
+            config = AutoConfig.from_pretrained(model_id, revision=revision, trust_remote_code=trust_remote_code)
+            model = AutoModelForCausalLM.from_config(
+                config, torch_dtype=torch.float32, trust_remote_code=trust_remote_code
+            )
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            model.load_state_dict(torch.load(cache_path, weights_only=True))
+            return model.eval()
+
+        model = AutoModelForCausalLM.from_pretrained(model_id, **{**model_kwargs, "torch_dtype": torch.float32})
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        tmp_path = cache_path.with_suffix(".tmp")
+        torch.save(model.state_dict(), tmp_path)
+        tmp_path.replace(cache_path)
+
+        return model.eval()
+
+
+@contextmanager
+def _parameters_on_meta():
+    """
+    Create module parameters on the meta device (no memory); buffers stay real.
+
+    The patch is process-wide, so it holds `MODEL_LOAD_LOCK`: modules built
+    by other threads (chat models, sentence encoders) wait instead of
+    silently getting meta parameters.
+    """
+    import torch
+
+    MODEL_LOAD_LOCK.acquire()
+    register_parameter = torch.nn.Module.register_parameter
+
+    def register_on_meta(module, name, param):
+        register_parameter(module, name, param)
+        if param is not None:
+            param_cls = type(module._parameters[name])
+            module._parameters[name] = param_cls(module._parameters[name].to("meta"), requires_grad=param.requires_grad)
+
+    torch.nn.Module.register_parameter = register_on_meta
+    try:
+        yield
+    finally:
+        torch.nn.Module.register_parameter = register_parameter
+        MODEL_LOAD_LOCK.release()
+
+
+def _get_safetensors_shards(model_id: str, revision: Optional[str]) -> Optional[List[Path]]:
+    """
+    Local paths of the safetensors shards of *model_id* (a hub id, downloaded
+    once into HF_HOME, or a local folder); None if it has no safetensors.
+    """
+    folder = Path(model_id)
+    if folder.is_dir():
+        index_path = folder / "model.safetensors.index.json"
+        if index_path.exists():
+            names = sorted(set(json.loads(index_path.read_text())["weight_map"].values()))
+            return [folder / name for name in names]
+        single = folder / "model.safetensors"
+        return [single] if single.exists() else None
+
+    from huggingface_hub import hf_hub_download
+    from huggingface_hub.utils import EntryNotFoundError
+
+    try:
+        index_path = hf_hub_download(model_id, "model.safetensors.index.json", revision=revision)
+    except EntryNotFoundError:
+        try:
+            return [Path(hf_hub_download(model_id, "model.safetensors", revision=revision))]
+        except EntryNotFoundError:
+            return None
+
+    names = sorted(set(json.loads(Path(index_path).read_text())["weight_map"].values()))
+    return [Path(hf_hub_download(model_id, name, revision=revision)) for name in names]
+
+
+def _load_mmap_model(model_id: str, torch_dtype, model_kwargs: Dict[str, Any]):
+    """
+    Load *model_id* with its weights memory-mapped straight from the hub's
+    safetensors shards.
+
+    The model skeleton is built without weights and the tensors are assigned
+    from the mapped shards.  The pages are never written, so every process
+    loading the same model shares one copy of the weights through the page
+    cache, and nothing is converted or written to disk.  Weights stored in
+    another dtype than *torch_dtype* are converted, which copies them;
+    models without safetensors are loaded normally.
+    """
+    from safetensors import safe_open
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    revision = model_kwargs.get("revision")
+    shards = _get_safetensors_shards(model_id, revision)
+    if shards is None:
+        logger.warning("%s has no safetensors weights, loading it without memory-mapping", model_id)
+        return AutoModelForCausalLM.from_pretrained(model_id, **model_kwargs, torch_dtype=torch_dtype)
+
+    trust_remote_code = model_kwargs.get("trust_remote_code", False)
+    config = AutoConfig.from_pretrained(model_id, revision=revision, trust_remote_code=trust_remote_code)
+
+    with _parameters_on_meta():
+        model = AutoModelForCausalLM.from_config(config, torch_dtype=torch_dtype, trust_remote_code=trust_remote_code)
+
+    state_dict: Dict[str, Any] = {}
+    for shard in shards:
+        with safe_open(shard, framework="pt", device="cpu") as f:
+            for name in f.keys():
+                tensor = f.get_tensor(name)
+                state_dict[name] = tensor if tensor.dtype == torch_dtype else tensor.to(torch_dtype)
+
+    result = model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+
+    missing = [name for name in result.missing_keys if model.get_parameter(name).is_meta]
+    if missing:
+        raise ValueError(f"{model_id}: weights missing from its safetensors shards: {missing[:5]}")
+
+    return model.eval()
+
+
+def _resolve_cpu_dtype(model_id: str, quantize: Optional[str], model_kwargs: Dict[str, Any]):
+    import torch
+    from transformers import AutoConfig
+
+    if quantize == "bf16":
+        if _cpu_supports_bf16():
+            return torch.bfloat16
+        logger.warning("bf16 is not supported by this CPU, loading %s in fp32", model_id)
+        return torch.float32
+
+    torch_dtype = model_kwargs.get("torch_dtype", "auto")
+    if torch_dtype == "auto":
+        config = AutoConfig.from_pretrained(
+            model_id,
+            revision=model_kwargs.get("revision"),
+            trust_remote_code=model_kwargs.get("trust_remote_code", False),
+        )
+        torch_dtype = config.torch_dtype or torch.float32
+    if isinstance(torch_dtype, str):
+        torch_dtype = getattr(torch, torch_dtype)
+    return torch_dtype
+
+
+def _get_cpu_pipeline(
+    model_id: str,
+    task: str,
+    quantize: Optional[str],
+    mmap_weights: bool,
+    model_kwargs: Dict[str, Any],
+    pipeline_kwargs: Dict[str, Any],
+) -> HuggingFacePipeline:
+    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+
+    if task != "text-generation":
+        raise ValueError(f"quantize is only supported for text-generation, not {task!r}")
+
+    if quantize == "int8":
+        model = _load_int8_model(model_id, {k: v for k, v in model_kwargs.items() if k != "torch_dtype"})
+    else:
+        torch_dtype = _resolve_cpu_dtype(model_id, quantize, model_kwargs)
+        model_kwargs = {k: v for k, v in model_kwargs.items() if k != "torch_dtype"}
+
+        if mmap_weights:
+            model = _load_mmap_model(model_id, torch_dtype, model_kwargs)
+        else:
+            model = AutoModelForCausalLM.from_pretrained(model_id, **model_kwargs, torch_dtype=torch_dtype)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id, revision=model_kwargs.get("revision"))
+
+    pipe = pipeline(task, model=model, tokenizer=tokenizer, device=-1, **pipeline_kwargs)
+    return HuggingFacePipeline(pipeline=pipe, model_id=model_id, pipeline_kwargs=pipeline_kwargs)
 
 
 def get_chat_huggingface(params: Dict[str, Any]) -> ChatHuggingFace:
@@ -19,18 +250,48 @@ def get_chat_huggingface(params: Dict[str, Any]) -> ChatHuggingFace:
         "repetition_penalty",
         "return_full_text",
     }
+    load_keys = {"model_id", "task", "device", "quantize", "mmap_weights"}
 
     pipeline_kwargs = {k: v for k, v in params.items() if k in gen_keys}
-    model_kwargs = {k: v for k, v in params.items() if k not in gen_keys | {"model_id", "task", "device"}}
+    model_kwargs = {k: v for k, v in params.items() if k not in gen_keys | load_keys}
 
     pipeline_kwargs.setdefault("return_full_text", False)  # strip prompt
     model_kwargs.setdefault("torch_dtype", "auto")
 
-    llm = HuggingFacePipeline.from_model_id(
-        model_id=params["model_id"],
-        task=params.get("task", "text-generation"),
-        device=params.get("device", get_default_device_int()),
-        model_kwargs=model_kwargs,
-        pipeline_kwargs=pipeline_kwargs,
-    )
+    task = params.get("task", "text-generation")
+    device = params.get("device")
+    if device is None:
+        device = get_default_device_int()
+
+    quantize: Optional[str] = params.get("quantize")
+    if quantize is not None and quantize not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantize mode: {quantize!r} (expected one of {QUANTIZE_MODES})")
+
+    if quantize is not None and device != -1:
+        logger.warning("quantize=%r only applies on CPU, ignoring it on device %s", quantize, device)
+        quantize = None
+
+    # On CPU the weights are memory-mapped by default so that worker
+    # processes share them; on GPU they are copied to the device anyway.
+    mmap_weights = device == -1 and task == "text-generation" and params.get("mmap_weights", True)
+
+    DISPOSAL_POLICY.before_load(params["model_id"])
+
+    if quantize is not None or mmap_weights:
+        llm = _get_cpu_pipeline(
+            params["model_id"],
+            task,
+            quantize,
+            mmap_weights,
+            model_kwargs,
+            pipeline_kwargs,
+        )
+    else:
+        llm = HuggingFacePipeline.from_model_id(
+            model_id=params["model_id"],
+            task=task,
+            device=device,
+            model_kwargs=model_kwargs,
+            pipeline_kwargs=pipeline_kwargs,
+        )
     return ChatHuggingFace(llm=llm)
@@ -0,0 +1,32 @@
+from padai.config.settings import settings
+from langchain_community.chat_models import ChatLlamaCpp
+from typing import Dict, Any
+
+
+def get_default_chat_llamacpp() -> ChatLlamaCpp:
+    return get_chat_llamacpp(settings.llamacpp.chat.as_kwargs())
+
+
+def _get_model_path(params: Dict[str, Any]) -> str:
+    """
+    Local GGUF file for *params*: either ``model_path`` or the ``filename``
+    of a GGUF repository ``model_id`` on the Hugging Face Hub (downloaded
+    once into HF_HOME).
+    """
+    if "model_path" in params:
+        return str(params.pop("model_path"))
+
+    from huggingface_hub import hf_hub_download
+
+    return hf_hub_download(repo_id=params.pop("model_id"), filename=params.pop("filename"))
+
+
+def get_chat_llamacpp(params: Dict[str, Any]) -> ChatLlamaCpp:
+    params = dict(params)
+    model_path = _get_model_path(params)
+
+    defaults = settings.llamacpp.model_dump(exclude={"chat"}, exclude_none=True)
+    params = {**defaults, **params}
+    params.setdefault("verbose", False)
+
+    return ChatLlamaCpp(model_path=model_path, **params)
@@ -0,0 +1,58 @@
+from padai.config.settings import settings
+from langchain_openai import ChatOpenAI
+from functools import lru_cache
+from typing import Dict, Any
+import httpx
+
+
+def get_default_chat_openai_compatible() -> ChatOpenAI:
+    return get_chat_openai_compatible(settings.openai_compatible.chat.as_kwargs())
+
+
+def _get_limits(max_connections: int, max_keepalive_connections: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+    )
+
+
+def _get_timeout(timeout: float) -> httpx.Timeout:
+    # No pool timeout: when every connection is busy, requests wait for one
+    # instead of failing, so max_connections caps concurrency per server.
+    return httpx.Timeout(timeout, pool=None)
+
+
+@lru_cache(maxsize=None)
+def _get_http_client(base_url: str, max_connections: int, max_keepalive_connections: int, timeout: float) -> httpx.Client:
+    """One connection pool per server, shared by every model instance that targets it."""
+    return httpx.Client(
+        base_url=base_url,
+        limits=_get_limits(max_connections, max_keepalive_connections),
+        timeout=_get_timeout(timeout),
+    )
+
+
+def get_chat_openai_compatible(params: Dict[str, Any]) -> ChatOpenAI:
+    defaults = settings.openai_compatible
+    params = dict(params)
+
+    base_url: str = params.pop("base_url", defaults.base_url)
+    api_key: str = params.pop("api_key", defaults.api_key.get_secret_value())
+    max_connections: int = params.pop("max_connections", defaults.max_connections)
+    max_keepalive_connections: int = params.pop("max_keepalive_connections", defaults.max_keepalive_connections)
+    timeout: float = params.pop("timeout", defaults.timeout)
+    params.setdefault("max_retries", defaults.max_retries)
+
+    return ChatOpenAI(
+        **params,
+        base_url=base_url,
+        api_key=api_key,
+        timeout=timeout,
+        http_client=_get_http_client(base_url, max_connections, max_keepalive_connections, timeout),
+        # async pools are bound to an event loop, so they are not shared
+        http_async_client=httpx.AsyncClient(
+            base_url=base_url,
+            limits=_get_limits(max_connections, max_keepalive_connections),
+            timeout=_get_timeout(timeout),
+        ),
+    )
@@ -0,0 +1,136 @@
+from padai.config.settings import settings
+from padai.llms.base import ChatModelDescription
+from padai.utils.text import estimate_tokens
+from functools import lru_cache
+from typing import Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+TokenCounter = Callable[[str], int]
+
+# Context windows of the hosted models, by model name prefix (longest match
+# wins); override or extend them with APP_CONTEXT_BUDGET__CONTEXT_WINDOWS.
+_CONTEXT_WINDOWS = {
+    "gpt-5": 400_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+    "us.amazon.nova-premier": 1_000_000,
+    "amazon.nova-pro": 300_000,
+    "amazon.nova-lite": 300_000,
+    "amazon.nova-micro": 128_000,
+    "us.deepseek.r1": 128_000,
+    "openai.gpt-oss": 128_000,
+    "us.meta.llama3-3": 128_000,
+    "gemini-2.5": 1_048_576,
+    "gemini-2.0": 1_048_576,
+}
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Models whose tokenizer failed to load, so that it is not fetched again on
+# every call.
+_UNAVAILABLE_TOKENIZERS: set = set()
+
+
+@lru_cache(maxsize=None)
+def _get_tiktoken_counter(model: str) -> TokenCounter:
+    import tiktoken
+
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")    # current OpenAI models
+
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=None)
+def _get_huggingface_counter(model_id: str) -> TokenCounter:
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def get_token_counter(description: ChatModelDescription) -> TokenCounter:
+    """
+    Return a function counting the tokens of a text as the model of
+    *description* would.
+
+    OpenAI models (and OpenAI-compatible servers) are counted with tiktoken
+    and HuggingFace models with their own tokenizer; for the rest, or when
+    the tokenizer is not available, `estimate_tokens` is used.
+    """
+    if description.full_name in _UNAVAILABLE_TOKENIZERS:
+        return estimate_tokens
+
+    try:
+        if description.engine in ("openai", "openai_compatible"):
+            return _get_tiktoken_counter(description.params["model"])
+        if description.engine == "huggingface":
+            return _get_huggingface_counter(description.params["model_id"])
+    except (ImportError, OSError) as exc:
+        logger.warning("No tokenizer for %s (%s), estimating token counts", description.full_name, exc)
+        _UNAVAILABLE_TOKENIZERS.add(description.full_name)
+
+    return estimate_tokens
+
+
+@lru_cache(maxsize=None)
+def _get_huggingface_context_window(model_id: str) -> int:
+    from transformers import AutoConfig
+
+    return AutoConfig.from_pretrained(model_id).max_position_embeddings
+
+
+def get_context_window(description: ChatModelDescription) -> int:
+    """
+    Tokens the model of *description* accepts, prompt and answer together:
+    the configured override, the llama.cpp ``n_ctx``, the HuggingFace model
+    config or the known hosted windows, else `DEFAULT_CONTEXT_WINDOW`.
+    """
+    override = settings.context_budget.context_windows.get(description.full_name)
+    if override is not None:
+        return override
+
+    if description.engine == "llamacpp":
+        return description.params.get("n_ctx", settings.llamacpp.n_ctx)
+
+    if description.engine == "huggingface":
+        try:
+            return _get_huggingface_context_window(description.params["model_id"])
+        except (ImportError, OSError, AttributeError) as exc:
+            logger.warning("No context window for %s (%s)", description.full_name, exc)
+            return DEFAULT_CONTEXT_WINDOW
+
+    model = description.params.get("model", "")
+    prefixes = [prefix for prefix in _CONTEXT_WINDOWS if model.startswith(prefix)]
+    return _CONTEXT_WINDOWS[max(prefixes, key=len)] if prefixes else DEFAULT_CONTEXT_WINDOW
+
+
+def truncate_to_tokens(text: str, budget: int, count_tokens: TokenCounter, ellipsis: str = " […]") -> str:
+    """
+    Return the longest prefix of *text*, cut at a word boundary, that fits in
+    *budget* tokens together with *ellipsis*; *text* itself when it fits.
+    """
+    if count_tokens(text) <= budget:
+        return text
+
+    budget -= count_tokens(ellipsis)
+    low, high = 0, len(text)
+    while low < high:   # longest prefix within budget
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+
+    prefix = text[:low]
+    cut = prefix.rfind(" ")
+    if cut > 0:
+        prefix = prefix[:cut]
+
+    return prefix.rstrip() + ellipsis
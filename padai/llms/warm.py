@@ -0,0 +1,103 @@
+from padai.llms.base import get_chat_model
+from padai.llms.disposable import Disposable, NullDisposable, make_disposable
+from padai.llms.engine import ChatEngine, LOCAL_CHAT_ENGINES
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Tuple
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _WarmEntry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.llm = None
+        self.disposable: Disposable = NullDisposable()
+
+    def dispose(self) -> None:
+        with self.lock:  # waits for an in-flight local inference to finish
+            self.disposable.dispose()
+            self.llm = None
+            self.disposable = NullDisposable()
+
+
+class WarmChatModels:
+    """
+    Least-recently-used pool of chat models kept loaded between calls.
+
+    `get_chat_model` is cheap for API engines but reloads the weights of a
+    local model every time; leasing models from this pool keeps up to
+    *capacity* of them warm and disposes of the least recently used one when
+    a new model is needed.
+
+    Instances of local engines (see `LOCAL_CHAT_ENGINES`) are handed to one
+    caller at a time; API clients are shared freely.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, _WarmEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(engine: ChatEngine, params: Dict[str, Any]) -> str:
+        return json.dumps([engine, params], sort_keys=True, default=str)
+
+    def _entry(self, engine: ChatEngine, params: Dict[str, Any]) -> Tuple[_WarmEntry, List[_WarmEntry]]:
+        key = self._key(engine, params)
+
+        with self._lock:
+            entry = self._entries.pop(key, None) or _WarmEntry()
+            self._entries[key] = entry  # most recently used goes last
+
+            evicted: List[_WarmEntry] = []
+            while len(self._entries) > self.capacity:
+                _, old = self._entries.popitem(last=False)
+                evicted.append(old)
+
+        return entry, evicted
+
+    def _is_pooled(self, engine: ChatEngine, params: Dict[str, Any], entry: _WarmEntry) -> bool:
+        with self._lock:
+            return self._entries.get(self._key(engine, params)) is entry
+
+    @contextmanager
+    def lease(self, engine: ChatEngine, params: Dict[str, Any]) -> Iterator[Any]:
+        entry, evicted = self._entry(engine, params)
+
+        for old in evicted:
+            logger.info("Disposing of warm chat model (capacity %d reached)", self.capacity)
+            old.dispose()
+
+        try:
+            with entry.lock:
+                if entry.llm is None:
+                    entry.llm = get_chat_model(engine, params)
+                    entry.disposable = make_disposable(entry.llm)
+
+                llm = entry.llm
+
+                if engine in LOCAL_CHAT_ENGINES:
+                    yield llm
+                    return
+
+            yield llm
+
+        finally:
+            # Evicted while we were using it: nobody else will dispose of it
+            if not self._is_pooled(engine, params, entry):
+                entry.dispose()
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+
+        for entry in entries:
+            entry.dispose()
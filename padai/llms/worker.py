@@ -0,0 +1,252 @@
+from padai.config.settings import settings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, message_to_dict, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+from typing import Any, Dict, Iterator, List, Optional
+import atexit
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+def _serve(conn) -> None:
+    """Worker process: load the model, then answer requests until closed."""
+    from padai.llms.base import build_chat_model
+
+    engine, params = conn.recv()
+
+    try:
+        llm = build_chat_model(engine, params)
+    except Exception as exc:
+        conn.send(("error", f"{exc.__class__.__name__}: {exc}"))
+        return
+
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            op, payload = conn.recv()
+        except EOFError:    # the parent went away
+            return
+
+        if op == "close":
+            return
+
+        messages = messages_from_dict(payload["messages"])
+        try:
+            if op == "invoke":
+                conn.send(("result", message_to_dict(llm.invoke(messages, **payload["kwargs"]))))
+            else:
+                for chunk in llm.stream(messages, **payload["kwargs"]):
+                    conn.send(("chunk", chunk.content))
+                conn.send(("end", None))
+        except Exception as exc:
+            logger.exception("Model worker request failed")
+            conn.send(("error", f"{exc.__class__.__name__}: {exc}"))
+
+
+class ModelWorker:
+    """
+    A chat model loaded in its own process, serving one request at a time.
+
+    Requests and responses travel over a pipe as serialized messages.  The
+    process is started on first use and again if it died; `stop` ends it,
+    which returns all of its memory (RAM and VRAM) to the system.
+    """
+
+    def __init__(self, engine: str, params: Dict[str, Any]) -> None:
+        self.engine = engine
+        self.params = params
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+
+    def _start(self) -> None:
+        # A fresh interpreter rather than multiprocessing's spawn, which would
+        # re-import the caller's __main__ (e.g. the whole UI) in the worker.
+        if os.name != "posix":
+            raise NotImplementedError("Model workers need a POSIX system")
+
+        conn, child_conn = multiprocessing.Pipe()
+        process = subprocess.Popen(
+            [sys.executable, "-m", __name__, str(child_conn.fileno())],
+            pass_fds=[child_conn.fileno()],
+        )
+        child_conn.close()
+        conn.send((self.engine, self.params))
+
+        if not conn.poll(settings.model_workers.start_timeout):
+            process.kill()
+            process.wait()
+            raise TimeoutError(f"Model worker for {self.engine} did not start in time")
+
+        try:
+            status, payload = conn.recv()
+        except EOFError:
+            status, payload = "error", f"exited with code {process.wait()}"
+
+        if status != "ready":
+            process.wait()
+            raise RuntimeError(f"Model worker for {self.engine} failed to load the model: {payload}")
+
+        logger.info("Model worker %s started for %s", process.pid, self.engine)
+        self._process, self._conn = process, conn
+
+    def _ensure_started(self) -> None:
+        if self._process is None or self._process.poll() is not None:
+            self._start()
+
+    def _request(self, op: str, messages: List[BaseMessage], kwargs: Dict[str, Any]):
+        self._ensure_started()
+        self._conn.send((op, {"messages": messages_to_dict(messages), "kwargs": kwargs}))
+
+    def _recv(self):
+        try:
+            status, payload = self._conn.recv()
+        except (EOFError, OSError):
+            exitcode = self._process.wait()
+            self._process = self._conn = None
+            raise RuntimeError(f"Model worker for {self.engine} exited unexpectedly (code {exitcode})") from None
+
+        if status == "error":
+            raise RuntimeError(payload)
+        return status, payload
+
+    def start(self) -> None:
+        with self._lock:
+            self._ensure_started()
+
+    def invoke(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> BaseMessage:
+        with self._lock:
+            self._request("invoke", messages, kwargs)
+            _, payload = self._recv()
+            return messages_from_dict([payload])[0]
+
+    def stream(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> Iterator[str]:
+        with self._lock:
+            self._request("stream", messages, kwargs)
+            finished = False
+            try:
+                while True:
+                    status, payload = self._recv()
+                    if status == "end":
+                        finished = True
+                        return
+                    yield payload
+            finally:
+                if not finished and self._process is not None:
+                    # Abandoned mid-stream: the pipe still holds chunks, so the
+                    # worker cannot serve another request.
+                    self.stop()
+
+    def stop(self) -> None:
+        process, conn = self._process, self._conn
+        self._process = self._conn = None
+        if process is None:
+            return
+
+        try:
+            conn.send(("close", None))
+        except OSError:
+            pass
+        try:
+            process.wait(settings.model_workers.stop_timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning("Model worker %s did not exit, killing it", process.pid)
+            process.kill()
+            process.wait()
+        conn.close()
+
+
+class ModelWorkerSupervisor:
+    """Owns every model worker of this process and stops them all at exit."""
+
+    def __init__(self) -> None:
+        self._workers: "weakref.WeakSet[ModelWorker]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def spawn(self, engine: str, params: Dict[str, Any]) -> ModelWorker:
+        worker = ModelWorker(engine, params)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def stop_all(self) -> None:
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            worker.stop()
+
+
+SUPERVISOR = ModelWorkerSupervisor()
+atexit.register(SUPERVISOR.stop_all)
+
+
+class WorkerChatModel(BaseChatModel):
+    """
+    Chat model proxy for a local engine running in a `ModelWorker`.
+
+    The model is loaded when the proxy is created, like the in-process
+    engines do; `close` stops the worker.
+    """
+
+    engine: str
+    worker_params: Dict[str, Any]
+
+    _worker: ModelWorker = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._worker = SUPERVISOR.spawn(self.engine, self.worker_params)
+        self._worker.start()
+
+    @property
+    def _llm_type(self) -> str:
+        return f"worker-{self.engine}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"engine": self.engine, "params": self.worker_params}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if stop is not None:
+            kwargs["stop"] = stop
+        message = self._worker.invoke(messages, kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if stop is not None:
+            kwargs["stop"] = stop
+        for text in self._worker.stream(messages, kwargs):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager is not None:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    def close(self) -> None:
+        self._worker.stop()
+
+
+if __name__ == "__main__":
+    import padai.config.bootstrap  # noqa: F401 always first import in main entry points
+    from multiprocessing.connection import Connection
+
+    _serve(Connection(int(sys.argv[1])))
@@ -7,6 +7,10 @@ from functools import reduce
 from padai.utils.pandas import iqr_bounds
 
 
+# Cell of a referee that was not asked about the pair (sequential early stopping)
+SKIPPED = -3
+
+
 def create_empty_compare_llm_dataframe(names: List[str]):
     df = pd.DataFrame(
         data=np.zeros((len(names), len(names)), dtype=int),
@@ -25,6 +29,7 @@ def create_compare_llm_figure(df: pd.DataFrame, title: Optional[str] = None, def
 
     Color scheme
     ------------
+    *  -3 → light blue (SKIPPED)
     *  -2 → dark-grey
     *  -1 → light-grey
     *   >=0 → red → orange → green (min … mid … max)
@@ -50,11 +55,13 @@ def create_compare_llm_figure(df: pd.DataFrame, title: Optional[str] = None, def
 
     # build a code matrix
     grad_steps = 256  # samples in the red-orange-green ramp
-    sentinel = 2 + grad_steps  # index reserved for “other”
+    skipped = 2 + grad_steps  # index reserved for SKIPPED
+    sentinel = 3 + grad_steps  # index reserved for “other”
     code = np.full(values.shape, sentinel, dtype=int)
 
     code[values == -2] = 0  # dark-grey
     code[values == -1] = 1  # light-grey
+    code[values == SKIPPED] = skipped
 
     # map every value ≥ 0 into [2 … 2+grad_steps-1]
     nonneg_mask = values >= 0
@@ -83,6 +90,7 @@ def create_compare_llm_figure(df: pd.DataFrame, title: Optional[str] = None, def
     colours = (
             ["dimgray", "lightgrey"]  # 0, 1
             + [ramp(i) for i in range(grad_steps)]  # 2 … 2+grad_steps-1
+            + ["lightsteelblue"]  # skipped
             + ["black"]  # sentinel
     )
     cmap = ListedColormap(colours, name="custom_llm_map")
@@ -98,6 +98,46 @@ abuse_analyzer_prompts_with_context = {
     }
 }
 
+# Several messages analysed in one request: the system prompt of
+# `abuse_analyzer_prompts_with_context` is followed by the "system" suffix.
+abuse_analyzer_packed_prompts = {
+    Language.ES: {
+        "system": {
+            "default": (
+                "En esta conversación recibirás varios mensajes a la vez, cada uno con su propio contexto. Analiza cada mensaje de forma "
+                "independiente, sin mezclar los contextos ni las conclusiones de mensajes distintos."
+            )
+        },
+        "human": {
+            "default": (
+                "Analiza por separado cada uno de los siguientes {count} mensajes en busca de indicios de maltrato psicológico y explica tu "
+                "razonamiento.\n"
+                "\n"
+                "- Cada mensaje, con su contexto, está entre <MENSAJE_n_PRINCIPIO> y <MENSAJE_n_FIN>, siendo n su número.\n"
+                "- Escribe el análisis de cada mensaje entre <ANALISIS_n_PRINCIPIO> y <ANALISIS_n_FIN>, con el mismo número n, "
+                "en el mismo orden y sin texto fuera de esas marcas.\n"
+                "\n"
+                "{messages}"
+            )
+        },
+        "message": {
+            "default": (
+                "<MENSAJE_{index}_PRINCIPIO>\n"
+                "Contexto:\n{user_context}\n"
+                "\n"
+                "Mensaje:\n{user_input}\n"
+                "<MENSAJE_{index}_FIN>"
+            ),
+            "no_context": "(sin contexto)",
+        },
+        "analysis": {
+            "start": "<ANALISIS_{index}_PRINCIPIO>",
+            "end": "<ANALISIS_{index}_FIN>",
+        },
+    }
+}
+
+
 abuse_analyzer_compare_prompts = {
     Language.ES: {
         "system": {
@@ -142,6 +182,252 @@ abuse_analyzer_compare_prompts = {
     },
 }
 
+# Shortening a candidate analysis before it is refereed.
+abuse_analyzer_compress_prompts = {
+    Language.ES: {
+        "system": {
+            "default": (
+                "Eres un experto en psicología forense. Resumes análisis de maltrato psicológico sin añadir ni cambiar conclusiones."
+            )
+        },
+        "human": {
+            "default": (
+                "Resume el siguiente análisis en un máximo de {budget} tokens. Conserva todos los indicios de maltrato señalados, su "
+                "razonamiento y las conclusiones, con su mismo tono y nivel de detalle relativo. Responde solo con el resumen.\n"
+                "\n"
+                "<ANALISIS_PRINCIPIO>\n"
+                "{analysis}\n"
+                "<ANALISIS_FIN>"
+            )
+        },
+    },
+}
+
+
+# Listwise judging: every candidate analysis in one request, under anonymous
+# labels; "{analyses}" is built from the "analysis" template.
+abuse_analyzer_rank_prompts = {
+    Language.ES: {
+        "system": {
+            "default": (
+                "Eres un evaluador experto especializado en análisis psicológico forense. Sigue cuidadosamente las instrucciones proporcionadas por el usuario."
+            )
+        },
+        "human": {
+            "default": (
+                "Varios modelos de lenguaje diferentes realizaron análisis psicológicos forenses de un mensaje de texto, teniendo en cuenta su contexto:\n"
+                "\n"
+                "- El mensaje de texto está entre <TEXTO_PRINCIPIO> y <TEXTO_FIN>.\n"
+                "- El contexto está entre <CONTEXTO_PRINCIPIO> y <CONTEXTO_FIN>.\n"
+                "- El análisis de cada modelo está entre <ANALISIS_X_PRINCIPIO> y <ANALISIS_X_FIN>, siendo X la letra que identifica al modelo.\n"
+                "\n"
+                "Ordena los modelos de mayor a menor según la profundidad, riqueza y detalle de su análisis.\n"
+                "\n"
+                "Responde con una sola línea con las letras de todos los modelos (sin palabras adicionales), usando:\n"
+                "\n"
+                "- > entre dos modelos si el de la izquierda es claramente mejor.\n"
+                "- = entre dos modelos si ninguno muestra una clara y sustantiva ventaja sobre el otro.\n"
+                "\n"
+                "Por ejemplo: {example}\n"
+                "\n"
+                "<TEXTO_PRINCIPIO>\n"
+                "{text}\n"
+                "<TEXTO_FIN>\n"
+                "\n"
+                "<CONTEXTO_PRINCIPIO>\n"
+                "{context}\n"
+                "<CONTEXTO_FIN>\n"
+                "\n"
+                "{analyses}"
+            )
+        },
+        "analysis": {
+            "default": (
+                "<ANALISIS_{label}_PRINCIPIO>\n"
+                "{analysis}\n"
+                "<ANALISIS_{label}_FIN>"
+            )
+        },
+    },
+}
+
+# Map-reduce analysis of long texts (`padai.chains.map_reduce`): the system
+# prompt is the analyzer preset; "map" extracts findings from one fragment,
+# "merge" combines findings of consecutive fragments and "final" writes the
+# analysis from the last merged findings.
+abuse_analyzer_map_reduce_prompts = {
+    Language.ES: {
+        "human": {
+            "map": (
+                "El siguiente texto es el fragmento {index} de {count} de una conversación larga. Extrae de forma concisa todos los "
+                "indicios explícitos o implícitos de maltrato psicológico que contenga, citando literalmente los pasajes relevantes y "
+                "explicando brevemente cada indicio. Si no hay ninguno, indícalo en una sola frase.\n"
+                "\n"
+                "Contexto:\n{user_context}\n"
+                "\n"
+                "<FRAGMENTO_PRINCIPIO>\n"
+                "{fragment}\n"
+                "<FRAGMENTO_FIN>"
+            ),
+            "merge": (
+                "Los siguientes hallazgos proceden del análisis de fragmentos consecutivos de una conversación larga, cada uno entre "
+                "<HALLAZGOS_n_PRINCIPIO> y <HALLAZGOS_n_FIN>. Combínalos en una sola relación de hallazgos en orden, sin perder ninguno "
+                "ni añadir otros nuevos, uniendo los repetidos y conservando las citas literales.\n"
+                "\n"
+                "{findings}"
+            ),
+            "final": (
+                "Los siguientes hallazgos proceden del análisis de todos los fragmentos de una conversación larga, cada uno entre "
+                "<HALLAZGOS_n_PRINCIPIO> y <HALLAZGOS_n_FIN>. A partir de ellos, analiza la conversación completa en busca de indicios "
+                "de maltrato psicológico y explica tu razonamiento, prestando atención a los patrones que se repiten a lo largo del tiempo.\n"
+                "\n"
+                "Contexto:\n{user_context}\n"
+                "\n"
+                "{findings}"
+            ),
+        },
+        "findings": (
+            "<HALLAZGOS_{index}_PRINCIPIO>\n"
+            "{text}\n"
+            "<HALLAZGOS_{index}_FIN>"
+        ),
+        "no_context": "(sin contexto)",
+    },
+}
+
+
+# Running summary of a conversation analysed window by window
+# (`padai.chains.conversation`); it is the context of the next window.
+conversation_summary_prompts = {
+    Language.ES: {
+        "system": {
+            "default": (
+                "Eres un experto en psicología forense. Mantienes un resumen breve y fiel del historial de una conversación para "
+                "contextualizar el análisis de sus mensajes siguientes, sin añadir ni cambiar conclusiones."
+            )
+        },
+        "human": {
+            "default": (
+                "Actualiza el resumen del historial de la conversación con los nuevos mensajes y su análisis. Conserva quién es quién, "
+                "la relación entre las personas, los hechos relevantes y todos los indicios de maltrato psicológico señalados hasta ahora. "
+                "Usa como máximo {budget} tokens y responde solo con el resumen actualizado.\n"
+                "\n"
+                "<RESUMEN_PRINCIPIO>\n"
+                "{summary}\n"
+                "<RESUMEN_FIN>\n"
+                "\n"
+                "<MENSAJES_PRINCIPIO>\n"
+                "{messages}\n"
+                "<MENSAJES_FIN>\n"
+                "\n"
+                "<ANALISIS_PRINCIPIO>\n"
+                "{analysis}\n"
+                "<ANALISIS_FIN>"
+            )
+        },
+        "empty": "Sin historial previo.",
+    },
+}
+
+
+# Appended to the analyzer system prompts by the model cascade
+# (`padai.chains.cascade`): every tier ends its analysis with a verdict
+# footer that decides whether a larger tier is needed.
+abuse_analyzer_cascade_prompts = {
+    Language.ES: {
+        "system": (
+            "\n\n"
+            "Al final de tu análisis, añade una última línea con este formato exacto, sin nada después:\n"
+            "VEREDICTO: <MALTRATO o NINGUNO> | GRAVEDAD: <BAJA, MEDIA o ALTA> | CONFIANZA: <número de 0 a 100>\n"
+            "La confianza indica lo seguro que estás de tu veredicto; sé honesto y usa valores bajos si el mensaje es ambiguo."
+        ),
+        "footer": {
+            "verdict": "VEREDICTO",
+            "severity": "GRAVEDAD",
+            "confidence": "CONFIANZA",
+            "abuse": "MALTRATO",
+            "none": "NINGUNO",
+            "levels": ["BAJA", "MEDIA", "ALTA"],
+        },
+    },
+}
+
+
+# One-word verdicts used as labels for the triage classifier
+# (`padai.chains.triage`); the answers are listed in `abuse_verdict_responses`.
+abuse_verdict_prompts = {
+    Language.ES: {
+        "system": {
+            "default": (
+                "Eres un experto en psicología forense que analiza mensajes escritos para detectar maltrato psicológico. Mantén un umbral "
+                "bajo: cualquier indicio explícito o implícito, por sutil que sea, cuenta como maltrato."
+            )
+        },
+        "human": {
+            "default": (
+                "¿Contiene el siguiente mensaje algún indicio de maltrato psicológico?\n"
+                "\n"
+                "Responde con una sola palabra, sin explicaciones: {abuse} si lo contiene o {none} si no lo contiene.\n"
+                "\n"
+                "<TEXTO_PRINCIPIO>\n"
+                "{text}\n"
+                "<TEXTO_FIN>"
+            )
+        },
+    },
+}
+
+abuse_verdict_responses = {
+    Language.ES: {
+        "abuse": "MALTRATO",
+        "none": "NINGUNO",
+    }
+}
+
+# Compact screening verdicts (`padai.chains.verdict`): a JSON object instead of
+# a written analysis; "categories" describes the ids of `AbuseCategory`.
+abuse_screening_prompts = {
+    Language.ES: {
+        "system": {
+            "default": (
+                "Eres un experto en psicología forense que criba grandes volúmenes de mensajes escritos para detectar maltrato "
+                "psicológico. No escribas ningún análisis: responde únicamente con un objeto JSON con estos campos:\n"
+                "- \"abusive\": true si el mensaje contiene algún indicio de maltrato psicológico, false si no.\n"
+                "- \"severity\": gravedad de 0 a 3 (0 ninguna, 1 baja, 2 media, 3 alta).\n"
+                "- \"categories\": lista de las categorías presentes, de entre estas:\n"
+                "{categories}\n"
+                "- \"evidence\": hasta 3 fragmentos literales y breves del mensaje (menos de 15 palabras cada uno) que "
+                "justifiquen el veredicto; lista vacía si no hay maltrato.\n"
+                "- \"confidence\": lo seguro que estás del veredicto, de 0 a 100."
+            )
+        },
+        "human": {
+            "default": (
+                "<CONTEXTO_PRINCIPIO>\n"
+                "{user_context}\n"
+                "<CONTEXTO_FIN>\n"
+                "\n"
+                "<TEXTO_PRINCIPIO>\n"
+                "{user_input}\n"
+                "<TEXTO_FIN>"
+            )
+        },
+        "no_context": "(sin contexto)",
+        "categories": {
+            "insult": "insultos o descalificaciones",
+            "humiliation": "humillación o ridiculización",
+            "contempt": "desprecio o menosprecio",
+            "blame": "culpabilización",
+            "gaslighting": "negación de la realidad o de la memoria de la otra persona",
+            "manipulation": "manipulación o chantaje emocional",
+            "control": "control o vigilancia",
+            "isolation": "aislamiento de amistades o familia",
+            "jealousy": "celos posesivos",
+            "threat": "amenazas o intimidación",
+        },
+    },
+}
+
 compare_llm_responses = {
     Language.ES: {
         "left": "MODELO_1",
@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class JobLimitError(RuntimeError):
+    """Raised when an owner already has the maximum number of jobs in flight."""
+
+
+@dataclass
+class Job:
+    """
+    State of a job, shared between the worker running it and the pollers.
+
+    The worker appends to ``text`` as output becomes available; pollers read
+    it until ``done`` is set.
+    """
+    owner: str
+    key: Optional[str] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    text: str = ""
+    done: bool = False
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class JobQueue:
+    """
+    Local job queue served by a fixed pool of worker threads.
+
+    Jobs are callables receiving their `Job`; they run in submission order as
+    workers become free, so a slow job only occupies one worker.  Each owner
+    (e.g. a browser session) may have at most *max_jobs_per_owner* jobs
+    queued or running at once.  Finished jobs are kept for *retention*
+    seconds so that pollers can collect their output.
+
+    Jobs submitted with a *key* are single-flight: while a job with the same
+    key is queued or running, submitting again returns that job instead of
+    starting a new one (and does not count against the owner's limit).
+    """
+
+    def __init__(self, workers: int, max_jobs_per_owner: int, retention: float = 600) -> None:
+        self.max_jobs_per_owner = max_jobs_per_owner
+        self.retention = retention
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[str, Job] = {}
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _purge(self) -> None:
+        limit = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished_at < limit]:
+            del self._jobs[job_id]
+
+    def _run(self, job: Job, fn: Callable[[Job], None]) -> None:
+        job.started_at = time.time()
+        try:
+            fn(job)
+        except Exception as exc:
+            logger.exception("Job %s failed", job.id)
+            job.error = str(exc) or exc.__class__.__name__
+        finally:
+            job.finished_at = time.time()
+            job.done = True
+            with self._lock:
+                self._active[job.owner] -= 1
+                if job.key is not None:
+                    self._in_flight.pop(job.key, None)
+
+    def submit(self, owner: str, fn: Callable[[Job], None], key: Optional[str] = None) -> Job:
+        with self._lock:
+            self._purge()
+
+            if key is not None and key in self._in_flight:
+                return self._in_flight[key]
+
+            if self._active.get(owner, 0) >= self.max_jobs_per_owner:
+                raise JobLimitError(
+                    f"{owner!r} already has {self.max_jobs_per_owner} job(s) in flight"
+                )
+
+            job = Job(owner=owner, key=key)
+            self._jobs[job.id] = job
+            self._active[owner] = self._active.get(owner, 0) + 1
+            if key is not None:
+                self._in_flight[key] = job
+
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -1,7 +1,11 @@
-from langchain_core.globals import set_llm_cache
+from langchain_core.globals import set_llm_cache, get_llm_cache
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration
 from langchain_community.cache import SQLiteCache
 from padai.config.settings import settings
 from pathlib import Path
+from typing import List, Optional
 
 
 def get_llm_cache_path() -> Path:
@@ -11,3 +15,23 @@ def get_llm_cache_path() -> Path:
 def set_llm_sqlite_cache():
     set_llm_cache(SQLiteCache(database_path=str(get_llm_cache_path())))
 
+
+# LangChain only consults the LLM cache on invoke/batch, not on stream.  These
+# helpers use the same key as BaseChatModel._generate_with_cache so streamed
+# calls can share entries with invoked ones.
+
+def lookup_llm_cache(llm, messages: List[BaseMessage]) -> Optional[str]:
+    cache = get_llm_cache()
+    if cache is None or llm.cache is False:
+        return None
+
+    generations = cache.lookup(dumps(messages), llm._get_llm_string())
+    return generations[0].text if generations else None
+
+
+def update_llm_cache(llm, messages: List[BaseMessage], text: str) -> None:
+    cache = get_llm_cache()
+    if cache is None or llm.cache is False:
+        return
+
+    cache.update(dumps(messages), llm._get_llm_string(), [ChatGeneration(message=AIMessage(content=text))])
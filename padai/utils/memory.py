@@ -0,0 +1,31 @@
+from typing import Optional, Tuple
+import os
+import sys
+
+
+def get_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None when it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def get_vram_bytes() -> Optional[Tuple[int, int]]:
+    """
+    ``(reserved, total)`` bytes of the current CUDA device, or None when this
+    process has not loaded torch or has no GPU.
+    """
+    torch = sys.modules.get("torch")  # never import torch just to ask
+    if torch is None or not torch.cuda.is_available() or not torch.cuda.is_initialized():
+        return None
+
+    device = torch.cuda.current_device()
+    return torch.cuda.memory_reserved(device), torch.cuda.get_device_properties(device).total_memory
@@ -0,0 +1,44 @@
+from concurrent.futures import Future
+from typing import Callable, Dict, Generic, Hashable, TypeVar
+import threading
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesce concurrent calls that share a key.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive with the same key while it is still running wait for, and receive,
+    the leader's result (or exception).  Nothing is remembered once the call
+    completes: caching finished results is someone else's job.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as exc:
+            future.set_exception(exc)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return future.result()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -1,7 +1,18 @@
 import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+import json
+import logging
+import os
+import socket
+import threading
+import time
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
 
 def get_sqlite_row_count(path: Path, table: str) -> int:
     with sqlite3.connect(path) as conn:
@@ -19,3 +30,253 @@ def ensure_db(path: Path, sql_create: str) -> sqlite3.Connection:
 def row_to_series(row: tuple, cursor: sqlite3.Cursor) -> pd.Series:
     columns = [col[0] for col in cursor.description]
     return pd.Series(row, index=columns, name=row[0])
+
+
+_SQL_CREATE_WORK_QUEUE = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id              INTEGER     PRIMARY KEY AUTOINCREMENT,
+        kind            TEXT        NOT NULL,
+        key             TEXT        UNIQUE,
+        payload         TEXT        NOT NULL,
+        requires        TEXT        NOT NULL DEFAULT '[]',
+        priority        INTEGER     NOT NULL DEFAULT 0,
+        state           TEXT        NOT NULL DEFAULT 'queued',
+        attempts        INTEGER     NOT NULL DEFAULT 0,
+        max_attempts    INTEGER     NOT NULL DEFAULT 3,
+        available_at    REAL        NOT NULL DEFAULT 0,
+        worker          TEXT,
+        lease_expires   REAL,
+        result          TEXT,
+        error           TEXT,
+        created_at      TEXT        DEFAULT (datetime('now')),
+        finished_at     TEXT
+    );
+    CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (state, priority DESC, id);
+"""
+
+# Jobs whose prerequisites (keys in ``requires``) are not all done yet.
+_SQL_BLOCKED = """
+    EXISTS (
+        SELECT 1 FROM json_each(jobs.requires) AS r LEFT JOIN jobs AS d ON d.key = r.value
+        WHERE d.state IS NOT 'done'
+    )
+"""
+
+
+@dataclass
+class QueuedJob:
+    id: int
+    kind: str
+    key: Optional[str]
+    payload: Dict[str, Any]
+    attempts: int           # including this one
+
+
+class WorkQueue:
+    """
+    Durable job queue in a SQLite file, shared by any number of worker
+    processes on the machine (or on machines sharing the file system, if its
+    locking is reliable).
+
+    A claimed job is leased to its worker, which must renew the lease
+    (`heartbeat`) while it runs; a job whose lease expires, because its
+    worker died, is given to the next worker that asks.  Failed jobs are
+    retried with exponential backoff up to their *max_attempts*, then kept
+    as failed.  Higher *priority* runs first, and a job only runs once the
+    jobs it *requires* (by key) are done.  Jobs enqueued with a key already
+    in the queue are not added again, so re-enqueuing a whole run after a
+    crash only adds what is missing.
+    """
+
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+    def __init__(self, path: Path, backoff: float = 5.0):
+        self.path = path
+        self.backoff = backoff
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SQL_CREATE_WORK_QUEUE)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit: every transaction below is explicit.
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        key: Optional[str] = None,
+        priority: int = 0,
+        max_attempts: int = 3,
+        requires: Sequence[str] = (),
+    ) -> int:
+        """Add a job and return its id; the id of the existing job if *key* is already queued."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO jobs (kind, key, payload, requires, priority, max_attempts) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(payload), json.dumps(list(requires)), priority, max_attempts),
+            )
+            if cursor.rowcount:
+                return cursor.lastrowid
+            (id_,) = conn.execute("SELECT id FROM jobs WHERE key = ?", (key,)).fetchone()
+            return id_
+
+    def claim(self, worker: str, kinds: Optional[Sequence[str]] = None, lease: float = 60.0) -> Optional[QueuedJob]:
+        """Lease the next runnable job of *kinds* (any kind by default) to *worker* for *lease* seconds."""
+        now = time.time()
+        kind_filter = f"AND kind IN ({', '.join('?' * len(kinds))})" if kinds else ""
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Workers that stopped renewing their lease are gone: their
+                # jobs go back to the queue, or fail once out of attempts.
+                conn.execute(
+                    "UPDATE jobs SET state = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+                    "worker = NULL, error = 'lease expired' WHERE state = 'running' AND lease_expires < ?",
+                    (now,),
+                )
+                conn.execute(
+                    "UPDATE jobs SET state = 'failed', error = 'a required job failed' WHERE state = 'queued' AND EXISTS ("
+                    "SELECT 1 FROM json_each(jobs.requires) AS r JOIN jobs AS d ON d.key = r.value WHERE d.state = 'failed')"
+                )
+
+                row = conn.execute(
+                    f"SELECT id, kind, key, payload, attempts FROM jobs "
+                    f"WHERE state = 'queued' AND available_at <= ? {kind_filter} AND NOT {_SQL_BLOCKED} "
+                    f"ORDER BY priority DESC, id LIMIT 1",
+                    (now, *(kinds or ())),
+                ).fetchone()
+
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET state = 'running', worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                        (worker, now + lease, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+
+        id_, kind, key, payload, attempts = row
+        return QueuedJob(id_, kind, key, json.loads(payload), attempts + 1)
+
+    def _update_leased(self, job_id: int, worker: str, sql: str, params: tuple) -> bool:
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {sql} WHERE id = ? AND worker = ? AND state = 'running'",
+                (*params, job_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: int, worker: str, lease: float = 60.0) -> bool:
+        """Renew the lease of *worker* on a job; False if it has lost it."""
+        return self._update_leased(job_id, worker, "lease_expires = ?", (time.time() + lease,))
+
+    def complete(self, job_id: int, worker: str, result: Any = None) -> bool:
+        return self._update_leased(
+            job_id, worker,
+            "state = 'done', result = ?, error = NULL, finished_at = datetime('now')",
+            (json.dumps(result),),
+        )
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """Give a job back for a later retry, or fail it for good once out of attempts."""
+        return self._update_leased(
+            job_id, worker,
+            "state = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+            "available_at = ? * (1 << (attempts - 1)) + ?, worker = NULL, error = ?",
+            (self.backoff, time.time(), error),
+        )
+
+    def retry_failed(self, kind: Optional[str] = None) -> int:
+        """Queue the failed jobs (of *kind*) again with fresh attempts; returns how many."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = 'queued', attempts = 0, available_at = 0 "
+                "WHERE state = 'failed' AND (? IS NULL OR kind = ?)",
+                (kind, kind),
+            )
+            return cursor.rowcount
+
+    def pending(self, kinds: Optional[Sequence[str]] = None) -> int:
+        """Jobs (of *kinds*) queued or running."""
+        kind_filter = f"AND kind IN ({', '.join('?' * len(kinds))})" if kinds else ""
+        with closing(self._connect()) as conn:
+            (count,) = conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE state IN ('queued', 'running') {kind_filter}",
+                tuple(kinds or ()),
+            ).fetchone()
+        return count
+
+    def get_result(self, key: str) -> Optional[Any]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT result FROM jobs WHERE key = ? AND state = 'done'", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def counts_df(self) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                "SELECT kind, state, COUNT(*) AS jobs, SUM(attempts) AS attempts FROM jobs GROUP BY kind, state ORDER BY kind, state",
+                conn,
+            )
+
+
+JobHandler = Callable[[Dict[str, Any]], Any]
+
+
+def work(
+    queue: WorkQueue,
+    handlers: Dict[str, JobHandler],
+    worker: Optional[str] = None,
+    lease: float = 60.0,
+    poll: float = 1.0,
+    stop_when_idle: bool = False,
+) -> int:
+    """
+    Run jobs of the kinds in *handlers* until interrupted, or with
+    *stop_when_idle* until none is queued or running.  A handler receives
+    the payload and returns a JSON-serializable result; an exception fails
+    the job (see `WorkQueue.fail`).  Returns the number of jobs completed.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    kinds = list(handlers)
+    completed = 0
+
+    while True:
+        job = queue.claim(worker, kinds, lease)
+        if job is None:
+            if stop_when_idle and not queue.pending(kinds):
+                return completed
+            time.sleep(poll)
+            continue
+
+        stop = threading.Event()
+
+        def _heartbeat(job_id: int = job.id) -> None:
+            while not stop.wait(lease / 3):
+                if not queue.heartbeat(job_id, worker, lease):
+                    logger.warning("Worker %s lost the lease of job %d", worker, job_id)
+                    return
+
+        heartbeat = threading.Thread(target=_heartbeat, name=f"heartbeat-{job.id}", daemon=True)
+        heartbeat.start()
+
+        logger.info("Job %d (%s) attempt %d on %s", job.id, job.kind, job.attempts, worker)
+        try:
+            result = handlers[job.kind](job.payload)
+        except Exception as exc:
+            logger.exception("Job %d (%s) failed", job.id, job.kind)
+            queue.fail(job.id, worker, f"{type(exc).__name__}: {exc}")
+        else:
+            if queue.complete(job.id, worker, result):
+                completed += 1
+        finally:
+            stop.set()
+            heartbeat.join()
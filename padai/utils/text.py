@@ -1,5 +1,5 @@
 import re
-from typing import Dict
+from typing import Dict, Optional
 import textwrap
 import re
 
@@ -52,6 +52,11 @@ def make_label(text: str, width: int = 40) -> str:
     return textwrap.shorten(single_line, width=width, placeholder="…")
 
 
+def estimate_tokens(text: str) -> int:
+    """Rough token count of *text* (about 3 characters per token, on the high side)."""
+    return -(-len(text) // 3)
+
+
 def strip_text(text: str | None):
     return (text or "").strip()
 
@@ -60,8 +65,80 @@ def process_response_strip(response: str) -> str:
     return response.strip()
 
 
+_REASONING_TAGS = ("reasoning", "analysis", "think")
+_REASONING_RE = re.compile(r"<(reasoning|analysis|think)>.*?</\1>", flags=re.DOTALL)
+
+
 def process_response_reasoning(response: str) -> str:
-    return re.sub(r"<(reasoning|analysis|think)>.*?</\1>", "", response, flags=re.DOTALL).strip()
+    return _REASONING_RE.sub("", response).strip()
+
+
+class ReasoningStreamFilter:
+    """
+    Incremental counterpart of `process_response_reasoning`.
+
+    Feed it the chunks of a streamed response and it returns the text that
+    can already be shown: reasoning blocks are withheld until their closing
+    tag arrives (and then dropped), and a partial tag at the end of a chunk
+    is held back until the next one disambiguates it.  Leading whitespace is
+    dropped, as `process_response` would do.
+
+    A block that is never closed is emitted by `flush`, matching the
+    non-streaming behaviour, which only removes complete blocks.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._tag: Optional[str] = None    # reasoning tag currently open
+        self._started = False              # visible text already emitted
+
+    def _visible(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        out = []
+
+        while self._buffer:
+            if self._tag is not None:
+                close = f"</{self._tag}>"
+                end = self._buffer.find(close, len(self._tag) + 2)
+                if end < 0:
+                    break                  # keep withholding
+                self._buffer = self._buffer[end + len(close):]
+                self._tag = None
+                continue
+
+            start = self._buffer.find("<")
+            if start < 0:
+                out.append(self._buffer)
+                self._buffer = ""
+                break
+
+            out.append(self._buffer[:start])
+            rest = self._buffer[start:]
+
+            tag = next((t for t in _REASONING_TAGS if rest.startswith(f"<{t}>")), None)
+            if tag is not None:
+                self._tag = tag
+                self._buffer = rest        # keep the opening tag for `flush`
+                continue
+
+            if any(f"<{t}>".startswith(rest) for t in _REASONING_TAGS):
+                self._buffer = rest        # partial opening tag: wait for more
+                break
+
+            out.append("<")
+            self._buffer = rest[1:]
+
+        return self._visible("".join(out))
+
+    def flush(self) -> str:
+        rest, self._buffer, self._tag = self._buffer, "", None
+        return self._visible(_REASONING_RE.sub("", rest)).rstrip()
 
 
 def process_response(response: str) -> str: